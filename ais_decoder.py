@@ -1,47 +1,25 @@
 import time
-import argparse
-import json
-from statistics import mean
-from decoders import *
-from constants import MESSAGE_TYPES, PAYLOAD_BINARY_LOOKUP
-from typing import Dict, Tuple, Optional, List, Union, Callable
-
-
-"""Mapping for decoder functions"""
-DECODER_MAP: Dict[int, Callable] = {
-    1: decode_position_report_class_a, #
-    2: decode_position_report_class_a, #
-    3: decode_position_report_class_a, #
-    4: decode_base_station_report, #
-    5: decode_static_and_voyage_data, #
-    6: decode_binary_addressed_messsage, #
-    7: decode_binary_acknowledge, # ?
-    8: decode_binary_broadcast_message, 
-    9: decode_standard_sar_aircraft_position,
-    10: decode_utc_date_inquiry,
-    11: decode_base_station_report,
-    13: decode_binary_acknowledge,
-    14: decode_safety_related_broadcast,
-    15: decode_interrogation,
-    16: decode_assignment_mode_command,
-    18: decode_position_report_class_b,
-    19: decode_position_report_class_b_ext,
-    21: decode_aid_to_navigation,
-    24: decode_static_data_report, 
-    25: decode_single_slot_binary_message,
-    26: decode_multi_slot_binary_message,
-    27: decode_long_range_broadcast
-}
-
-
-def get_payload_binary(encodedPayload: str, fill_bits: int = 0) -> str:
-    try:
-        return ''.join(map(PAYLOAD_BINARY_LOOKUP.get, encodedPayload)) + '0'*int(fill_bits)
-    except KeyError as e:
-       raise Exception(f"Error decoding payload: {e}")
-
-def decodePayload(payload: str, message_type_int: int) -> Tuple[Dict, Dict]:
-    decoder = DECODER_MAP.get(message_type_int)
+from decoders import DECODER_REGISTRY
+from decoders.projection import get_projected_decoder
+from constants import MESSAGE_TYPES, PAYLOAD_BINARY_TRANSLATION
+from errors import ErrorCode, DecodeError, ErrorStats, ERROR_DESCRIPTIONS
+from tag_block import split_tag_block, parse_tag_block
+from typing import Dict, Tuple, Optional, List, Union, Callable, Iterable, Collection, Sequence, Any
+
+
+"""Former name of DECODER_REGISTRY, kept for callers that looked decoders up directly (DECODER_MAP.get(message_type))"""
+DECODER_MAP = DECODER_REGISTRY
+
+
+def get_payload_binary(encodedPayload: str, fill_bits: int = 0) -> Optional[str]:
+    """Convert an armored payload to a bit string. Returns None if the payload contains invalid characters."""
+    payload_binary = encodedPayload.translate(PAYLOAD_BINARY_TRANSLATION)
+    if len(payload_binary) != 6 * len(encodedPayload):
+        return None
+    return payload_binary + '0'*int(fill_bits)
+
+def decodePayload(payload: str, message_type_int: int, fields: Optional[Sequence[str]] = None, raw: bool = False) -> Tuple[Dict, Dict]:
+    decoder = get_projected_decoder(message_type_int, fields or None, raw) if fields or raw else DECODER_REGISTRY.get(message_type_int)
     if decoder:
         return decoder(payload)
     else:
@@ -52,7 +30,12 @@ def decodePayload(payload: str, message_type_int: int) -> Tuple[Dict, Dict]:
 # Class representing an AIS message. Contents of the "payload_info" dictionary will vary depending on the message type.
 class AISMessage:
 
-    def __init__(self, sentences: Union[str, List[str]]):
+    def __init__(self, sentences: Union[str, List[str]], strict: bool = True):
+        """
+        Args:
+        sentences (Union[str, List[str]]): A sentence, or the list of sentences making up a multipart message.
+        strict (bool): Raise an exception for invalid sentences. If False, the failure is recorded in `error_code` instead.
+        """
         self.raw_sentences: List[str] = []
         self.encoded_sentences: List[str] = []
         self.payload_bitstrings: List[str] = []
@@ -64,21 +47,28 @@ class AISMessage:
         self.message_type_int: int = -1
         self.channel: str = "N/A"
         self.message_complete: bool = False
-        try:
-            if isinstance(sentences, str):
-                self.addSentence(sentences)
-            elif isinstance(sentences, list):
-                for sentence in sentences:
-                    self.addSentence(sentence)
-            else:
-                raise Exception("Invalid input type: expected string or list")
-        except Exception as e: 
-            raise Exception(f"Error parsing message: {e}")
+        self.receive_time: Optional[Union[int, float]] = None
+        self.source: Optional[str] = None
+        self.group_id: Optional[str] = None
         self.payload_info: Dict = {}
         self.payload_info_stringified: Dict = {}
+        self.error_code: ErrorCode = ErrorCode.OK
+        self._application_info: Optional[Dict] = None
+        self._application_decoded: bool = False
+        if isinstance(sentences, str):
+            self.error_code = self.try_add_sentence(sentences)
+        elif isinstance(sentences, list):
+            for sentence in sentences:
+                self.error_code = self.try_add_sentence(sentence)
+                if self.error_code:
+                    break
+        else:
+            self.error_code = ErrorCode.INVALID_INPUT
+        if self.error_code and strict:
+            raise Exception(f"Error parsing message: {ERROR_DESCRIPTIONS[self.error_code]}")
 
     def __dict__(self) -> Dict:
-        return {
+        message_dict = {
             "Raw Message(s)": self.raw_sentences,
             "Fragment Count": self.fragment_count,
             "Sequence ID": self.sequence_ID,
@@ -88,44 +78,112 @@ class AISMessage:
             "Payload Info": self.payload_info,
             "Payload Info (Stringified)": self.payload_info_stringified
         }
-        
+        if self.receive_time is not None:
+            message_dict["Receive Time"] = self.receive_time
+        if self.source is not None:
+            message_dict["Source"] = self.source
+        if self._application_decoded and self._application_info is not None:
+            message_dict["Application Info"] = self._application_info
+        return message_dict
+
+    def __setstate__(self, state: Dict) -> None:
+        # __dict__ is shadowed by the method above, so pickle cannot restore attributes through it (e.g. for
+        # messages returned by decode worker processes)
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __str__(self) -> str:
         retString = ""
         retString += f"Raw Message(s): {self.raw_sentences}\n"
+        if self.receive_time is not None:
+            retString += f"Receive Time: {self.receive_time}\n"
+        if self.source is not None:
+            retString += f"Source: {self.source}\n"
         retString += f"Fragment Count: {self.fragment_count}\n"
         retString += f"Sequence ID: {self.sequence_ID}\n"
         retString += f"Channel: {self.channel}\n"
         retString += f"Encoded Messages: {self.encoded_sentences}\n"
         retString += f"Message Type: {MESSAGE_TYPES[self.message_type_int-1]} ({self.message_type_int})\n"
-        retString += f"Payload Info: {self.payload_info_stringified}\n"
+        retString += f"Payload Info: {self.payload_info_stringified or self.payload_info}\n"
         return retString
     
-    def decode(self) -> 'AISMessage':
-        decodedPayload = decodePayload("".join(self.payload_bitstrings), self.message_type_int)
+    def decode(self, fields: Optional[Sequence[str]] = None, raw: bool = False) -> 'AISMessage':
+        """
+        Decode the payload. If `fields` is given, only those fields are extracted (see decoders/projection.py).
+        If `raw` is set, latitude/longitude and SOG/COG are kept as fixed-point integers (see RAW_FIELDS in constants.py).
+        In both cases payload_info_stringified is left empty for message types with a field layout.
+        """
+        decodedPayload = decodePayload("".join(self.payload_bitstrings), self.message_type_int, fields, raw)
         self.payload_info = decodedPayload[0]
         self.payload_info_stringified = decodedPayload[1]
+        self._application_info = None
+        self._application_decoded = False
         return self
+
+    @property
+    def application_id(self) -> Optional[Tuple[int, int]]:
+        """The (DAC, FI) pair of a binary message's application data, or None for other messages."""
+        if "Data" not in self.payload_info or "Designated Area Code" not in self.payload_info:
+            return None
+        return (self.payload_info["Designated Area Code"], self.payload_info["Functional ID"])
+
+    @property
+    def application_info(self) -> Optional[Dict]:
+        """
+        Application data of a binary message (types 6, 8, 25, 26), decoded by the sub-decoder registered for its (DAC, FI).
+        Decoded on first access and cached. None if the message has no application data or no sub-decoder is registered.
+        """
+        if not self._application_decoded:
+            self.decode_application()
+        return self._application_info
+
+    def decode_application(self) -> Optional[Dict]:
+        """Run the application sub-decoder now, rather than on first access of `application_info`."""
+        from decoders.decode_application_data import decode_application_data
+        application_id = self.application_id
+        if application_id is not None:
+            self._application_info = decode_application_data(application_id[0], application_id[1], self.payload_info["Data"], self.payload_info["Data Bits"])
+        self._application_decoded = True
+        return self._application_info
     
     def addSentence(self, sentence: str) -> None:
+        error_code = self.try_add_sentence(sentence)
+        if error_code:
+            raise Exception(ERROR_DESCRIPTIONS[error_code])
+
+    def try_add_sentence(self, sentence: str) -> ErrorCode:
+        """Add a sentence without raising. Returns ErrorCode.OK, or the reason the sentence was rejected."""
         self.raw_sentences.append(sentence)
         components = self.extract_sentence_components(sentence)
+        if isinstance(components, ErrorCode):
+            return components
         self.update_states(components)
-        self.validate_message_type()
+        return self.validate_message_type()
         
-    def extract_sentence_components(self, sentence: str) -> Dict[str, Union[int, str]]:
+    def extract_sentence_components(self, sentence: str) -> Union[Dict[str, Union[int, str, Dict]], ErrorCode]:
+        tag_block, sentence = split_tag_block(sentence)
         sentence_parts = sentence.split(",")
+        if len(sentence_parts) < 7 or not sentence_parts[1].isdigit() or not sentence_parts[2].isdigit():
+            return ErrorCode.MALFORMED_SENTENCE
+        checksum_parts = sentence_parts[6].split("*")
+        if len(checksum_parts) < 2:
+            return ErrorCode.MALFORMED_SENTENCE
+        payload = get_payload_binary(sentence_parts[5])
+        if not payload:
+            return ErrorCode.INVALID_PAYLOAD
         components = {
             "fragment_count": int(sentence_parts[1]),
             "current_fragment_number": int(sentence_parts[2]),
             "sequence_ID": sentence_parts[3],
             "channel": sentence_parts[4],
             "encoded_sentence": sentence_parts[5],
-            "payload": get_payload_binary(sentence_parts[5]),
-            "checksum": sentence_parts[6].split("*")[1]
+            "payload": payload,
+            "checksum": checksum_parts[1],
+            "tags": parse_tag_block(tag_block) if tag_block is not None else {}
         }
         return components
     
-    def update_states(self, components: Dict[str, Union[int, str]]) -> None:
+    def update_states(self, components: Dict[str, Union[int, str, Dict]]) -> None:
         self.fragment_count = components["fragment_count"] if self.fragment_count == -1 else self.fragment_count
         self.current_fragment_number = components["current_fragment_number"]
         self.seen_fragment_numbers.append(self.current_fragment_number)
@@ -136,59 +194,271 @@ class AISMessage:
         self.checksums.append(components["checksum"])
         self.message_type_int = int(self.payload_bitstrings[0][0:6], 2)
         self.message_complete = self.seen_fragment_numbers == list(range(1, self.fragment_count + 1))
+        tags = components["tags"]
+        if tags:
+            self.receive_time = tags.get("c") if self.receive_time is None else self.receive_time
+            self.source = tags.get("s") if self.source is None else self.source
+            self.group_id = tags.get("group_id") if self.group_id is None else self.group_id
 
-    def validate_message_type(self) -> None:
+    def validate_message_type(self) -> ErrorCode:
         if self.message_type_int < 1 or self.message_type_int > 28:
-            raise Exception(f"Unsupported message type: {self.message_type_int}")
+            return ErrorCode.UNSUPPORTED_MESSAGE_TYPE
+        return ErrorCode.OK
     
     def is_complete(self) -> bool:
         return self.message_complete
 
+    def continues(self, other: 'AISMessage') -> bool:
+        """Whether this (single-sentence) message is the next fragment of the multipart message `other`."""
+        if self.group_id is not None and other.group_id is not None:
+            if self.group_id != other.group_id:
+                return False
+        elif self.sequence_ID != other.sequence_ID:
+            return False
+        return (self.fragment_count == other.fragment_count) and (self.current_fragment_number == other.current_fragment_number + 1)
+
 
 # --- Main Program --- #
-def parse_ais_messages(source: Union[str, List[str]], delimiter: str = '\n') -> Tuple[List[AISMessage], List[str]]:
+def parse_ais_messages(source: Union[str, Iterable[str]], delimiter: str = '\n', error_stats: Optional[ErrorStats] = None, decode_applications: Optional[Collection[Tuple[int, int]]] = None, fields: Optional[Sequence[str]] = None, raw: bool = False) -> Tuple[List[AISMessage], List[DecodeError]]:
+    """
+    Parse and decode AIS sentences, reassembling multipart messages.
+
+    Args:
+    source (Union[str, Iterable[str]]): Path to a file of sentences (gzip, xz, zstd or bz2 compressed files are streamed
+    through a background decompression thread), or an iterable of sentences.
+    delimiter (str): Sentence delimiter used when reading from a file.
+    error_stats (Optional[ErrorStats]): If given, every error is also recorded in these counters / dead-letter sink.
+    decode_applications (Optional[Collection[Tuple[int, int]]]): (DAC, FI) pairs whose application data is decoded eagerly.
+    Application data of other binary messages is only decoded when `AISMessage.application_info` is accessed.
+    fields (Optional[Sequence[str]]): Only decode these fields (e.g. ["MMSI", "Latitude", "Longitude"]).
+    raw (bool): Keep latitude/longitude (1/10000 minute) and SOG/COG (tenths) as integers instead of floats.
+
+    Returns:
+    Tuple[List[AISMessage], List[DecodeError]]: The decoded messages, and a record for each rejected sentence.
+    """
 
     if(isinstance(source, str)):
-        AIS_sentences = open(source, "r").read().split(delimiter)
-    elif(isinstance(source, list)):
+        from log_reader import detect_compression, read_log_lines
+        if detect_compression(source) is not None:
+            AIS_sentences = read_log_lines(source, delimiter)
+        else:
+            AIS_sentences = open(source, "r").read().split(delimiter)
+    elif(isinstance(source, Iterable)):
         AIS_sentences = source
     else:
-        raise Exception("Invalid input type: expected string or list")
+        raise Exception("Invalid input type: expected string or iterable of strings")
     
     messages: List[AISMessage] = []
-    errors: List[str] = []
+    errors: List[DecodeError] = []
     current_message: Optional[AISMessage] = None
     for sentence in AIS_sentences:
         if sentence == "":
             continue
+        error: Optional[DecodeError] = None
         try:
-            new_message = AISMessage(sentence)
-            if current_message is None:
+            new_message = AISMessage(sentence, strict=False)
+            if new_message.error_code:
+                error = DecodeError(new_message.error_code, sentence)
+            elif current_message is None:
                 if new_message.is_complete():
-                    messages.append(new_message.decode())
+                    if not DECODER_REGISTRY.is_disabled(new_message.message_type_int):
+                        messages.append(new_message.decode(fields, raw))
                 else:
                     current_message = new_message
             else:
-                if (new_message.sequence_ID == current_message.sequence_ID) and (new_message.fragment_count == current_message.fragment_count) and (new_message.current_fragment_number == current_message.current_fragment_number + 1):
-                    current_message.addSentence(sentence)
-                    if current_message.message_complete:
-                        messages.append(current_message.decode())
+                if new_message.continues(current_message):
+                    error_code = current_message.try_add_sentence(sentence)
+                    if error_code:
+                        error = DecodeError(error_code, "\n".join(current_message.raw_sentences))
+                        current_message = None
+                    elif current_message.message_complete:
+                        if not DECODER_REGISTRY.is_disabled(current_message.message_type_int):
+                            messages.append(current_message.decode(fields, raw))
                         current_message = None
                 else:
-                    errors.append(f"Error: Receieved non-sequential message when expecting message with sequence ID {current_message.sequence_ID}")
+                    error = DecodeError(ErrorCode.NON_SEQUENTIAL_FRAGMENT, "\n".join(current_message.raw_sentences + [sentence]))
                     current_message = None
-        except Exception as e:
-            errors.append(f"Error parsing message: {e}")
+        except Exception:
+            error = DecodeError(ErrorCode.UNEXPECTED_ERROR, sentence)
+        if error is not None:
+            errors.append(error)
+            if error_stats is not None:
+                error_stats.record(error)
+    if decode_applications:
+        for message in messages:
+            if message.application_id in decode_applications:
+                message.decode_application()
     return (messages, errors)
 
+def decode_batch(sentences: Iterable[str], group_by_type: bool = False, error_stats: Optional[ErrorStats] = None, fields: Optional[Sequence[str]] = None, raw: bool = False) -> Union[List[Tuple[int, Dict]], Dict[int, List[Dict]]]:
+    """
+    Decode many sentences in one call, without building an AISMessage per sentence.
+
+    Sentences are split and reassembled into payloads first (multipart fragments are matched by tag block group ID,
+    or by channel and sequence ID), then the payloads are grouped by message type and each group is run through its decoder in
+    one pass. Malformed sentences, unsupported and disabled types are skipped.
+
+    Args:
+    sentences (Iterable[str]): Sentences, optionally prefixed with tag blocks.
+    group_by_type (bool): Return results grouped by message type instead of in input order.
+    error_stats (Optional[ErrorStats]): If given, rejected sentences are recorded here.
+    fields (Optional[Sequence[str]]): Only decode these fields.
+    raw (bool): Keep latitude/longitude (1/10000 minute) and SOG/COG (tenths) as integers instead of floats.
+
+    Returns:
+    Union[List[Tuple[int, Dict]], Dict[int, List[Dict]]]: (message type, decoded values) for each message in input
+    order, or {message type: [decoded values, ...]} if group_by_type is set.
+    """
+    payloads_by_type, message_count = group_payloads(sentences, error_stats)
+    return decode_payload_groups(payloads_by_type, message_count, group_by_type, error_stats, fields, raw)
+
+def group_payloads(sentences: Iterable[str], error_stats: Optional[ErrorStats] = None) -> Tuple[Dict[int, List[Tuple[int, str]]], int]:
+    """
+    First stage of decode_batch: split sentences, reassemble multipart payloads and group them by message type.
+
+    Fragments are matched like parse_ais_messages does: by the tag block's "g:" group ID when the sentence has one,
+    otherwise by channel and sequence ID. Fragment buffers are taken from a pool of scratch lists and returned to it
+    once their message is complete or discarded.
+
+    Returns:
+    Tuple[Dict[int, List[Tuple[int, str]]], int]: {message type: [(message index, payload bit string), ...]}, and the
+    number of payloads.
+    """
+    translation = PAYLOAD_BINARY_TRANSLATION
+    payloads_by_type: Dict[int, List[Tuple[int, str]]] = {}
+    pending_fragments: Dict[Tuple[Optional[str], str], List[str]] = {}
+    spare_buffers: List[List[str]] = []
+    message_count = 0
+    for sentence in sentences:
+        if not sentence:
+            continue
+        raw_sentence = sentence
+        tag_block = None
+        if sentence[0] == "\\":
+            tag_block, sentence = split_tag_block(sentence)
+        sentence_parts = sentence.split(",", 6)
+        if len(sentence_parts) < 7:
+            if error_stats is not None:
+                error_stats.record(DecodeError(ErrorCode.MALFORMED_SENTENCE, raw_sentence))
+            continue
+        encoded_payload = sentence_parts[5]
+        payload = encoded_payload.translate(translation)
+        if not payload or len(payload) != 6 * len(encoded_payload):
+            if error_stats is not None:
+                error_stats.record(DecodeError(ErrorCode.INVALID_PAYLOAD, raw_sentence))
+            continue
+        if sentence_parts[1] != "1":
+            group_id = parse_tag_block(tag_block).get("group_id") if tag_block is not None else None
+            fragment_key = (sentence_parts[4], sentence_parts[3]) if group_id is None else (None, group_id)
+            if sentence_parts[2] == "1":
+                fragments = pending_fragments.get(fragment_key)
+                if fragments is None:
+                    fragments = pending_fragments[fragment_key] = spare_buffers.pop() if spare_buffers else []
+                fragments.clear()
+                fragments.append(payload)
+                continue
+            fragments = pending_fragments.get(fragment_key)
+            if fragments is None or not sentence_parts[2].isdigit() or int(sentence_parts[2]) != len(fragments) + 1:
+                if fragments is not None:
+                    spare_buffers.append(pending_fragments.pop(fragment_key))
+                if error_stats is not None:
+                    error_stats.record(DecodeError(ErrorCode.NON_SEQUENTIAL_FRAGMENT, raw_sentence))
+                continue
+            fragments.append(payload)
+            if sentence_parts[2] != sentence_parts[1]:
+                continue
+            payload = "".join(fragments)
+            spare_buffers.append(pending_fragments.pop(fragment_key))
+        message_type = int(payload[:6], 2)
+        group = payloads_by_type.get(message_type)
+        if group is None:
+            group = payloads_by_type[message_type] = []
+        group.append((message_count, payload))
+        message_count += 1
+    return (payloads_by_type, message_count)
+
+def decode_payload_groups(payloads_by_type: Dict[int, List[Tuple[int, str]]], message_count: int, group_by_type: bool = False, error_stats: Optional[ErrorStats] = None,
+                          fields: Optional[Sequence[str]] = None, raw: bool = False) -> Union[List[Tuple[int, Dict]], Dict[int, List[Dict]]]:
+    """
+    Second stage of decode_batch: run each message type's payloads through its decoder in one pass.
+
+    Args:
+    payloads_by_type (Dict[int, List[Tuple[int, str]]]): {message type: [(message index, payload bit string), ...]}.
+    message_count (int): Total number of payloads (message indices are 0 to message_count - 1).
+    group_by_type, error_stats, fields, raw: As for decode_batch.
+    """
+    results: List[Optional[Tuple[int, Dict]]] = [None] * message_count
+    grouped_results: Dict[int, List[Dict]] = {}
+    for message_type, group in payloads_by_type.items():
+        decoder = get_projected_decoder(message_type, fields or None, raw) if fields or raw else DECODER_REGISTRY.get(message_type)
+        if decoder is None:
+            if error_stats is not None and not DECODER_REGISTRY.is_disabled(message_type):
+                for _, payload in group:
+                    error_stats.record(DecodeError(ErrorCode.UNSUPPORTED_MESSAGE_TYPE, payload))
+            continue
+        if group_by_type:
+            grouped_results[message_type] = [decoder(payload)[0] for _, payload in group]
+        else:
+            for index, payload in group:
+                results[index] = (message_type, decoder(payload)[0])
+    if group_by_type:
+        return grouped_results
+    return [result for result in results if result is not None]
+
+def json_default(value: Any) -> Any:
+    """json.dumps fallback for values that JSON cannot represent (binary application data, error objects)."""
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
 def main() -> None:
+    import argparse
+    import json
+    import sys
+    from statistics import mean
+    from textwrap import indent
+    from itertools import chain
+    from log_reader import log_paths, read_time_range, merge_logs
+    from pipeline import PIPELINE_BATCH_SIZE, run_pipeline
+
     parser = argparse.ArgumentParser(description="AIS Message Decoder")
-    parser.add_argument("--file_path", help="Path to the file containing AIS messages")
+    parser.add_argument("--file_path", help="Path to the file containing AIS messages, or a glob of files (e.g. 'logs/2024-09-*.nmea.gz'); gzip, xz, zstd and bz2 files are decompressed on the fly")
     parser.add_argument("--benchmark", action="store_true", help="Run in benchmark mode")
     parser.add_argument("--iterations", type=int, default=100, help="Number of iterations for benchmark (default: 100)")
     parser.add_argument("--outfile", help="Path to the file to write the decoded messages to")
     parser.add_argument("--json", help="Output as array of JSON objects", default=False, type=bool)
+    parser.add_argument("--start", type=float, help="Only decode messages received at or after this UNIX time (requires a time-sorted, timestamped log; compressed logs are scanned instead of searched)")
+    parser.add_argument("--end", type=float, help="Only decode messages received before this UNIX time (requires a time-sorted, timestamped log)")
+    parser.add_argument("--merge", nargs="+", help="Paths of several time-sorted logs (e.g. one per receiver) to merge by receive time instead of --file_path")
+    parser.add_argument("--dedupe_window", type=float, help="With --merge, drop messages already received from another log within this many seconds")
+    parser.add_argument("--applications", help="Comma-separated DAC:FI pairs whose binary application data is decoded (e.g. 1:31,1:22)")
+    parser.add_argument("--fields", help="Comma-separated fields to decode, skipping all others (e.g. MMSI,Latitude,Longitude)")
+    parser.add_argument("--raw", action="store_true", help="Keep latitude/longitude and SOG/COG as raw fixed-point integers")
+    parser.add_argument("--sqlite", help="Path to a SQLite database to write the decoded messages to (one table per message type)")
+    parser.add_argument("--csv", help="Directory to write the decoded messages to as CSV (one file per message type)")
+    parser.add_argument("--csv_gzip", action="store_true", help="With --csv, write gzip-compressed files")
+    parser.add_argument("--throttle", action="store_true", help="Downsample position reports per vessel (see --throttle_interval, --throttle_distance, --throttle_course)")
+    parser.add_argument("--throttle_interval", type=float, default=60.0, help="Keep a vessel's position report after this many seconds (default: 60)")
+    parser.add_argument("--throttle_distance", type=float, default=100.0, help="Keep a vessel's position report after it moved this many metres (default: 100)")
+    parser.add_argument("--throttle_course", type=float, default=10.0, help="Keep a vessel's position report after its course changed by this many degrees (default: 10)")
+    parser.add_argument("--geofences", help="Path to a GeoJSON file of polygons; prints vessel enter/exit events")
+    parser.add_argument("--delta", action="store_true", help="Output compact JSON lines with only the fields that changed since the vessel's previous message of the same type, plus periodic full keyframes")
+    parser.add_argument("--keyframe_every", type=int, default=20, help="With --delta, send a full keyframe every this many messages of a vessel and type (default: 20)")
+    parser.add_argument("--shm_ring", help="Publish the decoded messages to a shared-memory ring of this name for local subscriber processes (shm_ring.RingSubscriber) instead of printing them")
+    parser.add_argument("--track_archive", help="Path to write the decoded position reports to as a compressed track archive (see track_archive.py)")
+    parser.add_argument("--traffic_stats", help="Path to write traffic statistics to as JSON (messages per type/channel/minute, unique MMSIs, top talkers)")
+    parser.add_argument("--workers", type=int, default=0, help="Decode in this many worker processes instead of a single decode thread (default: 0)")
+    parser.add_argument("--batch_size", type=int, default=PIPELINE_BATCH_SIZE, help=f"Lines read and decoded per batch (default: {PIPELINE_BATCH_SIZE})")
+    parser.add_argument("--priority_lanes", action="store_true", help="Decode safety messages (type 14, SART/MOB/EPIRB) first and shed low-priority messages under overload (see --shed)")
+    parser.add_argument("--shed", default="duplicate,base_station,static", help="With --priority_lanes, comma-separated categories dropped under overload, or 'none' (default: duplicate,base_station,static)")
+    parser.add_argument("--shed_threshold", type=int, default=10000, help="With --priority_lanes, queued messages above which --shed categories are dropped (default: 10000)")
+    parser.add_argument("--disable_types", help="Comma-separated message types to skip entirely (e.g. 5,24)")
+    parser.add_argument("--dead_letters", help="Path to write the raw sentences of the most recent failed messages to")
+    parser.add_argument("--dead_letter_size", type=int, default=1000, help="Number of failed messages kept for --dead_letters (default: 1000)")
     args = parser.parse_args()
+    if args.disable_types:
+        for message_type in args.disable_types.split(","):
+            DECODER_REGISTRY.disable(int(message_type))
 
     if args.benchmark:
         print(f"Running benchmark with {args.iterations} iterations...")
@@ -205,27 +475,146 @@ def main() -> None:
         print(f"Total messages parsed in each iteration: {len(messages)} (Total: {len(messages) * args.iterations})")
         print(f"Average time per message: {(avg_time * 1000) / len(messages):.6f} ms")
     else:
-        start_time = time.time()
-        messages, errors = parse_ais_messages(args.file_path)
-        end_time = time.time()
-        if args.outfile:
-            with open(args.outfile, "w") as f:
-                if args.json:
-                    f.write(json.dumps([message.__dict__() for message in messages], indent=4))
-                else:
-                    for message in messages:
-                        f.write(message.__str__())
-                        f.write("\n")
+        if args.merge:
+            if args.start is not None or args.end is not None:
+                source = merge_logs([read_time_range(path, args.start if args.start is not None else 0, args.end) for path in args.merge], args.dedupe_window)
+            else:
+                source = merge_logs(args.merge, args.dedupe_window)
         else:
-            if args.json:
-                print(json.dumps([message.__dict__() for message in messages], indent=4))
+            if not args.file_path:
+                parser.error("--file_path or --merge is required")
+            paths = log_paths(args.file_path)
+            if not paths:
+                parser.error(f"--file_path {args.file_path!r} matches no files")
+            if args.start is not None or args.end is not None:
+                source = chain.from_iterable(read_time_range(path, args.start if args.start is not None else 0, args.end) for path in paths)
+            else:
+                source = args.file_path
+        error_stats = ErrorStats(args.dead_letter_size if args.dead_letters else 0)
+        decode_applications = {tuple(int(part) for part in pair.split(":")) for pair in args.applications.split(",")} if args.applications else None
+        fields = args.fields.split(",") if args.fields else None
+        if args.throttle:
+            from throttle import PositionThrottle
+            position_throttle = PositionThrottle(args.throttle_interval, args.throttle_distance, args.throttle_course, raw=args.raw)
+        geofence_event_count = 0
+        if args.geofences:
+            from geofence import GeofenceIndex, GeofenceTracker, geofences_from_geojson
+            geofence_tracker = GeofenceTracker(GeofenceIndex(geofences_from_geojson(args.geofences)), raw=args.raw)
+
+        # Messages are written batch by batch on the pipeline's writer thread, as soon as they are decoded
+        output = open(args.outfile, "w") if args.outfile and not (args.sqlite or args.csv or args.shm_ring) else None
+        if args.sqlite:
+            from sqlite_sink import SQLiteSink
+            sink = SQLiteSink(args.sqlite, fields=fields)
+        elif args.csv:
+            from csv_sink import CSVSink
+            sink = CSVSink(args.csv, fields=fields, compress=args.csv_gzip)
+        elif args.shm_ring:
+            from shm_ring import RingPublisher
+            ring_publisher = RingPublisher(args.shm_ring)
+        track_writer = None
+        if args.track_archive:
+            from track_archive import TrackArchiveWriter
+            track_writer = TrackArchiveWriter(args.track_archive, raw=args.raw)
+        if args.delta:
+            from delta_stream import DeltaEncoder, encode_json_lines
+            delta_encoder = DeltaEncoder(args.keyframe_every)
+        traffic_stats = None
+        if args.traffic_stats:
+            from traffic_stats import TrafficStats
+            traffic_stats = TrafficStats()
+        shedding = None
+        if args.priority_lanes:
+            from priority_lanes import SheddingPolicy
+            shedding = SheddingPolicy([] if args.shed == "none" else args.shed.split(","), args.shed_threshold)
+        json_separator = "[\n"
+        message_count = 0
+        # Geofence events are printed as they happen; machine-readable output on stdout keeps them on stderr
+        event_file = sys.stderr if (args.json or args.delta) and output is None and not (args.sqlite or args.csv or args.shm_ring) else sys.stdout
+
+        def write_messages(messages: List[AISMessage]) -> None:
+            nonlocal json_separator, message_count, geofence_event_count
+            if traffic_stats is not None:
+                traffic_stats.record_messages(messages)
+            if args.throttle:
+                messages = list(position_throttle.filter(messages))
+            message_count += len(messages)
+            if track_writer is not None:
+                track_writer.write_messages(messages)
+            if args.sqlite or args.csv:
+                sink.write_messages(messages)
+            elif args.shm_ring:
+                ring_publisher.publish_messages(messages)
+            elif args.delta:
+                text = encode_json_lines(delta_encoder.encode_messages(messages), default=json_default)
+                output.write(text) if output else print(text, end="")
+            elif args.json:
+                # Same layout as json.dumps(all_messages, indent=4), one element at a time
+                for message in messages:
+                    text = json_separator + indent(json.dumps(message.__dict__(), indent=4, default=json_default), "    ")
+                    output.write(text) if output else print(text, end="")
+                    json_separator = ",\n"
+            elif output:
+                for message in messages:
+                    output.write(message.__str__())
+                    output.write("\n")
             else:
                 for message in messages:
                     print(message)
-        
-        print(f"Runtime: {(end_time - start_time) * 1000:.2f}ms")
-        print(f"Total messages parsed: {len(messages)}")
-        print(f"Errors: {len(errors)}")
+            if args.geofences:
+                for event in geofence_tracker.process(messages):
+                    geofence_event_count += 1
+                    print(f"Geofence {event.event}: MMSI {event.mmsi} {event.fence_id} at {event.latitude:.5f}, {event.longitude:.5f} (receive time {event.receive_time})", file=event_file)
+
+        try:
+            stats = run_pipeline(source, write_messages, workers=args.workers, batch_size=args.batch_size, error_stats=error_stats,
+                                 fields=fields, raw=args.raw, decode_applications=decode_applications,
+                                 write_errors=traffic_stats.record_errors if traffic_stats is not None else None, shedding=shedding)
+            if args.json:
+                text = "[]" if json_separator == "[\n" else "\n]"
+                output.write(text) if output else print(text)
+        finally:
+            if output:
+                output.close()
+            if args.sqlite or args.csv:
+                sink.close()
+            elif args.shm_ring:
+                ring_publisher.close()
+            if track_writer is not None:
+                track_writer.close()
+        if args.sqlite or args.csv:
+            print(f"Rows written to {args.sqlite or args.csv}: {sink.rows_written} ({sink.rows_skipped} skipped)")
+        elif args.shm_ring:
+            print(f"Records published to {ring_publisher.name}: {ring_publisher.published}")
+
+        print(f"Runtime: {stats.elapsed * 1000:.2f}ms ({stats.messages_per_second:.0f} messages/s)")
+        print(f"Total messages parsed: {message_count}")
+        print(f"Errors: {stats.errors}")
+        for category, count in error_stats.summary().items():
+            print(f"  {category}: {count}")
+        for queue_stats in (stats.decode_queue, stats.write_queue) if stats.lanes is None else (stats.write_queue,):
+            print(f"Queue {queue_stats.name}: mean depth {queue_stats.mean_depth:.1f}, max {queue_stats.max_depth} of {queue_stats.capacity}, producer blocked {queue_stats.blocked_puts} of {queue_stats.puts} times")
+        if stats.lanes is not None:
+            for lane, lane_stats in stats.lanes.summary()["lanes"].items():
+                print(f"Lane {lane}: {lane_stats['served']} messages, max depth {lane_stats['max_depth']}, mean wait {lane_stats['mean_wait'] * 1000:.1f} ms, max wait {lane_stats['max_wait'] * 1000:.1f} ms")
+            for category, count in sorted(stats.lanes.dropped.items()):
+                print(f"  Shed {category}: {count} of {stats.lanes.received[category]}")
+        if args.geofences:
+            print(f"Geofence events: {geofence_event_count}")
+        if args.throttle:
+            print(f"Position reports kept: {position_throttle.stats.kept} of {position_throttle.stats.seen} ({position_throttle.stats.reduction_ratio:.1%} reduction)")
+        if args.delta:
+            print(f"Delta records: {delta_encoder.records} ({delta_encoder.keyframes} keyframes), {delta_encoder.summary()['fields_sent_ratio']:.1%} of fields sent")
+        if track_writer is not None:
+            print(f"Track archive written to {args.track_archive}: {track_writer.points_written} positions in {track_writer.blocks_written} blocks")
+        if traffic_stats is not None:
+            traffic_stats.to_json(args.traffic_stats)
+            print(f"Traffic statistics written to {args.traffic_stats}: {traffic_stats.unique_mmsi.count()} unique MMSIs (estimated)")
+        if args.dead_letters:
+            with open(args.dead_letters, "w") as f:
+                for error in error_stats.dead_letters:
+                    for raw_sentence in error.raw_sentence.split("\n"):
+                        f.write(f"{error.code.name}\t{raw_sentence}\n")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,621 @@
+# benchmark.py -- benchmark suite for the AIS decoder
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from statistics import mean, median
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+"""Import time budget for `import ais_decoder` (cumulative, as reported by python -X importtime)"""
+IMPORT_TIME_BUDGET_MS: float = 30.0
+
+DEFAULT_SAMPLE_FILE: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data", "AISSample92824.txt")
+
+"""Registered benchmarks. Each returns False if it exceeded a budget."""
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], bool]] = {}
+
+
+def benchmark(name: str) -> Callable:
+    def register(function: Callable[[argparse.Namespace], bool]) -> Callable[[argparse.Namespace], bool]:
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def read_sentences(path: str) -> List[str]:
+    with open(path, "r") as f:
+        return f.read().split("\n")
+
+
+def time_call(function: Callable, iterations: int) -> float:
+    """Average wall time of `function()` in seconds."""
+    times: List[float] = []
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return mean(times)
+
+
+def measure_import_time_ms(module: str) -> float:
+    """Cumulative import time of `module` in a fresh interpreter, from python -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"Could not measure import time of {module}: {result.stderr[-500:]}")
+
+
+@benchmark("import_time")
+def benchmark_import_time(args: argparse.Namespace) -> bool:
+    # The first import writes bytecode caches; it is not counted
+    measure_import_time_ms("ais_decoder")
+    times = [measure_import_time_ms("ais_decoder") for _ in range(max(args.iterations // 10, 5))]
+    import_time = median(times)
+    passed = import_time <= IMPORT_TIME_BUDGET_MS
+    print(f"import ais_decoder: {import_time:.2f} ms (median of {len(times)}, budget {IMPORT_TIME_BUDGET_MS:.0f} ms) {'OK' if passed else 'OVER BUDGET'}")
+    return passed
+
+
+@benchmark("batch")
+def benchmark_batch(args: argparse.Namespace) -> bool:
+    from ais_decoder import parse_ais_messages, decode_batch
+    sentences = read_sentences(args.file_path)
+    message_count = len(decode_batch(sentences))
+    per_object_time = time_call(lambda: parse_ais_messages(sentences), args.iterations)
+    batch_time = time_call(lambda: decode_batch(sentences), args.iterations)
+    print(f"parse_ais_messages: {per_object_time * 1000:.2f} ms ({per_object_time * 1e6 / message_count:.2f} us/message)")
+    print(f"decode_batch:       {batch_time * 1000:.2f} ms ({batch_time * 1e6 / message_count:.2f} us/message, {per_object_time / batch_time:.2f}x)")
+    return True
+
+
+"""Minimal position projection used by the projection benchmark"""
+POSITION_FIELDS: List[str] = ["MMSI", "Latitude", "Longitude", "Timestamp"]
+
+
+@benchmark("projection")
+def benchmark_projection(args: argparse.Namespace) -> bool:
+    from ais_decoder import parse_ais_messages, decode_batch
+    sentences = read_sentences(args.file_path)
+    message_count = len(decode_batch(sentences))
+    for name, function in (("parse_ais_messages", parse_ais_messages), ("decode_batch", decode_batch)):
+        full_time = time_call(lambda: function(sentences), args.iterations)
+        projected_time = time_call(lambda: function(sentences, fields=POSITION_FIELDS), args.iterations)
+        print(f"{name}: all fields {full_time * 1e6 / message_count:.2f} us/message, "
+              f"{','.join(POSITION_FIELDS)} {projected_time * 1e6 / message_count:.2f} us/message ({full_time / projected_time:.2f}x)")
+    return True
+
+
+@benchmark("sqlite")
+def benchmark_sqlite(args: argparse.Namespace) -> bool:
+    from ais_decoder import parse_ais_messages
+    from sqlite_sink import write_sqlite
+    messages, _ = parse_ais_messages(read_sentences(args.file_path))
+    iterations = max(args.iterations // 10, 1)
+    for batch_size in (1, 50000):
+        times: List[float] = []
+        for _ in range(iterations):
+            with tempfile.TemporaryDirectory() as directory:
+                start_time = time.perf_counter()
+                sink = write_sqlite(messages, os.path.join(directory, "ais.db"), batch_size=batch_size)
+                times.append(time.perf_counter() - start_time)
+        print(f"batch_size={batch_size}: {sink.rows_written / mean(times):,.0f} rows/s ({sink.rows_written} rows, {mean(times) * 1000:.2f} ms)")
+    return True
+
+
+@benchmark("csv")
+def benchmark_csv(args: argparse.Namespace) -> bool:
+    from ais_decoder import parse_ais_messages
+    from csv_sink import write_csv
+    messages, _ = parse_ais_messages(read_sentences(args.file_path))
+    iterations = max(args.iterations // 10, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        def write_text() -> None:
+            with open(os.path.join(directory, "ais.txt"), "w") as f:
+                for message in messages:
+                    f.write(message.__str__())
+                    f.write("\n")
+        text_time = time_call(write_text, iterations)
+        print(f"text (AISMessage.__str__): {text_time * 1000:.2f} ms, {os.path.getsize(os.path.join(directory, 'ais.txt')) / 1e6:.1f} MB")
+        for compress in (False, True):
+            csv_directory = os.path.join(directory, "gzip" if compress else "csv")
+            csv_time = time_call(lambda: write_csv(messages, csv_directory, compress=compress), iterations)
+            size = sum(entry.stat().st_size for entry in os.scandir(csv_directory))
+            print(f"csv{' (gzip)' if compress else ''}: {csv_time * 1000:.2f} ms ({text_time / csv_time:.2f}x), {size / 1e6:.1f} MB")
+    return True
+
+
+@benchmark("dataframes")
+def benchmark_dataframes(args: argparse.Namespace) -> bool:
+    from ais_decoder import parse_ais_messages
+    from dataframes import decode_columns, np, pd, to_dataframes
+    if np is None:
+        print("skipped: numpy is not installed")
+        return True
+    sentences = read_sentences(args.file_path)
+    iterations = max(args.iterations // 10, 1)
+    # Former approach: a dictionary per message, then DataFrame(list of dictionaries)
+    dict_time = time_call(lambda: [message.payload_info for message in parse_ais_messages(sentences)[0]], iterations)
+    columns_time = time_call(lambda: decode_columns(sentences), iterations)
+    print(f"payload_info dictionaries: {dict_time * 1000:.2f} ms, column arrays: {columns_time * 1000:.2f} ms ({dict_time / columns_time:.2f}x)")
+    if pd is None:
+        print("pandas is not installed: DataFrame construction not measured")
+        return True
+    def from_dicts() -> None:
+        records: Dict[int, List[Dict]] = {}
+        for message in parse_ais_messages(sentences)[0]:
+            records.setdefault(message.message_type_int, []).append(message.payload_info)
+        for type_records in records.values():
+            pd.DataFrame(type_records)
+    from_dicts_time = time_call(from_dicts, iterations)
+    dataframes_time = time_call(lambda: to_dataframes(sentences), iterations)
+    print(f"DataFrame(dicts): {from_dicts_time * 1000:.2f} ms, to_dataframes: {dataframes_time * 1000:.2f} ms ({from_dicts_time / dataframes_time:.2f}x)")
+    return True
+
+
+"""Maximum cost of TrafficStats.record_messages, relative to decoding the same messages"""
+TRAFFIC_STATS_OVERHEAD_BUDGET: float = 0.05
+
+
+@benchmark("traffic_stats")
+def benchmark_traffic_stats(args: argparse.Namespace) -> bool:
+    from ais_decoder import parse_ais_messages
+    from traffic_stats import TrafficStats
+    sentences = read_sentences(args.file_path)
+    iterations = max(args.iterations // 10, 1)
+    messages, _ = parse_ais_messages(sentences)
+    decode_time = time_call(lambda: parse_ais_messages(sentences), iterations)
+    stats_time = time_call(lambda: TrafficStats().record_messages(messages), iterations)
+    overhead = stats_time / decode_time
+    print(f"decode: {decode_time * 1000:.2f} ms, record_messages: {stats_time * 1000:.2f} ms "
+          f"({overhead:.1%} of decoding, budget {TRAFFIC_STATS_OVERHEAD_BUDGET:.0%}) {'OK' if overhead <= TRAFFIC_STATS_OVERHEAD_BUDGET else 'OVER BUDGET'}")
+    return overhead <= TRAFFIC_STATS_OVERHEAD_BUDGET
+
+
+"""Number of synthetic receiver logs merged by the merge benchmark, and lines per log"""
+MERGE_FILE_COUNT: int = 50
+MERGE_LINES_PER_FILE: int = 2000
+
+
+@benchmark("merge")
+def benchmark_merge(args: argparse.Namespace) -> bool:
+    from log_reader import merge_logs
+    sentences = [sentence for sentence in read_sentences(args.file_path) if sentence.startswith("!") and sentence.split(",")[1] == "1"]
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for file_index in range(MERGE_FILE_COUNT):
+            path = os.path.join(directory, f"rx{file_index}.nmea")
+            with open(path, "w") as f:
+                for line_index in range(MERGE_LINES_PER_FILE):
+                    timestamp = 1727481600 + line_index * 43.2 + file_index * 0.5
+                    sentence = sentences[(line_index * MERGE_FILE_COUNT + file_index) % len(sentences)]
+                    # Half of the logs use tag blocks, the other half prefix timestamps
+                    f.write(f"\\s:rx{file_index},c:{round(timestamp * 1000)}*00\\{sentence}\n" if file_index % 2 else f"{timestamp:.1f} {sentence}\n")
+            paths.append(path)
+        line_count = MERGE_FILE_COUNT * MERGE_LINES_PER_FILE
+        iterations = max(args.iterations // 10, 1)
+        merge_time = time_call(lambda: sum(1 for _ in merge_logs(paths)), iterations)
+        dedupe_time = time_call(lambda: sum(1 for _ in merge_logs(paths, dedupe_window=60)), iterations)
+    print(f"merge {MERGE_FILE_COUNT} files ({line_count} lines): {merge_time * 1000:.2f} ms ({line_count / merge_time:,.0f} lines/s)")
+    print(f"merge with dedupe_window=60: {dedupe_time * 1000:.2f} ms ({line_count / dedupe_time:,.0f} lines/s)")
+    return True
+
+
+@benchmark("bytes_parser")
+def benchmark_bytes_parser(args: argparse.Namespace) -> bool:
+    from ais_decoder import decode_batch
+    from bytes_parser import decode_batch_bytes, read_lines_bytes
+    sentences = read_sentences(args.file_path)
+    lines = list(read_lines_bytes(args.file_path))
+    message_count = len(decode_batch(sentences))
+    for label, fields in (("all fields", None), (",".join(POSITION_FIELDS), POSITION_FIELDS)):
+        str_time = time_call(lambda: decode_batch(sentences, fields=fields), args.iterations)
+        bytes_time = time_call(lambda: decode_batch_bytes(lines, fields=fields), args.iterations)
+        print(f"{label}: decode_batch {str_time * 1e6 / message_count:.2f} us/message, "
+              f"decode_batch_bytes {bytes_time * 1e6 / message_count:.2f} us/message ({str_time / bytes_time:.2f}x)")
+    return True
+
+
+"""Copies of the sample file concatenated into the compressed benchmark input"""
+COMPRESSED_SAMPLE_COPIES: int = 10
+
+
+@benchmark("compressed")
+def benchmark_compressed(args: argparse.Namespace) -> bool:
+    import gzip
+    import lzma
+    from ais_decoder import parse_ais_messages
+    from log_reader import read_log_lines
+    with open(args.file_path, "rb") as f:
+        data = f.read().rstrip(b"\n") + b"\n"
+    data *= COMPRESSED_SAMPLE_COPIES
+    iterations = max(args.iterations // 10, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {"plain": os.path.join(directory, "ais.nmea"), "gzip": os.path.join(directory, "ais.nmea.gz"), "xz": os.path.join(directory, "ais.nmea.xz")}
+        with open(paths["plain"], "wb") as f:
+            f.write(data)
+        with gzip.open(paths["gzip"], "wb") as f:
+            f.write(data)
+        with lzma.open(paths["xz"], "wb") as f:
+            f.write(data)
+        plain_time = time_call(lambda: parse_ais_messages(paths["plain"]), iterations)
+        print(f"plain: {plain_time * 1000:.2f} ms")
+        for compression, open_compressed in (("gzip", gzip.open), ("xz", lzma.open)):
+            # Decompress everything first, then decode (the former workflow) vs. streaming with background read-ahead
+            sequential_time = time_call(lambda: parse_ais_messages(open_compressed(paths[compression], "rt").read().split("\n")), iterations)
+            streamed_time = time_call(lambda: parse_ais_messages(paths[compression]), iterations)
+            read_time = time_call(lambda: sum(1 for _ in read_log_lines(paths[compression])), iterations)
+            print(f"{compression}: decompress then decode {sequential_time * 1000:.2f} ms, streamed {streamed_time * 1000:.2f} ms "
+                  f"({sequential_time / streamed_time:.2f}x), read-ahead alone {read_time * 1000:.2f} ms")
+    return True
+
+
+"""Copies of the sample file decoded (and written out) by the pipeline benchmark"""
+PIPELINE_SAMPLE_COPIES: int = 10
+
+
+@benchmark("pipeline")
+def benchmark_pipeline(args: argparse.Namespace) -> bool:
+    import io
+    from ais_decoder import parse_ais_messages
+    from pipeline import run_pipeline
+
+    def write_all(messages: List) -> None:
+        output = io.StringIO()
+        for message in messages:
+            output.write(message.__str__())
+
+    lines = read_sentences(args.file_path) * PIPELINE_SAMPLE_COPIES
+    iterations = max(args.iterations // 10, 1)
+    # Read, decode and write strictly one after another (the former CLI) vs. the threaded pipeline and a process pool
+    sequential_time = time_call(lambda: write_all(parse_ais_messages(iter(lines))[0]), iterations)
+    print(f"sequential: {sequential_time * 1000:.2f} ms")
+    for workers in (0, os.cpu_count() or 1):
+        stats = None
+        def run() -> None:
+            nonlocal stats
+            stats = run_pipeline(iter(lines), write_all, workers=workers)
+        pipeline_time = time_call(run, iterations)
+        queues = ", ".join(f"{name} queue mean depth {queue['mean_depth']:.1f}" for name, queue in stats.summary()["queues"].items())
+        print(f"pipeline (workers={workers}): {pipeline_time * 1000:.2f} ms ({sequential_time / pipeline_time:.2f}x), "
+              f"{stats.messages_per_second:.0f} messages/s, {queues}")
+    return True
+
+
+"""Target rate of the replay benchmark, in messages per second"""
+REPLAY_TARGET_RATE: float = 4000.0
+
+
+@benchmark("replay")
+def benchmark_replay(args: argparse.Namespace) -> bool:
+    from replay import replay
+    lines = read_sentences(args.file_path)
+    # The sample log has no receive times: it is paced at REPLAY_TARGET_RATE, then sent at maximum speed
+    paced = replay(iter(lines), lambda messages: None, speed=1.0, untimed_rate=REPLAY_TARGET_RATE)
+    print(f"paced: {paced}")
+    unpaced = replay(iter(lines), lambda messages: None, speed=None)
+    print(f"max speed: {unpaced}")
+    return True
+
+
+"""Copies of the sample file published by the shared-memory ring benchmark, and its subscriber counts"""
+SHM_RING_SAMPLE_COPIES: int = 20
+SHM_RING_SUBSCRIBERS: List[int] = [1, 2, 4, 8]
+
+
+def _count_ring_records(name: str, ready, counts) -> None:
+    from shm_ring import RingSubscriber
+    with RingSubscriber(name) as subscriber:
+        ready.release()
+        records = sum(1 for _ in subscriber)
+        counts.put((records, subscriber.records_lost))
+
+
+def _decode_sentences(sentences: List[str], counts) -> None:
+    from ais_decoder import parse_ais_messages
+    counts.put((len(parse_ais_messages(sentences)[0]), 0))
+
+
+@benchmark("shm_ring")
+def benchmark_shm_ring(args: argparse.Namespace) -> bool:
+    import multiprocessing
+    from ais_decoder import parse_ais_messages
+    from pipeline import PIPELINE_BATCH_SIZE
+    from shm_ring import RingPublisher
+    sentences = read_sentences(args.file_path) * SHM_RING_SAMPLE_COPIES
+    messages = parse_ais_messages(sentences)[0]
+
+    def run_processes(target: Callable, target_args: tuple, subscribers: int, publish: Optional[Callable] = None) -> Tuple[float, List[Tuple[int, int]]]:
+        ready = multiprocessing.Semaphore(0)
+        counts = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=target, args=target_args + ((ready, counts) if publish else (counts,))) for _ in range(subscribers)]
+        for process in processes:
+            process.start()
+        if publish:
+            for _ in processes:
+                ready.acquire()
+        start_time = time.perf_counter()
+        if publish:
+            publish()
+        results = [counts.get() for _ in processes]
+        elapsed = time.perf_counter() - start_time
+        for process in processes:
+            process.join()
+        return elapsed, results
+
+    parse_time = time_call(lambda: parse_ais_messages(sentences), 1)
+    for subscribers in SHM_RING_SUBSCRIBERS:
+        # Every consumer decoding the feed itself vs. one decoder (timed separately) publishing to every consumer through the ring
+        decode_time, _ = run_processes(_decode_sentences, (sentences,), subscribers)
+        publisher = RingPublisher(capacity=1 << 18)
+        def publish() -> None:
+            for start in range(0, len(messages), PIPELINE_BATCH_SIZE):
+                publisher.publish_messages(messages[start:start + PIPELINE_BATCH_SIZE])
+            publisher.close()
+        fan_out_time, results = run_processes(_count_ring_records, (publisher.name,), subscribers, publish)
+        ring_time = parse_time + fan_out_time
+        lost = sum(records_lost for _, records_lost in results)
+        assert all(records + records_lost == len(messages) for records, records_lost in results)
+        print(f"{subscribers} subscriber(s): decode in each {decode_time * 1000:.0f} ms, decode once + ring {ring_time * 1000:.0f} ms "
+              f"({decode_time / ring_time:.2f}x); fan-out {subscribers * len(messages) / fan_out_time:.0f} records/s delivered, {lost} lost to overruns")
+    return True
+
+
+"""Vessels, duration (s) and reporting interval (s) of the synthetic tracks in the track archive benchmark"""
+TRACK_VESSEL_COUNT: int = 100
+TRACK_DURATION_S: int = 7200
+TRACK_REPORT_INTERVAL_S: float = 10.0
+
+
+def _armor(bits: str) -> str:
+    bits += "0" * (-len(bits) % 6)
+    return "".join(chr(value + 48 if value < 40 else value + 56) for value in (int(bits[start:start + 6], 2) for start in range(0, len(bits), 6)))
+
+
+def synthetic_position_log(vessels: int, duration: float, interval: float, seed: int = 1) -> List[str]:
+    """Tag-blocked type 1 position reports of vessels moving on slowly turning courses, in receive time order."""
+    import math
+    import random
+    from log_reader import nmea_checksum
+    rng = random.Random(seed)
+    states = [[rng.uniform(42.0, 42.5), rng.uniform(-71.0, -70.5), rng.uniform(0, 20), rng.uniform(0, 360), rng.uniform(0, interval)] for _ in range(vessels)]
+    reports = []
+    for index, (latitude, longitude, speed, course, offset) in enumerate(states):
+        for step in range(int(duration / interval)):
+            course = (course + rng.gauss(0, 2)) % 360
+            speed = min(max(speed + rng.gauss(0, 0.2), 0), 30)
+            distance = speed * interval / 3600 / 60
+            latitude += distance * math.cos(math.radians(course))
+            longitude += distance * math.sin(math.radians(course)) / math.cos(math.radians(latitude))
+            reports.append((1727481600 + offset + step * interval, 366000000 + index, latitude, longitude, speed, course))
+    reports.sort()
+    lines = []
+    for receive_time, mmsi, latitude, longitude, speed, course in reports:
+        bits = (f"{1:06b}{0:02b}{mmsi:030b}{0:04b}{128:08b}{round(speed * 10):010b}{1:01b}"
+                f"{round(longitude * 600000) & (2**28 - 1):028b}{round(latitude * 600000) & (2**27 - 1):027b}"
+                f"{round(course * 10) % 3600:012b}{round(course) % 360:09b}{int(receive_time) % 60:06b}{0:02b}{0:03b}{0:01b}{0:019b}")
+        sentence = f"AIVDM,1,1,,A,{_armor(bits)},0"
+        tags = f"s:rx1,c:{round(receive_time * 1000)}"
+        lines.append(f"\\{tags}*{nmea_checksum(tags)}\\!{sentence}*{nmea_checksum(sentence)}")
+    return lines
+
+
+@benchmark("track_archive")
+def benchmark_track_archive(args: argparse.Namespace) -> bool:
+    import gzip
+    from ais_decoder import parse_ais_messages
+    from track_archive import TrackArchiveReader, write_track_archive
+    lines = synthetic_position_log(TRACK_VESSEL_COUNT, TRACK_DURATION_S, TRACK_REPORT_INTERVAL_S)
+    nmea = ("\n".join(lines) + "\n").encode("ascii")
+    messages, _ = parse_ais_messages(lines)
+    with tempfile.TemporaryDirectory() as directory:
+        gzip_path = os.path.join(directory, "positions.nmea.gz")
+        archive_path = os.path.join(directory, "positions.trk")
+        with gzip.open(gzip_path, "wb") as f:
+            f.write(nmea)
+        write_time = time_call(lambda: write_track_archive(messages, archive_path), 1)
+        gzip_size, archive_size = os.path.getsize(gzip_path), os.path.getsize(archive_path)
+        print(f"{len(messages)} positions: NMEA {len(nmea) / 1e6:.2f} MB, gzip'd NMEA {gzip_size / 1e6:.2f} MB ({len(nmea) / gzip_size:.1f}:1), "
+              f"archive {archive_size / 1e6:.3f} MB ({len(nmea) / archive_size:.1f}:1, {gzip_size / archive_size:.1f}x smaller than gzip; "
+              f"{archive_size / len(messages):.2f} bytes/position, written in {write_time * 1000:.0f} ms)")
+
+        def read_gzip() -> None:
+            with gzip.open(gzip_path, "rt") as f:
+                parse_ais_messages(f.read().split("\n"))
+        gzip_time = time_call(read_gzip, 1)
+        with TrackArchiveReader(archive_path) as reader:
+            scan_time = time_call(lambda: sum(1 for _ in reader.read()), 1)
+            query_start = 1727481600 + TRACK_DURATION_S / 2
+            query_time = time_call(lambda: list(reader.read(366000042, query_start, query_start + 600)), 10)
+            reader.blocks_read = 0
+            points = list(reader.read(366000042, query_start, query_start + 600))
+        print(f"full scan: gunzip + decode {len(messages) / gzip_time:.0f} positions/s, archive {len(messages) / scan_time:.0f} positions/s "
+              f"({gzip_time / scan_time:.1f}x)")
+        print(f"one vessel, 10 minutes: {len(points)} positions from {reader.blocks_read} of {len(reader.index)} blocks in {query_time * 1000:.2f} ms")
+    return True
+
+
+@benchmark("delta_stream")
+def benchmark_delta_stream(args: argparse.Namespace) -> bool:
+    import gzip
+    from ais_decoder import json_default, parse_ais_messages
+    from delta_stream import DeltaEncoder, encode_json_lines
+    logs = {"sample": read_sentences(args.file_path),
+            "synthetic tracks": synthetic_position_log(TRACK_VESSEL_COUNT, TRACK_DURATION_S / 4, TRACK_REPORT_INTERVAL_S)}
+    for name, lines in logs.items():
+        messages = parse_ais_messages(lines)[0]
+        # Full records are the same records with every one a keyframe
+        full = encode_json_lines(DeltaEncoder(keyframe_every=1).encode_messages(messages), default=json_default).encode()
+        encoder = DeltaEncoder()
+        encode_time = time_call(lambda: DeltaEncoder().encode_messages(messages), 1)
+        delta = encode_json_lines(encoder.encode_messages(messages), default=json_default).encode()
+        full_gzip, delta_gzip = len(gzip.compress(full)), len(gzip.compress(delta))
+        print(f"{name} ({len(messages)} messages, {encoder.keyframes} keyframes): full {len(full) / len(messages):.1f} bytes/message, "
+              f"delta {len(delta) / len(messages):.1f} bytes/message ({len(full) / len(delta):.1f}x); gzip'd {full_gzip / len(messages):.1f} vs "
+              f"{delta_gzip / len(messages):.1f} bytes/message ({full_gzip / delta_gzip:.1f}x); encoding {encode_time * 1e6 / len(messages):.2f} us/message")
+    return True
+
+
+"""Feed rate of the priority lanes benchmark, as a multiple of the measured decode throughput, and its duration"""
+OVERLOAD_FACTOR: float = 2.0
+OVERLOAD_DURATION_S: float = 3.0
+
+
+def safety_message(mmsi: int, text: str) -> str:
+    """A type 14 safety-related broadcast sentence."""
+    from log_reader import nmea_checksum
+    bits = f"{14:06b}{0:02b}{mmsi:030b}{0:02b}" + "".join(f"{(ord(character) - 64) % 64:06b}" for character in text.upper())
+    sentence = f"AIVDM,1,1,,A,{_armor(bits)},0"
+    return f"!{sentence}*{nmea_checksum(sentence)}"
+
+
+@benchmark("priority_lanes")
+def benchmark_priority_lanes(args: argparse.Namespace) -> bool:
+    from ais_decoder import parse_ais_messages
+    from pipeline import run_pipeline
+    from priority_lanes import SheddingPolicy
+    sample = [line for line in read_sentences(args.file_path) if line]
+    decode_rate = len(sample) / time_call(lambda: parse_ais_messages(sample), 3)
+    feed_rate = decode_rate * OVERLOAD_FACTOR
+    # Each sentence heard by two receivers, with a safety broadcast every 1000 lines
+    lines = []
+    for index in range(int(feed_rate * OVERLOAD_DURATION_S)):
+        if index % 1000 == 999:
+            lines.append(safety_message(970000000 + index, f"SART TEST {index}"))
+        else:
+            lines.append(sample[(index // 2) % len(sample)])
+
+    for shedding in (None, SheddingPolicy()):
+        start_time = time.perf_counter()
+        def feed():
+            # Sentences are available at feed_rate; latency is measured from the time each would have arrived
+            for index, line in enumerate(lines):
+                while time.perf_counter() - start_time < index / feed_rate:
+                    time.sleep(0.001)
+                yield line
+        safety_latencies: List[float] = []
+        def write(messages: List) -> None:
+            now = time.perf_counter()
+            for message in messages:
+                if message.message_type_int == 14:
+                    safety_latencies.append(now - start_time - (int(message.payload_info["MMSI"]) - 970000000) / feed_rate)
+        stats = run_pipeline(feed(), write, shedding=shedding)
+        dropped = ", ".join(f"{category} {count}" for category, count in sorted(stats.lanes.dropped.items())) if stats.lanes else "none"
+        print(f"{'priority lanes' if shedding else 'FIFO'}: {len(lines)} lines at {feed_rate:.0f}/s ({OVERLOAD_FACTOR:.0f}x decode throughput) "
+              f"done in {stats.elapsed:.2f} s, {stats.messages} messages decoded; safety latency mean {mean(safety_latencies) * 1000:.0f} ms, "
+              f"max {max(safety_latencies) * 1000:.0f} ms; shed: {dropped}")
+    return True
+
+
+"""Vessels with a latest position and static data in the snapshot benchmark, and its restore time budget"""
+SNAPSHOT_VESSEL_COUNT: int = 200000
+SNAPSHOT_RESTORE_BUDGET_S: float = 2.0
+
+
+@benchmark("snapshot")
+def benchmark_snapshot(args: argparse.Namespace) -> bool:
+    import random
+    from stream_decoder import StreamDecoder, VesselPosition
+    rng = random.Random(1)
+    decoder = StreamDecoder()
+    for index in range(SNAPSHOT_VESSEL_COUNT):
+        mmsi = 200000000 + index
+        decoder.latest[mmsi] = VesselPosition(1727481600.0 + rng.random() * 3600, 1, rng.uniform(-60, 60), rng.uniform(-180, 180),
+                                              rng.uniform(0, 25), rng.uniform(0, 360), rng.randrange(360), rng.randrange(16))
+        decoder.static[mmsi] = {"AIS Version": 0, "IMO Number": 9000000 + index, "Call Sign": f"C{index:06d}", "Vessel Name": f"VESSEL {index}",
+                                "Type of Ship and Cargo": rng.randrange(20, 100), "Dimensions to Bow": 100, "Dimensions to Stern": 20,
+                                "Dimensions to Port": 10, "Dimensions to Starboard": 10, "Position Fixing Device": 1, "ETA Month": 9,
+                                "ETA Day": 28, "ETA Hour": 12, "ETA Minute": 0, "Draught": 7.5, "Destination": "ROTTERDAM"}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "decoder.snapshot")
+        start_time = time.perf_counter()
+        size = decoder.snapshot(path)
+        snapshot_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        restored = StreamDecoder.restore(path)
+        restore_time = time.perf_counter() - start_time
+    assert restored.latest == decoder.latest and restored.static == decoder.static
+    print(f"{SNAPSHOT_VESSEL_COUNT} vessels: snapshot {snapshot_time * 1000:.0f} ms, {size / 1e6:.1f} MB; "
+          f"restart to ready {restore_time * 1000:.0f} ms (budget {SNAPSHOT_RESTORE_BUDGET_S:.1f} s) {'OK' if restore_time <= SNAPSHOT_RESTORE_BUDGET_S else 'OVER BUDGET'}")
+    return restore_time <= SNAPSHOT_RESTORE_BUDGET_S
+
+
+"""Vessel count and time budget of the CPA screening benchmark"""
+CPA_VESSEL_COUNT: int = 50000
+CPA_TIME_BUDGET_S: float = 1.0
+
+
+@benchmark("cpa")
+def benchmark_cpa(args: argparse.Namespace) -> bool:
+    from cpa import np, screen_cpa
+    if np is None:
+        print("skipped: numpy is not installed")
+        return True
+    # Synthetic picture over European waters: 30% of vessels stationary, the rest at up to 25 knots
+    generator = np.random.default_rng(0)
+    latitude = generator.uniform(35, 65, CPA_VESSEL_COUNT)
+    longitude = generator.uniform(-10, 30, CPA_VESSEL_COUNT)
+    speed = np.where(generator.random(CPA_VESSEL_COUNT) < 0.3, 0.0, generator.uniform(0, 25, CPA_VESSEL_COUNT))
+    course = generator.uniform(0, 360, CPA_VESSEL_COUNT)
+    pair_count = len(screen_cpa(latitude, longitude, speed, course).cpa)
+    screen_time = time_call(lambda: screen_cpa(latitude, longitude, speed, course), max(args.iterations // 10, 1))
+    passed = screen_time <= CPA_TIME_BUDGET_S
+    print(f"screen_cpa over {CPA_VESSEL_COUNT} vessels: {screen_time * 1000:.2f} ms, {pair_count} pairs under 1 NM within 20 min "
+          f"(budget {CPA_TIME_BUDGET_S:.0f} s) {'OK' if passed else 'OVER BUDGET'}")
+    return passed
+
+
+"""Fence and position counts of the geofence benchmark"""
+GEOFENCE_COUNT: int = 5000
+GEOFENCE_POSITION_COUNT: int = 20000
+
+
+@benchmark("geofence")
+def benchmark_geofence(args: argparse.Namespace) -> bool:
+    import math
+    import random
+    from geofence import Geofence, GeofenceIndex, np
+    generator = random.Random(0)
+    fences = []
+    for fence_index in range(GEOFENCE_COUNT):
+        # Irregular 12-gons of up to ~20 km radius scattered over European waters
+        centre_longitude, centre_latitude = generator.uniform(-10, 30), generator.uniform(35, 65)
+        ring = [(centre_longitude + generator.uniform(0.05, 0.3) * math.cos(angle), centre_latitude + generator.uniform(0.05, 0.2) * math.sin(angle))
+                for angle in (step * math.pi / 6 for step in range(12))]
+        fences.append(Geofence(str(fence_index), [[ring]]))
+    positions = [(generator.uniform(-10, 30), generator.uniform(35, 65)) for _ in range(GEOFENCE_POSITION_COUNT)]
+    index = GeofenceIndex(fences)
+    iterations = max(args.iterations // 25, 1)
+    indexed_time = time_call(lambda: [index.containing(longitude, latitude) for longitude, latitude in positions], iterations)
+    linear_time = time_call(lambda: [[fence for fence in fences if fence.contains(longitude, latitude)] for longitude, latitude in positions[:1000]], 1) \
+        * GEOFENCE_POSITION_COUNT / 1000
+    print(f"{GEOFENCE_POSITION_COUNT} positions against {GEOFENCE_COUNT} fences: indexed {indexed_time * 1e6 / GEOFENCE_POSITION_COUNT:.2f} us/position, "
+          f"linear scan {linear_time * 1e6 / GEOFENCE_POSITION_COUNT:.2f} us/position ({linear_time / indexed_time:.1f}x)")
+    if np is not None:
+        longitudes, latitudes = np.array(positions).T
+        batch_time = time_call(lambda: index.containing_points(longitudes, latitudes), iterations)
+        print(f"batch (numpy): {batch_time * 1e6 / GEOFENCE_POSITION_COUNT:.2f} us/position")
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AIS Decoder benchmark suite")
+    parser.add_argument("benchmarks", nargs="*", help=f"Benchmarks to run (default: all). Available: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--file_path", default=DEFAULT_SAMPLE_FILE, help="Path to the file containing AIS messages")
+    parser.add_argument("--iterations", type=int, default=50, help="Number of iterations per benchmark (default: 50)")
+    args = parser.parse_args()
+
+    passed = True
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"-- {name} --")
+        passed = BENCHMARKS[name](args) and passed
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
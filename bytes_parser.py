@@ -0,0 +1,133 @@
+# bytes_parser.py -- sentence parsing directly on bytes (e.g. lines read from sockets or files opened in binary mode)
+import binascii
+from ais_decoder import decode_payload_groups
+from errors import ErrorCode, DecodeError, ErrorStats
+from tag_block import parse_tag_block
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+def _build_armor_to_base64() -> bytes:
+    """
+    bytes.translate table mapping each armored payload character to the base64 character with the same six-bit
+    value, so a payload can be unarmored by one translate and one base64 decode. Invalid characters map to "!".
+    """
+    base64_alphabet = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+    table = bytearray(b"!" * 256)
+    # Same character range and values as PAYLOAD_BINARY_LOOKUP
+    for character in range(48, 120):
+        table[character] = base64_alphabet[character - 48 if character - 48 < 40 else character - 56]
+    return bytes(table)
+
+
+"""bytes.translate table from armored payload characters to base64 (see _build_armor_to_base64)"""
+ARMOR_TO_BASE64: bytes = _build_armor_to_base64()
+
+"""Parsed sentence: (fragment count, fragment number, sequence ID, channel, payload bit string)"""
+SentenceFields = Tuple[int, int, bytes, bytes, str]
+
+
+def payload_to_bits(payload: bytes) -> Optional[str]:
+    """Convert an armored payload to a bit string (as get_payload_binary does for str). Returns None if it is empty or invalid."""
+    character_count = len(payload)
+    padding = -character_count % 4
+    try:
+        # a2b_base64 skips the "!" of invalid characters, which shows up as missing output bytes
+        data = binascii.a2b_base64(payload.translate(ARMOR_TO_BASE64) + b"A" * padding)
+    except binascii.Error:
+        return None
+    if not character_count or len(data) * 4 != (character_count + padding) * 3:
+        return None
+    return bin(int.from_bytes(data, "big") >> (6 * padding))[2:].zfill(6 * character_count)
+
+
+def parse_sentence_bytes(line: Union[bytes, memoryview]) -> Union[SentenceFields, ErrorCode]:
+    """
+    Parse one sentence (optionally tag-blocked) with a single split at its first six commas, with the same
+    acceptance rules as AISMessage.extract_sentence_components.
+
+    Returns:
+    Union[SentenceFields, ErrorCode]: (fragment count, fragment number, sequence ID, channel, payload bits),
+    or the reason the sentence was rejected.
+    """
+    if isinstance(line, memoryview):
+        line = line.tobytes()
+    if line[:1] == b"\\":
+        end = line.find(b"\\", 1)
+        if end != -1:
+            line = line[end + 1:]
+    sentence_parts = line.split(b",", 6)
+    if len(sentence_parts) < 7:
+        return ErrorCode.MALFORMED_SENTENCE
+    _, fragment_count, fragment_number, sequence_id, channel, encoded_payload, checksum = sentence_parts
+    if b"*" not in checksum:
+        return ErrorCode.MALFORMED_SENTENCE
+    if fragment_count == b"1" and fragment_number == b"1":
+        fragment_count = fragment_number = 1
+    elif fragment_count.isdigit() and fragment_number.isdigit():
+        fragment_count, fragment_number = int(fragment_count), int(fragment_number)
+    else:
+        return ErrorCode.MALFORMED_SENTENCE
+    payload = payload_to_bits(encoded_payload)
+    if payload is None:
+        return ErrorCode.INVALID_PAYLOAD
+    return (fragment_count, fragment_number, sequence_id, channel, payload)
+
+
+def decode_batch_bytes(lines: Iterable[Union[bytes, memoryview]], group_by_type: bool = False, error_stats: Optional[ErrorStats] = None,
+                       fields: Optional[Sequence[str]] = None, raw: bool = False) -> Union[List[Tuple[int, Dict]], Dict[int, List[Dict]]]:
+    """
+    decode_batch for bytes input: sentences are never decoded to str (except to report errors), and the armored
+    payload goes straight to a bit string. Results match decode_batch on the decoded lines (multipart fragments are
+matched by tag block group ID, or by channel and sequence ID); sentences are accepted
+    by the same rules as AISMessage (numeric fragment fields, a checksum delimiter).
+
+    Args:
+    lines (Iterable[Union[bytes, memoryview]]): Sentences, optionally prefixed with tag blocks. Trailing CR/LF is ignored.
+    group_by_type, error_stats, fields, raw: As for decode_batch.
+    """
+    payloads_by_type: Dict[int, List[Tuple[int, str]]] = {}
+    pending_fragments: Dict[Tuple[Optional[bytes], Union[bytes, str]], List[str]] = {}
+    message_count = 0
+    for line in lines:
+        if not line or line in (b"\n", b"\r\n"):
+            continue
+        fields_or_error = parse_sentence_bytes(line)
+        if fields_or_error.__class__ is ErrorCode:
+            if error_stats is not None:
+                error_stats.record(DecodeError(fields_or_error, bytes(line).decode("ascii", errors="replace").rstrip("\r\n")))
+            continue
+        fragment_count, fragment_number, sequence_id, channel, payload = fields_or_error
+        if fragment_count != 1:
+            group_id = None
+            if line[:1] == b"\\":
+                line = bytes(line)
+                end = line.find(b"\\", 1)
+                if end != -1:
+                    group_id = parse_tag_block(line[1:end].decode("ascii", errors="replace")).get("group_id")
+            fragment_key = (channel, sequence_id) if group_id is None else (None, group_id)
+            if fragment_number == 1:
+                pending_fragments[fragment_key] = [payload]
+                continue
+            fragments = pending_fragments.get(fragment_key)
+            if fragments is None or fragment_number != len(fragments) + 1:
+                pending_fragments.pop(fragment_key, None)
+                if error_stats is not None:
+                    error_stats.record(DecodeError(ErrorCode.NON_SEQUENTIAL_FRAGMENT, bytes(line).decode("ascii", errors="replace").rstrip("\r\n")))
+                continue
+            fragments.append(payload)
+            if fragment_number != fragment_count:
+                continue
+            payload = "".join(pending_fragments.pop(fragment_key))
+        message_type = int(payload[:6], 2)
+        group = payloads_by_type.get(message_type)
+        if group is None:
+            group = payloads_by_type[message_type] = []
+        group.append((message_count, payload))
+        message_count += 1
+    return decode_payload_groups(payloads_by_type, message_count, group_by_type, error_stats, fields, raw)
+
+
+def read_lines_bytes(path: str) -> Iterator[bytes]:
+    """Lines of a file opened in binary mode."""
+    with open(path, "rb") as f:
+        yield from f
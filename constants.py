@@ -1,4 +1,6 @@
-from typing import Optional, Union, List, Dict, Any
+import sys
+from functools import lru_cache
+from typing import Optional, Union, List, Dict, Any, Tuple, Callable, Sequence, FrozenSet
 
 
 # -- Constants --
@@ -85,6 +87,9 @@ MESSAGE_TYPES: List[str] = [
     "Long Range AIS Broadcast Message"
 ]
 
+"""Message types carrying a vessel position (class A and B position reports, SAR aircraft, long range broadcasts)"""
+POSITION_REPORT_TYPES: FrozenSet[int] = frozenset({1, 2, 3, 9, 18, 19, 27})
+
 NAVIGATION_STATUS: List[str] = [
     "Under way (Power)",
     "At anchor",
@@ -198,11 +203,51 @@ PAYLOAD_BINARY_LOOKUP: Dict[str, str] = {
     for i in range(48, 120)  # '0' to 'w' in ASCII
 }
 
+"""str.translate table mapping armored payload characters to their six-bit strings; all other ASCII characters are deleted"""
+PAYLOAD_BINARY_TRANSLATION: Dict[int, Optional[str]] = {
+    **{i: None for i in range(128)},
+    **{ord(character): bits for character, bits in PAYLOAD_BINARY_LOOKUP.items()}
+}
+
 BINARY_ASCII_LOOKUP: Dict[str, str] = {
-    bin(i)[2:].zfill(6): chr(i + 64 if i < 31  else i )
+    bin(i)[2:].zfill(6): chr(i + 64 if i < 32 else i)
     for i in range(64)  # 0 to 63
 }
 
+"""Six-bit ASCII characters, indexed by their 6-bit value"""
+SIXBIT_ASCII_TABLE: str = "".join(chr(i + 64 if i < 32 else i) for i in range(64))
+
+"""Maximum number of distinct raw text fields kept in the decoded text cache"""
+TEXT_FIELD_CACHE_SIZE: int = 16384
+
+
+"""
+Field layout of a message type: {field name: (start bit, end bit or None for the end of the payload, kind, conversion)}.
+Kind is "u" (unsigned integer), "s" (signed integer) or "t" (six-bit text); the conversion is applied to the integer
+value. Full decoders and projected decoders (see decoders/projection.py) both read their fields through
+compile_field_layout, so the layout is the only place a field's bit range is written.
+"""
+FieldLayout = Dict[str, Tuple[int, Optional[int], str, Optional[Callable]]]
+
+"""
+Scaling of the raw integers of a message type whose fields use other units than RAW_FIELDS (e.g. type 27 positions
+in 1/10 minute): {field name: function from the transmitted integer to the common raw units}. Applied before the
+layout's conversion, which then takes the common raw units.
+"""
+RawScaling = Dict[str, Callable[[int], int]]
+
+
+"""
+Fields kept as integers in raw mode: latitude/longitude in 1/10000 minute (fit in int32), SOG/COG in tenths of
+a knot/degree (fit in int16). Sentinels are the raw encodings of "not available" in these units. Message types
+transmitting other units declare a RawScaling to them.
+"""
+RAW_FIELDS: Tuple[str, ...] = ("Longitude", "Latitude", "Speed Over Ground", "Course Over Ground")
+RAW_LONGITUDE_NOT_AVAILABLE: int = 181 * 600000
+RAW_LATITUDE_NOT_AVAILABLE: int = 91 * 600000
+RAW_SPEED_OVER_GROUND_NOT_AVAILABLE: int = 1023
+RAW_COURSE_OVER_GROUND_NOT_AVAILABLE: int = 3600
+
 
 # -- Utility Functions --
     
@@ -216,8 +261,7 @@ def safe_int(value: Optional[str], base: int = 2, signed: bool = False) -> int:
                     return int(value, base)
             else:
                 return int(value, base)
-        except Exception as e:
-            print("Error: ", e)
+        except (ValueError, IndexError):
             return -1
     else:
         return -1
@@ -232,6 +276,19 @@ def get_val(val: Any) -> Union[str, Any]:
     else:
         return val
 
+def bitstring_to_bytes(bitstring: Optional[str]) -> bytes:
+    """Pack a bit string into bytes. The final byte is zero-padded on the right."""
+    if not bitstring:
+        return b""
+    padding = -len(bitstring) % 8
+    return int(bitstring + "0" * padding, 2).to_bytes((len(bitstring) + padding) // 8, "big")
+
+def bytes_to_bitstring(data: bytes, bit_length: int) -> str:
+    """Inverse of bitstring_to_bytes: unpack the first `bit_length` bits of `data` into a bit string."""
+    if not data:
+        return ""
+    return format(int.from_bytes(data, "big"), f"0{len(data) * 8}b")[:bit_length]
+
 def error_tuple(error):
     return ({"Error": error}, {"Error": error})
 
@@ -307,6 +364,62 @@ def bitstring_to_ascii(bitstring: str) -> str:
         return "Missing from AIS message"
     return "".join(map(lambda x: BINARY_ASCII_LOOKUP.get(x,'') if isinstance(x,str) else '', [bitstring[i:i+6] for i in range(0, len(bitstring), 6)]))    
 
+@lru_cache(maxsize=TEXT_FIELD_CACHE_SIZE)
+def _decode_text_bits(bitstring: str) -> str:
+    char_count = len(bitstring) // 6
+    if char_count == 0:
+        return ""
+    value = int(bitstring[:char_count * 6], 2)
+    text = "".join([SIXBIT_ASCII_TABLE[(value >> shift) & 0x3F] for shift in range(6 * (char_count - 1), -1, -6)])
+    return sys.intern(text.split("@", 1)[0].strip())
+
+def decode_text_field(bitstring: Optional[str]) -> str:
+    """
+    Decode a six-bit text field (vessel name, call sign, destination...), stripping "@" padding and whitespace.
+
+    Results are interned and cached by raw bits, so a repeated name costs a dict lookup and every
+    message carrying it shares one string object.
+    """
+    if bitstring is None:
+        return "Missing from AIS message"
+    return _decode_text_bits(bitstring)
+
+def compile_field_layout(layout: FieldLayout, fields: Optional[Sequence[str]] = None, raw: bool = False,
+                         raw_scaling: Optional[RawScaling] = None) -> Callable[[str], Dict]:
+    """
+    Build a function decoding the fields of a layout from a binary payload.
+
+    Args:
+    layout (FieldLayout): The message type's field layout.
+    fields (Optional[Sequence[str]]): The fields to decode, in this order (all fields of the layout if None).
+    raw (bool): Skip the conversions of RAW_FIELDS, keeping their integer values.
+    raw_scaling (Optional[RawScaling]): Scaling of the message type's integers to the common raw units.
+
+    Returns:
+    Callable[[str], Dict]: Maps a binary payload to {field: value}. Missing bits decode like safe_int(None).
+    """
+    raw_scaling = raw_scaling or {}
+    field_specs = [(field, start, end, kind, raw_scaling.get(field), None if raw and field in RAW_FIELDS else convert)
+                   for field, (start, end, kind, convert) in ((field, layout[field]) for field in (layout if fields is None else fields) if field in layout)]
+
+    def decode_fields(binary_string: str) -> Dict:
+        length = len(binary_string)
+        decoded_data = {}
+        for field, start, end, kind, scale, convert in field_specs:
+            if end is None:
+                end = length
+            segment = binary_string[start:end] if length >= end else None
+            if kind == "t":
+                decoded_data[field] = decode_text_field(segment)
+            else:
+                value = safe_int(segment, signed=(kind == "s"))
+                if scale is not None:
+                    value = scale(value)
+                decoded_data[field] = convert(value) if convert is not None else value
+        return decoded_data
+
+    return decode_fields
+
 def speed_over_ground_to_string(sog: Union[int, float]) -> str:
     if sog == -1:
         return "Missing from AIS message"
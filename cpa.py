@@ -0,0 +1,166 @@
+# cpa.py -- closest point of approach (CPA/TCPA) screening over the current vessel picture (requires numpy)
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+"""Mean Earth radius in metres"""
+EARTH_RADIUS_METRES: float = 6371008.8
+
+KNOTS_TO_METRES_PER_SECOND: float = 1852 / 3600
+
+"""Default CPA threshold (1 nautical mile) and look-ahead horizon (20 minutes)"""
+DEFAULT_CPA_THRESHOLD_METRES: float = 1852.0
+DEFAULT_TIME_HORIZON_SECONDS: float = 1200.0
+
+"""Pairs in which both vessels are slower than this (in knots) are not screened"""
+DEFAULT_MIN_SPEED_KNOTS: float = 0.5
+
+"""Speeds above this (in knots) are treated as not available, including the 102.2/102.3 and 1022/1023 sentinels"""
+MAX_VALID_SPEED_KNOTS: float = 102.2
+
+"""Message types reporting position, SOG and COG"""
+CPA_MESSAGE_TYPES = frozenset({1, 2, 3, 18, 19})
+
+"""Latitude (degrees) up to which grid cells are guaranteed to be wide enough. Pairs closer to the poles may be missed."""
+MAX_GRID_LATITUDE: float = 85.0
+
+"""Neighbouring grid cells searched for each cell. Only half of the neighbourhood is needed, as pairs are unordered."""
+NEIGHBOUR_OFFSETS: Tuple[Tuple[int, int], ...] = ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+class CPAResult(NamedTuple):
+    """Pairs of vessels (indices into the input arrays) predicted to come within the CPA threshold, with CPA in metres and TCPA in seconds."""
+    index_a: "np.ndarray"
+    index_b: "np.ndarray"
+    cpa: "np.ndarray"
+    tcpa: "np.ndarray"
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise ImportError("CPA screening requires numpy (pip install numpy)")
+
+
+def vessel_arrays(messages: Iterable) -> Dict[str, "np.ndarray"]:
+    """
+    Build CPA input arrays from decoded AISMessage objects, using the latest position report of each MMSI.
+
+    Returns:
+    Dict[str, np.ndarray]: "mmsi", "latitude", "longitude" (degrees), "speed" (knots) and "course" (degrees) arrays.
+    Vessels without a valid position are left out; unavailable speed or course is reported as NaN.
+    """
+    require_numpy()
+    latest: Dict[int, Tuple[float, float, float, float]] = {}
+    for message in messages:
+        payload_info = message.payload_info
+        if message.message_type_int not in CPA_MESSAGE_TYPES or "Error" in payload_info:
+            continue
+        latitude, longitude = payload_info.get("Latitude"), payload_info.get("Longitude")
+        if latitude is None or longitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            continue
+        latest[payload_info["MMSI"]] = (latitude, longitude, payload_info.get("Speed Over Ground", -1), payload_info.get("Course Over Ground", -1))
+    values = np.array(list(latest.values()), dtype=np.float64).reshape(-1, 4)
+    speed, course = values[:, 2], values[:, 3]
+    return {
+        "mmsi": np.fromiter(latest.keys(), dtype=np.int64, count=len(latest)),
+        "latitude": values[:, 0],
+        "longitude": values[:, 1],
+        "speed": np.where((speed >= 0) & (speed < MAX_VALID_SPEED_KNOTS), speed, np.nan),
+        "course": np.where((course >= 0) & (course < 360), course, np.nan),
+    }
+
+
+def _candidate_pairs(x: "np.ndarray", y: "np.ndarray", cell_size: float) -> Tuple["np.ndarray", "np.ndarray"]:
+    """All pairs (i < j) of points in the same or adjacent grid cells of size `cell_size`, without a Python-level loop over points."""
+    cell_x = np.floor(x / cell_size).astype(np.int64)
+    cell_y = np.floor(y / cell_size).astype(np.int64)
+    order = np.argsort(cell_x * (1 << 32) + cell_y, kind="stable")
+    cell_x, cell_y = cell_x[order], cell_y[order]
+    sorted_keys = cell_x * (1 << 32) + cell_y
+    count = len(order)
+    pairs_a, pairs_b = [], []
+    for offset_x, offset_y in NEIGHBOUR_OFFSETS:
+        neighbour_keys = (cell_x + offset_x) * (1 << 32) + (cell_y + offset_y)
+        starts = np.searchsorted(sorted_keys, neighbour_keys, side="left")
+        counts = np.searchsorted(sorted_keys, neighbour_keys, side="right") - starts
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        a = np.repeat(np.arange(count), counts)
+        b = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        if (offset_x, offset_y) == (0, 0):
+            keep = a < b
+            a, b = a[keep], b[keep]
+        pairs_a.append(a)
+        pairs_b.append(b)
+    if not pairs_a:
+        empty = np.empty(0, dtype=np.int64)
+        return (empty, empty)
+    a, b = order[np.concatenate(pairs_a)], order[np.concatenate(pairs_b)]
+    return (np.minimum(a, b), np.maximum(a, b))
+
+
+def screen_cpa(latitude: "np.ndarray", longitude: "np.ndarray", speed: "np.ndarray", course: "np.ndarray",
+               cpa_threshold: float = DEFAULT_CPA_THRESHOLD_METRES, time_horizon: float = DEFAULT_TIME_HORIZON_SECONDS,
+               min_speed: float = DEFAULT_MIN_SPEED_KNOTS, max_speed: Optional[float] = None) -> CPAResult:
+    """
+    Find vessel pairs whose closest point of approach within `time_horizon` seconds is under `cpa_threshold` metres.
+
+    Vessels are assumed to keep their current speed and course. Candidate pairs are pruned with a grid whose cells
+    are as large as the distance two vessels can close within the horizon, then CPA/TCPA is computed for all
+    surviving pairs at once on a local flat-earth approximation. Vessels with unavailable (NaN) speed or course
+    are treated as stationary. Pairs straddling the antimeridian are not screened.
+
+    Args:
+    latitude, longitude (np.ndarray): Positions in degrees.
+    speed (np.ndarray): Speed over ground in knots.
+    course (np.ndarray): Course over ground in degrees.
+    cpa_threshold (float): CPA distance in metres under which a pair is reported.
+    time_horizon (float): Look-ahead in seconds. Pairs already closer than the threshold are reported with TCPA 0.
+    min_speed (float): Pairs in which both vessels are slower than this (knots) are skipped.
+    max_speed (Optional[float]): Upper bound on vessel speed in knots used to size the grid. Defaults to the fastest vessel.
+
+    Returns:
+    CPAResult: Matching pairs, ordered by TCPA.
+    """
+    require_numpy()
+    latitude = np.asarray(latitude, dtype=np.float64)
+    longitude = np.asarray(longitude, dtype=np.float64)
+    moving = np.isfinite(speed) & np.isfinite(course)
+    speed = np.where(moving, speed, 0.0) * KNOTS_TO_METRES_PER_SECOND
+    course_radians = np.radians(np.where(moving, course, 0.0))
+    velocity_x, velocity_y = speed * np.sin(course_radians), speed * np.cos(course_radians)
+
+    latitude_radians, longitude_radians = np.radians(latitude), np.radians(longitude)
+    fastest = max_speed * KNOTS_TO_METRES_PER_SECOND if max_speed is not None else (float(speed.max()) if len(speed) else 0.0)
+    # Grid in radians: a cell spans the search distance in latitude, and at least that distance in longitude up to the
+    # highest latitude in the data, so every pair within range falls in the same or adjacent cells
+    search_distance = cpa_threshold + 2 * fastest * time_horizon
+    highest_latitude = min(float(np.abs(latitude).max()) if len(latitude) else 0.0, MAX_GRID_LATITUDE)
+    grid_y = latitude_radians / (search_distance / EARTH_RADIUS_METRES)
+    grid_x = longitude_radians / (search_distance / (EARTH_RADIUS_METRES * np.cos(np.radians(highest_latitude))))
+    a, b = _candidate_pairs(grid_x, grid_y, 1.0)
+
+    slow = min_speed * KNOTS_TO_METRES_PER_SECOND
+    keep = (speed[a] >= slow) | (speed[b] >= slow)
+    a, b = a[keep], b[keep]
+
+    # Relative position and velocity of b with respect to a, in metres on a plane tangent at the pair's mean latitude
+    relative_x = EARTH_RADIUS_METRES * (np.remainder(longitude_radians[b] - longitude_radians[a] + np.pi, 2 * np.pi) - np.pi) \
+        * np.cos((latitude_radians[a] + latitude_radians[b]) / 2)
+    relative_y = EARTH_RADIUS_METRES * (latitude_radians[b] - latitude_radians[a])
+    relative_velocity_x = velocity_x[b] - velocity_x[a]
+    relative_velocity_y = velocity_y[b] - velocity_y[a]
+    relative_speed_squared = relative_velocity_x ** 2 + relative_velocity_y ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tcpa = np.where(relative_speed_squared > 0, -(relative_x * relative_velocity_x + relative_y * relative_velocity_y) / relative_speed_squared, 0.0)
+    tcpa = np.clip(tcpa, 0.0, None)
+    cpa = np.hypot(relative_x + relative_velocity_x * tcpa, relative_y + relative_velocity_y * tcpa)
+
+    match = (cpa <= cpa_threshold) & (tcpa <= time_horizon)
+    order = np.argsort(tcpa[match], kind="stable")
+    return CPAResult(a[match][order], b[match][order], cpa[match][order], tcpa[match][order])
@@ -0,0 +1,136 @@
+# csv_sink.py -- CSV output with one file per message type and a fixed header per type
+import csv
+import gzip
+import os
+from operator import itemgetter
+from decoders import DECODER_REGISTRY
+from typing import Any, Callable, Dict, IO, Iterable, Optional, Sequence, Tuple
+
+
+"""Buffer size of each output file"""
+DEFAULT_BUFFER_SIZE: int = 1 << 20
+
+"""gzip compression level; level 6 compresses AIS text nearly as well as 9 at a fraction of the cost"""
+DEFAULT_COMPRESS_LEVEL: int = 6
+
+"""Message-level columns prepended to every file"""
+MESSAGE_COLUMNS: Tuple[str, ...] = ("Receive Time", "Source")
+
+
+def file_name(message_type: int, compress: bool = False) -> str:
+    return f"type_{message_type}.csv" + (".gz" if compress else "")
+
+
+def _row_getter(columns: Tuple[str, ...]) -> Callable[[Dict], Tuple]:
+    """The values of `columns` in a payload, as a tuple. Raises KeyError if one is missing."""
+    if len(columns) > 1:
+        return itemgetter(*columns)
+    return lambda payload_info: tuple(payload_info[column] for column in columns)
+
+
+class CSVSink:
+    """
+    Writes decoded messages to CSV, one file per message type ("type_1.csv", "type_5.csv", ...) in `directory`.
+
+    The header of each file lists every field the decoder can produce (its FIELD_LAYOUT or FIELDS, restricted to
+    `fields` if decoding was projected) and stays fixed: fields missing from a record, such as the part B fields of
+    a type 24 part A, are written as empty values. Types whose decoder declares neither need `fields`. Values are written from payload_info (numbers, not their stringified form) through a buffered
+    csv.writer per file, which formats them (None as an empty value, anything else with str()).
+
+    Args:
+    directory (str): Output directory, created if needed. Existing files of the same name are overwritten.
+    fields (Optional[Sequence[str]]): The fields the messages were decoded with, if projected.
+    compress (bool): Write gzip-compressed files ("type_1.csv.gz").
+    buffer_size (int): Buffer size of each file.
+    compress_level (int): gzip compression level.
+    """
+
+    def __init__(self, directory: str, fields: Optional[Sequence[str]] = None, compress: bool = False,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE, compress_level: int = DEFAULT_COMPRESS_LEVEL):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fields = list(fields) if fields else None
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self.compress_level = compress_level
+        self.rows_written: int = 0
+        self.rows_skipped: int = 0
+        self._columns: Dict[int, Tuple[str, ...]] = {}
+        self._files: Dict[int, IO[str]] = {}
+        self._writers: Dict[int, Any] = {}
+        self._getters: Dict[int, Callable[[Dict], Tuple]] = {}
+
+    def __enter__(self) -> 'CSVSink':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def path(self, message_type: int) -> str:
+        return os.path.join(self.directory, file_name(message_type, self.compress))
+
+    def _header(self, message_type: int) -> Tuple[str, ...]:
+        declared = DECODER_REGISTRY.get_fields(message_type)
+        if declared is not None:
+            return tuple(field for field in self.fields if field in declared) if self.fields else declared
+        if self.fields:
+            return tuple(self.fields)
+        raise ValueError(f"The decoder of message type {message_type} declares no FIELD_LAYOUT or FIELDS; pass `fields` to write it to CSV")
+
+    def _open(self, message_type: int) -> None:
+        columns = self._header(message_type)
+        if self.compress:
+            f = gzip.open(self.path(message_type), "wt", newline="", compresslevel=self.compress_level)
+        else:
+            f = open(self.path(message_type), "w", newline="", buffering=self.buffer_size)
+        self._columns[message_type] = columns
+        self._getters[message_type] = _row_getter(columns)
+        self._files[message_type] = f
+        self._writers[message_type] = csv.writer(f)
+        self._writers[message_type].writerow(MESSAGE_COLUMNS + self._columns[message_type])
+
+    def write(self, message_type: int, payload_info: Dict, receive_time: Optional[float] = None, source: Optional[str] = None) -> None:
+        """Write one decoded payload. Payloads that failed to decode ({"Error": ...}) are counted in rows_skipped."""
+        if "Error" in payload_info:
+            self.rows_skipped += 1
+            return
+        if message_type not in self._writers:
+            self._open(message_type)
+        try:
+            values = self._getters[message_type](payload_info)
+        except KeyError:
+            values = tuple(payload_info.get(column) for column in self._columns[message_type])
+        self._writers[message_type].writerow((receive_time, source) + values)
+        self.rows_written += 1
+
+    def write_messages(self, messages: Iterable) -> None:
+        """Write decoded AISMessage objects."""
+        for message in messages:
+            self.write(message.message_type_int, message.payload_info, message.receive_time, message.source)
+
+    def flush(self) -> None:
+        for f in self._files.values():
+            f.flush()
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        self._writers.clear()
+
+
+def write_csv(messages: Iterable, directory: str, **kwargs) -> CSVSink:
+    """
+    Write decoded AISMessage objects to one CSV file per message type.
+
+    Args:
+    messages (Iterable[AISMessage]): Messages as returned by parse_ais_messages.
+    directory (str): Output directory.
+    **kwargs: Passed to CSVSink (fields, compress, buffer_size, compress_level).
+
+    Returns:
+    CSVSink: The closed sink, for its rows_written and rows_skipped counts.
+    """
+    with CSVSink(directory, **kwargs) as sink:
+        sink.write_messages(messages)
+    return sink
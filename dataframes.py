@@ -0,0 +1,182 @@
+# dataframes.py -- columnar decoding into NumPy arrays and pandas DataFrames, one per message type (requires numpy; pandas for DataFrames)
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+from ais_decoder import group_payloads
+from constants import (AIS_TYPES, EFIX_TYPES, NAVAID_TYPES, NAVIGATION_STATUS, RAW_FIELDS, SHIP_TYPE, calculate_heading,
+                       calculate_timestamp, decode_text_field, get_segment, safe_int)
+from decoders import DECODER_REGISTRY
+from errors import DecodeError, ErrorCode, ErrorStats
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+"""Enumerated fields stored as categoricals in DataFrames, with the codes of their lookup tables as categories"""
+CATEGORICAL_FIELDS: Dict[str, Sequence[int]] = {
+    "Navigation Status": range(len(NAVIGATION_STATUS)),
+    "Type of Ship and Cargo": sorted(SHIP_TYPE),
+    "Ship Type": sorted(SHIP_TYPE),
+    "Aid Type": sorted(NAVAID_TYPES),
+    "Type of Electronic Position Fixing Device": sorted(EFIX_TYPES),
+    "Position Fixing Device": sorted(EFIX_TYPES),
+    "Position Fix Type": sorted(EFIX_TYPES),
+    "Status": range(len(NAVIGATION_STATUS)),
+    "AIS Version": sorted(AIS_TYPES),
+}
+
+"""Conversions that always return integers; other converted layout fields are stored as float64 columns"""
+INTEGER_CONVERSIONS = (calculate_heading, calculate_timestamp)
+
+"""Text and binary fields of message types without a field layout (object columns); their other fields are int64"""
+OBJECT_FIELDS = frozenset(["Vessel Name", "Vendor ID", "Call Sign", "Text", "Data"])
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise ImportError("Columnar decoding requires numpy (pip install numpy)")
+
+
+def require_pandas() -> None:
+    if pd is None:
+        raise ImportError("DataFrame export requires pandas (pip install pandas)")
+
+
+def _source_lines(source: Union[str, Iterable[str]]) -> Iterable[str]:
+    from pipeline import source_lines
+    return source_lines(source)
+
+
+def _decode_layout_columns(payloads: List[str], layout: Dict, fields: Sequence[str], raw: bool, raw_scaling: Dict) -> Dict[str, "np.ndarray"]:
+    """
+    Decode the `fields` of a group of payloads with a field layout one column at a time: each field is sliced out
+    of every payload in a single list comprehension, then converted to an array (and sign-extended or converted)
+    as a whole, without building a dictionary per message. Values match the projected decoder; each field's dtype
+    follows from its layout entry alone (object for text, float64 for converted fields except INTEGER_CONVERSIONS,
+    int64 otherwise), never from the values found.
+    """
+    shortest = min(map(len, payloads))
+    columns: Dict[str, "np.ndarray"] = {}
+    for field in fields:
+        start, end, kind, convert = layout[field]
+        if raw and field in RAW_FIELDS:
+            convert = None
+        if kind == "t":
+            segments = [payload[start:end] if end is None or len(payload) >= end else None for payload in payloads]
+            columns[field] = np.array([decode_text_field(segment) for segment in segments], dtype=object)
+            continue
+        if end is not None and end > start and shortest >= end:
+            column = np.array([int(payload[start:end], 2) for payload in payloads], dtype=np.int64)
+            if kind == "s":
+                # Two's complement: subtract 2^width where the sign bit is set
+                width = end - start
+                column -= (column >> (width - 1)) << width
+        else:
+            column = np.array([safe_int(get_segment(payload, start, end if end is not None else len(payload)), signed=(kind == "s"))
+                               for payload in payloads], dtype=np.int64)
+        scale = raw_scaling.get(field)
+        if scale is not None:
+            column = np.array([scale(value) for value in column.tolist()], dtype=np.int64)
+        if convert is not None:
+            dtype = np.int64 if convert in INTEGER_CONVERSIONS else np.float64
+            column = np.array([convert(value) for value in column.tolist()], dtype=dtype)
+        columns[field] = column
+    return columns
+
+
+def _decode_dict_columns(payloads: List[str], decoder, type_fields: Optional[Sequence[str]], fields: Optional[Sequence[str]]) -> Dict[str, "np.ndarray"]:
+    """
+    Columns of a message type without a field layout, from its full decoder: one column per field the type can
+    produce (`type_fields`), object for OBJECT_FIELDS and int64 otherwise. Fields a message does not carry (e.g. the
+    other part of a type 24 report) are None in object columns and -1, the decoders' missing value, in int64
+    columns. A registered decoder that declares no fields gets an object column per field found. Payloads that fail
+    to decode are dropped.
+    """
+    records = [decoded for decoded in (decoder(payload)[0] for payload in payloads) if "Error" not in decoded]
+    if not records:
+        return {}
+    declared = type_fields is not None
+    if not declared:
+        type_fields = list(dict.fromkeys(name for record in records for name in record))
+    names = [name for name in fields if name in type_fields] if fields else type_fields
+    columns: Dict[str, "np.ndarray"] = {}
+    for name in names:
+        if name in OBJECT_FIELDS or not declared:
+            columns[name] = np.array([record.get(name) for record in records], dtype=object)
+        else:
+            columns[name] = np.array([record.get(name, -1) for record in records], dtype=np.int64)
+    return columns
+
+
+def decode_columns(source: Union[str, Iterable[str]], fields: Optional[Sequence[str]] = None, raw: bool = False,
+                   error_stats: Optional[ErrorStats] = None) -> Dict[int, Dict[str, "np.ndarray"]]:
+    """
+    Decode sentences straight into typed column arrays, one set per message type.
+
+    Sentences are reassembled and grouped by message type as in decode_batch. Message types with a field layout
+    are then decoded column by column: integer fields become int64 arrays, converted fields (positions, speed,
+    course, ...) float64 arrays of their converted values (int64 for heading and timestamp), text fields object arrays
+    of str. Other message types are decoded message by message into one column per field they can produce. A
+    field's dtype is fixed by its message type, whatever the values in the batch.
+
+    Args:
+    source (Union[str, Iterable[str]]): Log path or glob (compressed files are streamed), or an iterable of sentences.
+    fields (Optional[Sequence[str]]): Only decode these fields.
+    raw (bool): Keep latitude/longitude (1/10000 minute) and SOG/COG (tenths) as integers.
+    error_stats (Optional[ErrorStats]): If given, rejected sentences are recorded here.
+
+    Returns:
+    Dict[int, Dict[str, np.ndarray]]: {message type: {field: column}}, rows in input order within each type.
+    """
+    require_numpy()
+    payloads_by_type, _ = group_payloads(_source_lines(source), error_stats)
+    columns_by_type: Dict[int, Dict[str, "np.ndarray"]] = {}
+    for message_type, group in sorted(payloads_by_type.items()):
+        decoder = DECODER_REGISTRY.get(message_type)
+        if decoder is None:
+            if error_stats is not None and not DECODER_REGISTRY.is_disabled(message_type):
+                for _, payload in group:
+                    error_stats.record(DecodeError(ErrorCode.UNSUPPORTED_MESSAGE_TYPE, payload))
+            continue
+        payloads = [payload for _, payload in group]
+        layout = DECODER_REGISTRY.get_field_layout(message_type)
+        if layout is not None:
+            columns = _decode_layout_columns(payloads, layout, [field for field in fields if field in layout] if fields else list(layout),
+                                             raw, DECODER_REGISTRY.get_raw_scaling(message_type) or {})
+        else:
+            columns = _decode_dict_columns(payloads, decoder, DECODER_REGISTRY.get_fields(message_type), fields)
+        if columns:
+            columns_by_type[message_type] = columns
+    return columns_by_type
+
+
+def to_dataframes(source: Union[str, Iterable[str]], fields: Optional[Sequence[str]] = None, raw: bool = False,
+                  error_stats: Optional[ErrorStats] = None, categorical: bool = True) -> Dict[int, "pd.DataFrame"]:
+    """
+    Decode sentences into one pandas DataFrame per message type, built from the column arrays of decode_columns
+    rather than from a dictionary per message.
+
+    Args:
+    source, fields, raw, error_stats: As for decode_columns.
+    categorical (bool): Store enumerated fields (navigation status, ship type, ...; see CATEGORICAL_FIELDS) as
+    categoricals of their integer codes. Labels can be looked up in the tables of constants.py.
+
+    Returns:
+    Dict[int, pd.DataFrame]: {message type: DataFrame with one column per field}.
+    """
+    require_pandas()
+    dataframes: Dict[int, "pd.DataFrame"] = {}
+    for message_type, columns in decode_columns(source, fields, raw, error_stats).items():
+        if categorical:
+            for field, codes in CATEGORICAL_FIELDS.items():
+                column = columns.get(field)
+                if column is not None and column.dtype == np.int64:
+                    categories = sorted(set(codes).union(np.unique(column).tolist()))
+                    columns[field] = pd.Categorical(column, categories=categories)
+        dataframes[message_type] = pd.DataFrame(columns, copy=False)
+    return dataframes
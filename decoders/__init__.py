@@ -1,39 +1,40 @@
-from .decode_position_report_class_a import decode_position_report_class_a
-from .decode_base_station_report import decode_base_station_report
-from .decode_static_and_voyage_data import decode_static_and_voyage_data
-from .decode_binary_addressed_message import decode_binary_addressed_messsage
-from .decode_binary_acknowledge import decode_binary_acknowledge
-from .decode_binary_broadcast_message import decode_binary_broadcast_message
-from .decode_standard_sar_aircraft_position import decode_standard_sar_aircraft_position
-from .decode_utc_date_inquiry import decode_utc_date_inquiry
-from .decode_safety_related_broadcast import decode_safety_related_broadcast
-from .decode_interrogation import decode_interrogation
-from .decode_assignment_mode_command import decode_assignment_mode_command
-from .decode_position_report_class_b import decode_position_report_class_b
-from .decode_position_report_class_b_ext import decode_position_report_class_b_ext
-from .decode_aid_to_navigation import decode_aid_to_navigation
-from .decode_static_data_report import decode_static_data_report
-from .decode_single_slot_binary_message import decode_single_slot_binary_message
-from .decode_multi_slot_binary_message import decode_multi_slot_binary_message
-from .decode_long_range_broadcast import decode_long_range_broadcast
+# Decoder modules are imported lazily: on first use of their message type through DECODER_REGISTRY,
+# or on first access of a decoder function as an attribute of this package.
+import importlib
+from .registry import DecoderRegistry, DECODER_REGISTRY, DEFAULT_DECODERS
+
+_DECODER_MODULES = {
+    'decode_position_report_class_a': 'decode_position_report_class_a',
+    'decode_base_station_report': 'decode_base_station_report',
+    'decode_static_and_voyage_data': 'decode_static_and_voyage_data',
+    'decode_binary_addressed_messsage': 'decode_binary_addressed_message',
+    'decode_binary_acknowledge': 'decode_binary_acknowledge',
+    'decode_binary_broadcast_message': 'decode_binary_broadcast_message',
+    'decode_standard_sar_aircraft_position': 'decode_standard_sar_aircraft_position',
+    'decode_utc_date_inquiry': 'decode_utc_date_inquiry',
+    'decode_safety_related_broadcast': 'decode_safety_related_broadcast',
+    'decode_interrogation': 'decode_interrogation',
+    'decode_assignment_mode_command': 'decode_assignment_mode_command',
+    'decode_position_report_class_b': 'decode_position_report_class_b',
+    'decode_position_report_class_b_ext': 'decode_position_report_class_b_ext',
+    'decode_aid_to_navigation': 'decode_aid_to_navigation',
+    'decode_static_data_report': 'decode_static_data_report',
+    'decode_single_slot_binary_message': 'decode_single_slot_binary_message',
+    'decode_multi_slot_binary_message': 'decode_multi_slot_binary_message',
+    'decode_long_range_broadcast': 'decode_long_range_broadcast',
+}
+
+def __getattr__(name):
+    module_name = _DECODER_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    decoder = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = decoder
+    return decoder
 
 __all__ = [
-    'decode_position_report_class_a',
-    'decode_base_station_report',
-    'decode_static_and_voyage_data',
-    'decode_binary_addressed_messsage',
-    'decode_binary_acknowledge',
-    'decode_binary_broadcast_message',
-    'decode_standard_sar_aircraft_position',
-    'decode_utc_date_inquiry',
-    'decode_safety_related_broadcast',
-    'decode_interrogation',
-    'decode_assignment_mode_command',
-    'decode_position_report_class_b',
-    'decode_position_report_class_b_ext',
-    'decode_aid_to_navigation',
-    'decode_static_data_report',
-    'decode_single_slot_binary_message',
-    'decode_multi_slot_binary_message',
-    'decode_long_range_broadcast'
+    'DecoderRegistry',
+    'DECODER_REGISTRY',
+    'DEFAULT_DECODERS',
+    *_DECODER_MODULES,
 ]
@@ -2,6 +2,30 @@
 from typing import Dict, Tuple, Optional
 from constants import *
 
+"""Bit layout of each decoded field (see FieldLayout in constants.py)"""
+FIELD_LAYOUT: FieldLayout = {
+    "MMSI": (8, 38, "u", None),
+    "Aid Type": (38, 43, "u", None),
+    "Name": (43, 163, "t", None),
+    "Position Accuracy": (163, 164, "u", None),
+    "Longitude": (164, 192, "s", calculate_longitude),
+    "Latitude": (192, 219, "s", calculate_latitude),
+    "Dimension to Bow": (219, 228, "u", None),
+    "Dimension to Stern": (228, 237, "u", None),
+    "Dimension to Port": (237, 243, "u", None),
+    "Dimension to Starboard": (243, 249, "u", None),
+    "Position Fix Type": (249, 253, "u", None),
+    "UTC Second": (253, 259, "u", calculate_timestamp),
+    "Off Position Indicator": (259, 260, "u", None),
+    "Spare": (260, 268, "u", None),
+    "RAIM Flag": (268, 269, "u", None),
+    "Virtual Aid Flag": (269, 270, "u", None),
+    "Assigned Mode Flag": (270, 271, "u", None),
+    "Spare 2": (271, 272, "u", None),
+    "Name Extension": (272, None, "t", None),
+}
+_decode_fields = compile_field_layout(FIELD_LAYOUT)
+
 def decode_aid_to_navigation(binary_string: str):
     """
     Decode Aid-to-Navigation (message type 21)
@@ -14,27 +38,7 @@ def decode_aid_to_navigation(binary_string: str):
     """
 
     try:
-        decoded_data = {
-            "MMSI": safe_int(get_segment(binary_string, 8, 38)),
-            "Aid Type": safe_int(get_segment(binary_string, 38, 43)),
-            "Name": bitstring_to_ascii(get_segment(binary_string, 43, 163)).split("@")[0].strip(),
-            "Position Accuracy": safe_int(get_segment(binary_string, 163, 164)),
-            "Longitude": calculate_longitude(safe_int(get_segment(binary_string, 164, 192), signed=True)),
-            "Latitude": calculate_latitude(safe_int(get_segment(binary_string, 192, 219), signed=True)),
-            "Dimension to Bow": safe_int(get_segment(binary_string, 219, 228)),
-            "Dimension to Stern": safe_int(get_segment(binary_string, 228, 237)),
-            "Dimension to Port": safe_int(get_segment(binary_string, 237, 243)),
-            "Dimension to Starboard": safe_int(get_segment(binary_string, 243, 249)),
-            "Position Fix Type": safe_int(get_segment(binary_string, 249, 253)),
-            "UTC Second": calculate_timestamp(safe_int(get_segment(binary_string, 253, 259))),
-            "Off Position Indicator": safe_int(get_segment(binary_string, 259, 260)),
-            "Spare": safe_int(get_segment(binary_string, 260, 268)),
-            "RAIM Flag": safe_int(get_segment(binary_string, 268, 269)),
-            "Virtual Aid Flag": safe_int(get_segment(binary_string, 269, 270)),
-            "Assigned Mode Flag": safe_int(get_segment(binary_string, 270, 271)),
-            "Spare 2": safe_int(get_segment(binary_string, 271, 272)),
-            "Name Extension": bitstring_to_ascii(get_segment(binary_string, 272, len(binary_string))).split("@")[0].strip()
-        }
+        decoded_data = _decode_fields(binary_string)
 
         stringified_data = {
             "MMSI": str(get_val(decoded_data["MMSI"])),
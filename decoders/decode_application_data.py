@@ -0,0 +1,156 @@
+# decode_application_data.py -- registry of sub-decoders for binary application data, keyed by (DAC, FI) (Message types 6, 8, 25, 26)
+from typing import Callable, Dict, Optional, Tuple
+from constants import safe_int, get_segment, bytes_to_bitstring, decode_text_field
+
+
+"""Registered application decoders. Each takes the application data bits (after the DAC/FI header) and returns a dictionary of values."""
+APPLICATION_DECODERS: Dict[Tuple[int, int], Callable[[str], Dict]] = {}
+
+
+def register_application_decoder(dac: int, fi: int) -> Callable:
+    """Decorator registering (or replacing) the sub-decoder for a Designated Area Code / Functional ID pair."""
+    def register(decoder: Callable[[str], Dict]) -> Callable[[str], Dict]:
+        APPLICATION_DECODERS[(dac, fi)] = decoder
+        return decoder
+    return register
+
+
+def decode_application_data(dac: int, fi: int, data: bytes, bit_length: int) -> Optional[Dict]:
+    """
+    Decode binary application data with the sub-decoder registered for (dac, fi).
+
+    Returns:
+    Optional[Dict]: The decoded values, None if no sub-decoder is registered for the pair, or {"Error": ...} if decoding failed.
+    """
+    decoder = APPLICATION_DECODERS.get((dac, fi))
+    if decoder is None:
+        return None
+    try:
+        return decoder(bytes_to_bitstring(data, bit_length))
+    except Exception as e:
+        return {"Error": e}
+
+
+def _decode_layout(binary_string: str, layout: Tuple) -> Dict:
+    decoded_data = {}
+    for name, start, end, signed, convert in layout:
+        segment = get_segment(binary_string, start, end)
+        if segment is None:
+            # Missing bits decode like safe_int(None); a real value of -1 (signed fields) is still converted
+            decoded_data[name] = -1
+            continue
+        value = safe_int(segment, signed=signed)
+        decoded_data[name] = convert(value) if convert is not None else value
+    return decoded_data
+
+
+# -- IMO Meteorological and Hydrographic Data (DAC 1, FI 31) --
+
+"""(field, start, end, signed, conversion) relative to the start of the application data"""
+METEOROLOGICAL_HYDROGRAPHIC_LAYOUT: Tuple = (
+    ("Longitude", 0, 25, True, lambda v: v / 60000),
+    ("Latitude", 25, 49, True, lambda v: v / 60000),
+    ("Position Accuracy", 49, 50, False, None),
+    ("Day (UTC)", 50, 55, False, None),
+    ("Hour (UTC)", 55, 60, False, None),
+    ("Minute (UTC)", 60, 66, False, None),
+    ("Average Wind Speed", 66, 73, False, None),
+    ("Gust Speed", 73, 80, False, None),
+    ("Wind Direction", 80, 89, False, None),
+    ("Gust Direction", 89, 98, False, None),
+    ("Air Temperature", 98, 109, True, lambda v: v / 10),
+    ("Relative Humidity", 109, 116, False, None),
+    ("Dew Point", 116, 126, True, lambda v: v / 10),
+    ("Air Pressure", 126, 135, False, lambda v: v + 799),
+    ("Pressure Tendency", 135, 137, False, None),
+    ("Max Visibility Exceeded", 137, 138, False, None),
+    ("Horizontal Visibility", 138, 145, False, lambda v: v / 10),
+    ("Water Level", 145, 157, False, lambda v: v / 100 - 10),
+    ("Water Level Trend", 157, 159, False, None),
+    ("Surface Current Speed", 159, 167, False, lambda v: v / 10),
+    ("Surface Current Direction", 167, 176, False, None),
+    ("Current Speed 2", 176, 184, False, lambda v: v / 10),
+    ("Current Direction 2", 184, 193, False, None),
+    ("Current Depth 2", 193, 198, False, None),
+    ("Current Speed 3", 198, 206, False, lambda v: v / 10),
+    ("Current Direction 3", 206, 215, False, None),
+    ("Current Depth 3", 215, 220, False, None),
+    ("Significant Wave Height", 220, 228, False, lambda v: v / 10),
+    ("Wave Period", 228, 234, False, None),
+    ("Wave Direction", 234, 243, False, None),
+    ("Swell Height", 243, 251, False, lambda v: v / 10),
+    ("Swell Period", 251, 257, False, None),
+    ("Swell Direction", 257, 266, False, None),
+    ("Sea State", 266, 270, False, None),
+    ("Water Temperature", 270, 280, True, lambda v: v / 10),
+    ("Precipitation Type", 280, 283, False, None),
+    ("Salinity", 283, 292, False, lambda v: v / 10),
+    ("Ice", 292, 294, False, None),
+)
+
+
+@register_application_decoder(1, 31)
+def decode_meteorological_hydrographic(binary_string: str) -> Dict:
+    """Decode IMO289 Meteorological and Hydrographic data (DAC 1, FI 31)."""
+    return _decode_layout(binary_string, METEOROLOGICAL_HYDROGRAPHIC_LAYOUT)
+
+
+# -- IMO Area Notice (DAC 1, FI 22) --
+
+AREA_NOTICE_HEADER_LAYOUT: Tuple = (
+    ("Message Linkage ID", 0, 10, False, None),
+    ("Notice Type", 10, 17, False, None),
+    ("Month (UTC)", 17, 21, False, None),
+    ("Day (UTC)", 21, 26, False, None),
+    ("Hour (UTC)", 26, 31, False, None),
+    ("Minute (UTC)", 31, 37, False, None),
+    ("Duration", 37, 55, False, None),
+)
+
+AREA_NOTICE_SUBAREA_BITS: int = 87
+
+AREA_SHAPES: Dict[int, str] = {
+    0: "Circle or point",
+    1: "Rectangle",
+    2: "Sector",
+    3: "Polyline",
+    4: "Polygon",
+    5: "Associated text",
+}
+
+"""Subarea layouts by shape, relative to the start of the subarea (after the 3 shape bits)"""
+AREA_NOTICE_SUBAREA_LAYOUTS: Dict[int, Tuple] = {
+    0: (("Scale Factor", 3, 5, False, None), ("Longitude", 5, 30, True, lambda v: v / 60000), ("Latitude", 30, 54, True, lambda v: v / 60000),
+        ("Precision", 54, 57, False, None), ("Radius", 57, 69, False, None)),
+    1: (("Scale Factor", 3, 5, False, None), ("Longitude", 5, 30, True, lambda v: v / 60000), ("Latitude", 30, 54, True, lambda v: v / 60000),
+        ("Precision", 54, 57, False, None), ("East Dimension", 57, 65, False, None), ("North Dimension", 65, 73, False, None),
+        ("Orientation", 73, 82, False, None)),
+    2: (("Scale Factor", 3, 5, False, None), ("Longitude", 5, 30, True, lambda v: v / 60000), ("Latitude", 30, 54, True, lambda v: v / 60000),
+        ("Precision", 54, 57, False, None), ("Radius", 57, 69, False, None), ("Left Boundary", 69, 78, False, None),
+        ("Right Boundary", 78, 87, False, None)),
+    3: (("Scale Factor", 3, 5, False, None),) + tuple(
+        field for point in range(4) for field in (
+            (f"Point {point + 1} Angle", 5 + point * 20, 15 + point * 20, False, None),
+            (f"Point {point + 1} Distance", 15 + point * 20, 25 + point * 20, False, None))),
+}
+AREA_NOTICE_SUBAREA_LAYOUTS[4] = AREA_NOTICE_SUBAREA_LAYOUTS[3]
+
+
+@register_application_decoder(1, 22)
+def decode_area_notice(binary_string: str) -> Dict:
+    """Decode an IMO289 Area Notice (DAC 1, FI 22): a header followed by up to 10 subareas of 87 bits."""
+    decoded_data = _decode_layout(binary_string, AREA_NOTICE_HEADER_LAYOUT)
+    subareas = []
+    start = AREA_NOTICE_HEADER_LAYOUT[-1][2]
+    while start + AREA_NOTICE_SUBAREA_BITS <= len(binary_string):
+        subarea_bits = binary_string[start:start + AREA_NOTICE_SUBAREA_BITS]
+        shape = safe_int(subarea_bits[0:3])
+        subarea = {"Shape": shape, "Shape Name": AREA_SHAPES.get(shape, "Reserved")}
+        if shape == 5:
+            subarea["Text"] = decode_text_field(subarea_bits[3:87])
+        elif shape in AREA_NOTICE_SUBAREA_LAYOUTS:
+            subarea.update(_decode_layout(subarea_bits, AREA_NOTICE_SUBAREA_LAYOUTS[shape]))
+        subareas.append(subarea)
+        start += AREA_NOTICE_SUBAREA_BITS
+    decoded_data["Subareas"] = subareas
+    return decoded_data
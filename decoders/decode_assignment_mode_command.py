@@ -1,8 +1,21 @@
 # decode_assignment_mode_command.py - Logic for decoding Assignment Mode Command messages (message type 16)
 from typing import Dict, Tuple, Optional, List
-from constants import safe_int, get_segment, get_val, error_tuple
+from constants import get_val, error_tuple, FieldLayout, compile_field_layout
 
 
+"""Bit layout of each decoded field (see FieldLayout in constants.py)"""
+FIELD_LAYOUT: FieldLayout = {
+    "MMSI": (8, 38, "u", None),
+    "Spare": (38, 40, "u", None),
+    "Destination A MMSI": (40, 70, "u", None),
+    "Offset A": (70, 82, "u", None),
+    "Increment A": (82, 92, "u", None),
+    "Destination B MMSI": (92, 122, "u", None),
+    "Offset B": (122, 134, "u", None),
+    "Increment B": (134, 144, "u", None),
+}
+_decode_fields = compile_field_layout(FIELD_LAYOUT)
+
 def decode_assignment_mode_command(binary_string: str):
     """
     Decode Assignment Mode Command (message type 16)
@@ -15,16 +28,7 @@ def decode_assignment_mode_command(binary_string: str):
     """
 
     try: 
-        decoded_data = {
-            "MMSI": safe_int(get_segment(binary_string, 8, 38)),
-            "Spare": safe_int(get_segment(binary_string, 38, 40)),
-            "Destination A MMSI": safe_int(get_segment(binary_string, 40, 70)),
-            "Offset A": safe_int(get_segment(binary_string, 70, 82)),
-            "Increment A": safe_int(get_segment(binary_string, 82, 92)),
-            "Destination B MMSI": safe_int(get_segment(binary_string, 92, 122)),
-            "Offset B": safe_int(get_segment(binary_string, 122, 134)),
-            "Increment B": safe_int(get_segment(binary_string, 134, 144)),
-        }
+        decoded_data = _decode_fields(binary_string)
 
         stringified_data = {
             "MMSI": f"{get_val(decoded_data['MMSI'])}",
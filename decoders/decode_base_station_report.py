@@ -1,8 +1,27 @@
 # decode_base_station_report.py -- logic for decoding Base Station Reports (Message Type 4)
 from typing import Dict, Tuple, Optional, List
-from constants import EFIX_TYPES, safe_int, get_segment, get_val, calculate_latitude, calculate_longitude, latitude_to_string, longitude_to_string, error_tuple
+from constants import EFIX_TYPES, get_val, calculate_latitude, calculate_longitude, latitude_to_string, longitude_to_string, error_tuple, FieldLayout, compile_field_layout
 
 
+"""Bit layout of each decoded field (see FieldLayout in constants.py)"""
+FIELD_LAYOUT: FieldLayout = {
+    "MMSI": (8, 38, "u", None),
+    "Year (UTC)": (38, 52, "u", None),
+    "Month (UTC)": (52, 56, "u", None),
+    "Day (UTC)": (56, 61, "u", None),
+    "Hour (UTC)": (61, 66, "u", None),
+    "Minute (UTC)": (66, 72, "u", None),
+    "Second (UTC)": (72, 78, "u", None),
+    "Position Accuracy": (78, 79, "u", None),
+    "Longitude": (79, 107, "s", calculate_longitude),
+    "Latitude": (107, 134, "s", calculate_latitude),
+    "Type of Electronic Position Fixing Device": (134, 138, "u", None),
+    "Spare": (138, 148, "u", None),
+    "RAIM Flag": (148, 149, "u", None),
+    "Radio Status": (149, 168, "u", None),
+}
+_decode_fields = compile_field_layout(FIELD_LAYOUT)
+
 def decode_base_station_report(binary_string: str) -> Tuple[Dict[str, Optional[int]], Dict[str, str]]:
     """
     Decode a base station report (BSR) message, message type 4.
@@ -15,22 +34,7 @@ def decode_base_station_report(binary_string: str) -> Tuple[Dict[str, Optional[i
     and a dictionary of the stringified values.
     """
     try:
-        decoded_data = {
-            "MMSI": safe_int(get_segment(binary_string, 8, 38)),
-            "Year (UTC)": safe_int(get_segment(binary_string, 38, 52)),
-            "Month (UTC)": safe_int(get_segment(binary_string, 52, 56)),
-            "Day (UTC)": safe_int(get_segment(binary_string, 56, 61)),
-            "Hour (UTC)": safe_int(get_segment(binary_string, 61, 66)),
-            "Minute (UTC)": safe_int(get_segment(binary_string, 66, 72)),
-            "Second (UTC)": safe_int(get_segment(binary_string, 72, 78)),
-            "Position Accuracy": safe_int(get_segment(binary_string, 78, 79)),
-            "Longitude": calculate_longitude(safe_int(get_segment(binary_string, 79, 107), signed=True)),
-            "Latitude": calculate_latitude(safe_int(get_segment(binary_string, 107, 134), signed=True)),
-            "Type of Electronic Position Fixing Device": safe_int(get_segment(binary_string, 134, 138)),
-            "Spare": safe_int(get_segment(binary_string, 138, 148)),
-            "RAIM Flag": safe_int(get_segment(binary_string, 148, 149)),
-            "Radio Status": safe_int(get_segment(binary_string, 149, 168)) # No plan to decode this yet
-        }
+        decoded_data = _decode_fields(binary_string)
 
         stringified_data = {
             "MMSI": f"{get_val(decoded_data['MMSI'])}",
@@ -1,6 +1,21 @@
 # decode_binary_acknowledge.py -- logic for decoding Binary Acknowledge Messages (type 7, 13)
 from typing import Dict, Tuple, Optional, List
-from constants import safe_int, get_segment, get_val, error_tuple
+from constants import get_val, error_tuple, FieldLayout, compile_field_layout
+
+"""Bit layout of each decoded field (see FieldLayout in constants.py)"""
+FIELD_LAYOUT: FieldLayout = {
+    "Source MMSI": (8, 38, "u", None),
+    "Spare": (38, 40, "u", None),
+    "MMSI 1": (40, 70, "u", None),
+    "Sequence Number 1": (70, 72, "u", None),
+    "MMSI 2": (72, 102, "u", None),
+    "Sequence Number 2": (102, 104, "u", None),
+    "MMSI 3": (104, 134, "u", None),
+    "Sequence Number 3": (134, 136, "u", None),
+    "MMSI 4": (136, 166, "u", None),
+    "Sequence Number 4": (166, 168, "u", None),
+}
+_decode_fields = compile_field_layout(FIELD_LAYOUT)
 
 def decode_binary_acknowledge(binary_string: str):
     """
@@ -14,18 +29,7 @@ def decode_binary_acknowledge(binary_string: str):
     """
 
     try: 
-        decoded_data = {
-            "Source MMSI": safe_int(get_segment(binary_string, 8, 38)),
-            "Spare": safe_int(get_segment(binary_string, 38, 40)),
-            "MMSI 1": safe_int(get_segment(binary_string, 40, 70)),
-            "Sequence Number 1": safe_int(get_segment(binary_string, 70, 72)),
-            "MMSI 2": safe_int(get_segment(binary_string, 72, 102)),
-            "Sequence Number 2": safe_int(get_segment(binary_string, 102, 104)),
-            "MMSI 3": safe_int(get_segment(binary_string, 104, 134)),
-            "Sequence Number 3": safe_int(get_segment(binary_string, 134, 136)),
-            "MMSI 4": safe_int(get_segment(binary_string, 136, 166)),
-            "Sequence Number 4": safe_int(get_segment(binary_string, 166, 168)),
-        }
+        decoded_data = _decode_fields(binary_string)
 
         stringified_data = {
             "Source MMSI": f"{get_val(decoded_data['Source MMSI'])}",
@@ -1,6 +1,19 @@
 # decode_binary_addressed_message.py -- logic for decoding Binary Addressed Messages (type 6)
 from typing import Dict, Tuple, Optional, List
-from constants import safe_int, get_segment, get_val, bitstring_to_ascii, error_tuple
+from constants import safe_int, get_segment, get_val, bitstring_to_bytes, error_tuple
+
+"""Fields the decoder produces (the data is variable-length, so there is no FIELD_LAYOUT)"""
+FIELDS: Tuple[str, ...] = (
+    "MMSI",
+    "Sequence Number",
+    "Destination MMSI",
+    "Retransmit Flag",
+    "Spare",
+    "Designated Area Code",
+    "Functional ID",
+    "Data",
+    "Data Bits",
+)
 
 def decode_binary_addressed_messsage(binary_string: str):
     """
@@ -22,7 +35,8 @@ def decode_binary_addressed_messsage(binary_string: str):
             "Spare": safe_int(get_segment(binary_string, 71, 72)),
             "Designated Area Code": safe_int(get_segment(binary_string, 72, 82)),
             "Functional ID": safe_int(get_segment(binary_string, 82, 88)),
-            "Data": bitstring_to_ascii(get_segment(binary_string, 88, len(binary_string)))
+            "Data": bitstring_to_bytes(get_segment(binary_string, 88, len(binary_string))),
+            "Data Bits": max(len(binary_string) - 88, 0)
         }
 
         stringified_data = {
@@ -33,7 +47,8 @@ def decode_binary_addressed_messsage(binary_string: str):
             "Spare": f"{get_val(decoded_data['Spare'])}",
             "Designated Area Code": f"{get_val(decoded_data['Designated Area Code'])}",
             "Functional ID": f"{get_val(decoded_data['Functional ID'])}",
-            "Data": f"{decoded_data['Data']}"
+            "Data": decoded_data["Data"].hex(),
+            "Data Bits": f"{decoded_data['Data Bits']}"
         }
     
     except Exception as e:
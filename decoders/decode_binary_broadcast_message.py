@@ -1,6 +1,15 @@
 # decode_binary_broadcast_message.py - logic for decoding Binary Broadcast Messages (Message Type 8)
 from typing import Dict, Tuple, Optional, List
-from constants import safe_int, get_segment, get_val, bitstring_to_ascii, error_tuple
+from constants import safe_int, get_segment, get_val, bitstring_to_bytes, error_tuple
+
+"""Fields the decoder produces (the data is variable-length, so there is no FIELD_LAYOUT)"""
+FIELDS: Tuple[str, ...] = (
+    "MMSI",
+    "Designated Area Code",
+    "Functional ID",
+    "Data",
+    "Data Bits",
+)
 
 def decode_binary_broadcast_message(binary_payload: str):
     """
@@ -18,14 +27,16 @@ def decode_binary_broadcast_message(binary_payload: str):
             "MMSI": safe_int(get_segment(binary_payload, 8, 38)),
             "Designated Area Code": safe_int(get_segment(binary_payload, 40, 50)),
             "Functional ID": safe_int(get_segment(binary_payload, 50, 56)),
-            "Data": bitstring_to_ascii(get_segment(binary_payload, 56, len(binary_payload)))
+            "Data": bitstring_to_bytes(get_segment(binary_payload, 56, len(binary_payload))),
+            "Data Bits": max(len(binary_payload) - 56, 0)
         }
 
         stringified_data = {
             "MMSI": f"{get_val(decoded_data['MMSI'])}",
             "Designated Area Code": f"{get_val(decoded_data['Designated Area Code'])}",
             "Functional ID": f"{get_val(decoded_data['Functional ID'])}",
-            "Data": f"{decoded_data['Data']}"
+            "Data": decoded_data["Data"].hex(),
+            "Data Bits": f"{decoded_data['Data Bits']}"
         }
     
     except Exception as e:
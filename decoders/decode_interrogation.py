@@ -1,6 +1,24 @@
 # decode_interrogation.py - decode interrogations (message type 15)
 from constants import *
 from typing import Dict, Tuple, Optional
+"""Bit layout of each decoded field (see FieldLayout in constants.py)"""
+FIELD_LAYOUT: FieldLayout = {
+    "MMSI": (8, 38, "u", None),
+    "Spare": (38, 40, "u", None),
+    "Interrogated MMSI 1": (40, 70, "u", None),
+    "Message Type 1": (70, 76, "u", None),
+    "Slot Offset 1": (76, 88, "u", None),
+    "Spare 2": (88, 90, "u", None),
+    "Message Type 2": (90, 96, "u", None),
+    "Slot Offset 2": (96, 108, "u", None),
+    "Spare 3": (108, 110, "u", None),
+    "Interrogated MMSI 2": (110, 140, "u", None),
+    "Message Type 3": (140, 146, "u", None),
+    "Slot Offset 3": (146, 158, "u", None),
+    "Spare 4": (158, 160, "u", None),
+}
+_decode_fields = compile_field_layout(FIELD_LAYOUT)
+
 def decode_interrogation(binary_string: str):
     """
     Decode Interrogation (message type 15)
@@ -13,21 +31,7 @@ def decode_interrogation(binary_string: str):
     """
 
     try:
-        decoded_data: Dict[str, int] = {
-            "MMSI": safe_int(get_segment(binary_string, 8, 38)),
-            "Spare": safe_int(get_segment(binary_string, 38, 40)),
-            "Interrogated MMSI 1": safe_int(get_segment(binary_string, 40, 70)),
-            "Message Type 1": safe_int(get_segment(binary_string, 70, 76)),
-            "Slot Offset 1": safe_int(get_segment(binary_string, 76, 88)),
-            "Spare 2": safe_int(get_segment(binary_string, 88, 90)),
-            "Message Type 2": safe_int(get_segment(binary_string, 90, 96)),
-            "Slot Offset 2": safe_int(get_segment(binary_string, 96, 108)),
-            "Spare 3": safe_int(get_segment(binary_string, 108, 110)),
-            "Interrogated MMSI 2": safe_int(get_segment(binary_string, 110, 140)),
-            "Message Type 3": safe_int(get_segment(binary_string, 140, 146)),
-            "Slot Offset 3": safe_int(get_segment(binary_string, 146, 158)),
-            "Spare 4": safe_int(get_segment(binary_string, 158, 160)),
-        }
+        decoded_data = _decode_fields(binary_string)
 
         stringified_data: Dict[str, str] = {
             "MMSI": f"{get_val(decoded_data['MMSI'])}",
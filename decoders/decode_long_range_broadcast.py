@@ -1,6 +1,50 @@
 # decode_long_range_broadcast.py -- logic for decoding long range broadcast messages (Message type 27).
 from typing import Dict, Tuple, Optional, List
-from constants import safe_int, get_segment, get_val, error_tuple, calculate_longitude, calculate_latitude, calculate_speed_over_ground, calculate_course_over_ground, NAVAID_TYPES
+from constants import get_val, error_tuple, calculate_longitude, calculate_latitude, calculate_speed_over_ground, calculate_course_over_ground, longitude_to_string, latitude_to_string, speed_over_ground_to_string, course_over_ground_to_string, NAVAID_TYPES, FieldLayout, RawScaling, compile_field_layout, RAW_SPEED_OVER_GROUND_NOT_AVAILABLE, RAW_COURSE_OVER_GROUND_NOT_AVAILABLE
+
+"""Not-available encodings of the type 27 speed (whole knots) and course (whole degrees)"""
+SPEED_OVER_GROUND_NOT_AVAILABLE: int = 63
+COURSE_OVER_GROUND_NOT_AVAILABLE: int = 511
+
+
+def scale_position(raw_position: int) -> int:
+    """Longitude or latitude from 1/10 minute to 1/10000 minute. The not-available values (181 and 91 degrees) map to the common sentinels."""
+    return raw_position * 1000
+
+def scale_speed_over_ground(raw_sog: int) -> int:
+    """Speed over ground from whole knots to tenths of a knot."""
+    if raw_sog == SPEED_OVER_GROUND_NOT_AVAILABLE:
+        return RAW_SPEED_OVER_GROUND_NOT_AVAILABLE
+    return raw_sog * 10 if raw_sog != -1 else raw_sog
+
+def scale_course_over_ground(raw_cog: int) -> int:
+    """Course over ground from whole degrees to tenths of a degree."""
+    if raw_cog == COURSE_OVER_GROUND_NOT_AVAILABLE:
+        return RAW_COURSE_OVER_GROUND_NOT_AVAILABLE
+    return raw_cog * 10 if raw_cog != -1 else raw_cog
+
+
+"""Bit layout of each decoded field (see FieldLayout in constants.py). Conversions take the common raw units of RAW_SCALING."""
+FIELD_LAYOUT: FieldLayout = {
+    "MMSI": (8, 38, "u", None),
+    "Position Accuracy": (38, 39, "u", None),
+    "RAIM Flag": (39, 40, "u", None),
+    "Status": (40, 44, "u", None),
+    "Longitude": (44, 62, "s", calculate_longitude),
+    "Latitude": (62, 79, "s", calculate_latitude),
+    "Speed Over Ground": (79, 85, "u", calculate_speed_over_ground),
+    "Course Over Ground": (85, 94, "u", calculate_course_over_ground),
+    "GNSS Position Status": (94, 95, "u", None),
+}
+
+"""Scaling of the low-resolution type 27 position, speed and course to the common raw units (see RAW_FIELDS)"""
+RAW_SCALING: RawScaling = {
+    "Longitude": scale_position,
+    "Latitude": scale_position,
+    "Speed Over Ground": scale_speed_over_ground,
+    "Course Over Ground": scale_course_over_ground,
+}
+_decode_fields = compile_field_layout(FIELD_LAYOUT, raw_scaling=RAW_SCALING)
 
 def decode_long_range_broadcast(encodedPayload: str) -> Tuple[Dict, Dict]:
     """
@@ -13,27 +57,17 @@ def decode_long_range_broadcast(encodedPayload: str) -> Tuple[Dict, Dict]:
     Tuple[Dict, Dict] A tuple containing two dictionaries. The first dictionary contains the decoded values, while the second dictionary contains the field names.
     """
     try:
-        decoded_data = {
-            "MMSI": safe_int(get_segment(encodedPayload, 8, 38)),
-            "Position Accuracy": safe_int(get_segment(encodedPayload, 38, 39)),
-            "RAIM Flag": safe_int(get_segment(encodedPayload, 39, 40)),
-            "Status": safe_int(get_segment(encodedPayload, 40, 44)),
-            "Longitude": calculate_longitude(safe_int(get_segment(encodedPayload, 44, 62))),
-            "Latitude": calculate_latitude(safe_int(get_segment(encodedPayload, 62, 79))),
-            "Speed Over Ground": calculate_speed_over_ground(safe_int(get_segment(encodedPayload, 79, 85))),
-            "Course Over Ground": calculate_course_over_ground(safe_int(get_segment(encodedPayload, 85, 94))),
-            "GNSS Position Status": safe_int(get_segment(encodedPayload, 94, 95)),
-        }
+        decoded_data = _decode_fields(encodedPayload)
 
         stringified_data = {
             "MMSI": f"{get_val(decoded_data['MMSI'])}",
             "Position Accuracy": "High" if decoded_data["Position Accuracy"] == 1 else "Low" if decoded_data["Position Accuracy"] == 0 else "Missing from AIS message",
             "RAIM Flag": "In use" if decoded_data["RAIM Flag"] == 1 else "Not in use" if decoded_data["RAIM Flag"] == 0 else "Missing from AIS message",
             "Status": NAVAID_TYPES[decoded_data["Status"]] if decoded_data["Status"] in NAVAID_TYPES else "Unknown",
-            "Longitude": calculate_longitude(decoded_data["Longitude"]),
-            "Latitude": calculate_latitude(decoded_data["Latitude"]),
-            "Speed Over Ground": calculate_speed_over_ground(decoded_data["Speed Over Ground"]),
-            "Course Over Ground": calculate_course_over_ground(decoded_data["Course Over Ground"]),
+            "Longitude": longitude_to_string(decoded_data["Longitude"]),
+            "Latitude": latitude_to_string(decoded_data["Latitude"]),
+            "Speed Over Ground": speed_over_ground_to_string(decoded_data["Speed Over Ground"]),
+            "Course Over Ground": course_over_ground_to_string(decoded_data["Course Over Ground"]),
             "GNSS Position Status": "Current" if decoded_data["GNSS Position Status"] == 1 else "Outdated" if decoded_data["GNSS Position Status"] == 0 else "Missing from AIS message",
         }
         
@@ -1,6 +1,19 @@
 # decode_multi_slot_binary_message.py -- logic for decoding multi slot binary messages (Message type 26)
 from typing import Dict, Tuple, Optional, List
-from constants import safe_int, get_segment, get_val, error_tuple
+from constants import safe_int, get_segment, get_val, bitstring_to_bytes, error_tuple
+
+"""Fields the decoder can produce; the destination MMSI and application ID are only present if the message is addressed or structured"""
+FIELDS: Tuple[str, ...] = (
+    "MMSI",
+    "Addressed",
+    "Structured",
+    "Destination MMSI",
+    "Designated Area Code",
+    "Functional ID",
+    "Data",
+    "Data Bits",
+    "Radio Status",
+)
 
 def decode_multi_slot_binary_message(encodedPayload: str) -> Tuple[Dict, Dict]:
     """
@@ -20,11 +33,30 @@ def decode_multi_slot_binary_message(encodedPayload: str) -> Tuple[Dict, Dict]:
             "Structured": safe_int(get_segment(encodedPayload, 39, 40)),
         }
 
+        # Optional destination MMSI (addressed) and application ID (structured) precede the data
+        data_start = 40
+        if decoded_data["Addressed"] == 1:
+            decoded_data["Destination MMSI"] = safe_int(get_segment(encodedPayload, 40, 70))
+            data_start = 70
+        if decoded_data["Structured"] == 1:
+            decoded_data["Designated Area Code"] = safe_int(get_segment(encodedPayload, data_start, data_start + 10))
+            decoded_data["Functional ID"] = safe_int(get_segment(encodedPayload, data_start + 10, data_start + 16))
+            data_start += 16
+        data_end = max(len(encodedPayload) - 20, data_start)
+        decoded_data["Data"] = bitstring_to_bytes(encodedPayload[data_start:data_end])
+        decoded_data["Data Bits"] = max(data_end - data_start, 0)
+        decoded_data["Radio Status"] = safe_int(get_segment(encodedPayload, data_end, len(encodedPayload)))
+
         stringified_data = {
             "MMSI": f"{get_val(decoded_data['MMSI'])}",
             "Addressed": "True" if decoded_data["Addressed"] == 1 else "False",
             "Structured": "True" if decoded_data["Structured"] == 1 else "False",
         }
+        for field in ("Destination MMSI", "Designated Area Code", "Functional ID"):
+            if field in decoded_data:
+                stringified_data[field] = f"{get_val(decoded_data[field])}"
+        stringified_data["Data"] = decoded_data["Data"].hex()
+        stringified_data["Data Bits"] = f"{decoded_data['Data Bits']}"
     
     except Exception as e:
         return error_tuple(e)
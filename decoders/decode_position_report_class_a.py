@@ -1,6 +1,6 @@
 # decode_position_report_class_a.py -- logic for decoding Class A Position Reports (Message Types 1, 2, 3)
 from typing import Tuple, Dict, Optional, Union
-from constants import NAVIGATION_STATUS, safe_int, get_segment, get_val, calculate_longitude, calculate_latitude, longitude_to_string, latitude_to_string, speed_over_ground_to_string, calculate_course_over_ground, calculate_speed_over_ground, course_over_ground_to_string, heading_to_string, timestamp_to_string, calculate_heading, calculate_timestamp, error_tuple
+from constants import NAVIGATION_STATUS, get_val, calculate_longitude, calculate_latitude, longitude_to_string, latitude_to_string, speed_over_ground_to_string, calculate_course_over_ground, calculate_speed_over_ground, course_over_ground_to_string, heading_to_string, timestamp_to_string, calculate_heading, calculate_timestamp, error_tuple, FieldLayout, compile_field_layout
 
 
 # -- Calculation functions --
@@ -52,6 +52,25 @@ def maneuver_indicator_to_string(maneuver_indicator: int) -> str:
 
 
 
+"""Bit layout of each decoded field (see FieldLayout in constants.py)"""
+FIELD_LAYOUT: FieldLayout = {
+    "MMSI": (8, 38, "u", None),
+    "Navigation Status": (38, 42, "u", None),
+    "Rate of Turn": (42, 50, "s", calculate_rate_of_turn),
+    "Speed Over Ground": (50, 60, "u", calculate_speed_over_ground),
+    "Position Accuracy": (60, 61, "u", None),
+    "Longitude": (61, 89, "s", calculate_longitude),
+    "Latitude": (89, 116, "s", calculate_latitude),
+    "Course Over Ground": (116, 128, "u", calculate_course_over_ground),
+    "True Heading": (128, 137, "u", calculate_heading),
+    "Timestamp": (137, 143, "u", None),
+    "Maneuver Indicator": (143, 145, "u", None),
+    "Spare": (145, 148, "u", None),
+    "RAIM Flag": (148, 149, "u", None),
+    "Radio Status": (149, 168, "u", None),
+}
+_decode_fields = compile_field_layout(FIELD_LAYOUT)
+
 def decode_position_report_class_a(binary_string: str) -> Tuple[Dict[str, Optional[int]], Dict[str, str]]:
     """
     Decode a Class A Position Report (Message Types 1, 2, 3).
@@ -64,22 +83,7 @@ def decode_position_report_class_a(binary_string: str) -> Tuple[Dict[str, Option
     and a dictionary of the stringified values.
     """
     try:
-        decoded_data = {
-            "MMSI": safe_int(get_segment(binary_string, 8, 38)),
-            "Navigation Status": safe_int(get_segment(binary_string, 38, 42)),
-            "Rate of Turn": calculate_rate_of_turn(safe_int(get_segment(binary_string, 42, 50), signed = True)),
-            "Speed Over Ground": calculate_speed_over_ground(safe_int(get_segment(binary_string, 50, 60))),
-            "Position Accuracy": safe_int(get_segment(binary_string, 60, 61)),
-            "Longitude": calculate_longitude(safe_int(get_segment(binary_string, 61, 89), signed = True)),
-            "Latitude": calculate_latitude(safe_int(get_segment(binary_string, 89, 116), signed = True)),
-            "Course Over Ground": calculate_course_over_ground(safe_int(get_segment(binary_string, 116, 128))),
-            "True Heading": calculate_heading(safe_int(get_segment(binary_string, 128, 137))),
-            "Timestamp": safe_int(get_segment(binary_string, 137, 143)),
-            "Maneuver Indicator": safe_int(get_segment(binary_string, 143, 145)),
-            "Spare": safe_int(get_segment(binary_string, 145, 148)),
-            "RAIM Flag": safe_int(get_segment(binary_string, 148, 149)),
-            "Radio Status": safe_int(get_segment(binary_string, 149, 168))
-        }
+        decoded_data = _decode_fields(binary_string)
 
         stringified_data = {
             "MMSI": str(get_val(decoded_data["MMSI"])),
@@ -1,6 +1,24 @@
 # decode_position_report_class_b.py - Logic for decoding class B position reports. (Message type 18)
 from typing import Dict, Tuple, List, Optional
-from constants import safe_int, get_segment, get_val, error_tuple, calculate_course_over_ground, calculate_latitude, calculate_longitude, calculate_speed_over_ground, calculate_timestamp, calculate_heading, speed_over_ground_to_string, course_over_ground_to_string, heading_to_string, latitude_to_string, longitude_to_string, timestamp_to_string
+from constants import get_val, error_tuple, calculate_course_over_ground, calculate_latitude, calculate_longitude, calculate_speed_over_ground, calculate_timestamp, calculate_heading, speed_over_ground_to_string, course_over_ground_to_string, heading_to_string, latitude_to_string, longitude_to_string, timestamp_to_string, FieldLayout, compile_field_layout
+
+"""Bit layout of each decoded field (see FieldLayout in constants.py)"""
+FIELD_LAYOUT: FieldLayout = {
+    "MMSI": (8, 38, "u", None),
+    "Spare": (38, 46, "u", None),
+    "Speed Over Ground": (46, 56, "u", calculate_speed_over_ground),
+    "Position Accuracy": (56, 57, "u", None),
+    "Longitude": (57, 85, "s", calculate_longitude),
+    "Latitude": (85, 112, "s", calculate_latitude),
+    "Course Over Ground": (112, 124, "u", calculate_course_over_ground),
+    "True Heading": (124, 133, "u", calculate_heading),
+    "Timestamp": (133, 139, "u", calculate_timestamp),
+    "Spare 2": (139, 146, "u", None),
+    "Assigned Mode Flag": (146, 147, "u", None),
+    "RAIM Flag": (147, 148, "u", None),
+    "Communication State": (148, 168, "u", None),
+}
+_decode_fields = compile_field_layout(FIELD_LAYOUT)
 
 def decode_position_report_class_b(binary_string: str):
     """
@@ -13,21 +31,7 @@ def decode_position_report_class_b(binary_string: str):
     Tuple[Dict[str, Optional[int]], Dict[str, str]]: A tuple containing a dictionary of the decoded values, and a dictionary with stringified values.
     """
     try:
-        decoded_data = {
-            "MMSI": safe_int(get_segment(binary_string, 8, 38)),
-            "Spare": safe_int(get_segment(binary_string, 38, 46)),
-            "Speed Over Ground": calculate_speed_over_ground(safe_int(get_segment(binary_string, 46, 56))),
-            "Position Accuracy": safe_int(get_segment(binary_string, 56, 57)),
-            "Longitude": calculate_longitude(safe_int(get_segment(binary_string, 57, 85), signed= True)),
-            "Latitude": calculate_latitude(safe_int(get_segment(binary_string, 85, 112), signed = True)),
-            "Course Over Ground": calculate_course_over_ground(safe_int(get_segment(binary_string, 112, 124))),
-            "True Heading": calculate_heading(safe_int(get_segment(binary_string, 124, 133))),
-            "Timestamp": calculate_timestamp(safe_int(get_segment(binary_string, 133, 139))),
-            "Spare 2": safe_int(get_segment(binary_string, 139, 146)),
-            "Assigned Mode Flag": safe_int(get_segment(binary_string, 146, 147)),
-            "RAIM Flag": safe_int(get_segment(binary_string, 147, 148)),
-            "Communication State": safe_int(get_segment(binary_string, 148, 168))
-        }
+        decoded_data = _decode_fields(binary_string)
 
         stringified_data = {
             "MMSI": f"{get_val(decoded_data['MMSI'])}",
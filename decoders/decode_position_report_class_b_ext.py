@@ -2,6 +2,32 @@
 from typing import Dict, Tuple, List, Optional
 from constants import *
 
+"""Bit layout of each decoded field (see FieldLayout in constants.py)"""
+FIELD_LAYOUT: FieldLayout = {
+    "MMSI": (8, 38, "u", None),
+    "Spare": (38, 46, "u", None),
+    "Speed Over Ground": (46, 56, "u", calculate_speed_over_ground),
+    "Position Accuracy": (56, 57, "u", None),
+    "Longitude": (57, 85, "s", calculate_longitude),
+    "Latitude": (85, 112, "s", calculate_latitude),
+    "Course Over Ground": (112, 124, "u", calculate_course_over_ground),
+    "True Heading": (124, 133, "u", calculate_heading),
+    "Timestamp": (133, 139, "u", calculate_timestamp),
+    "Spare 2": (139, 143, "u", None),
+    "Name": (143, 263, "t", None),
+    "Type of Ship and Cargo": (263, 271, "u", None),
+    "Dimension to Bow": (271, 280, "u", None),
+    "Dimension to Stern": (280, 289, "u", None),
+    "Dimension to Port": (289, 295, "u", None),
+    "Dimension to Starboard": (295, 301, "u", None),
+    "Position Fix Type": (301, 305, "u", None),
+    "RAIM Flag": (305, 306, "u", None),
+    "DTE": (306, 307, "u", None),
+    "Assigned Mode Flag": (307, 308, "u", None),
+    "Spare 3": (308, 311, "u", None),
+}
+_decode_fields = compile_field_layout(FIELD_LAYOUT)
+
 def decode_position_report_class_b_ext(binary_string: str):
     """
     Decode an extended class B position report (BPR), message type 19
@@ -14,29 +40,7 @@ def decode_position_report_class_b_ext(binary_string: str):
     """
 
     try:
-        decoded_data = {
-            "MMSI": safe_int(get_segment(binary_string, 8 , 38)),
-            "Spare": safe_int(get_segment(binary_string, 38, 46)),
-            "Speed Over Ground": calculate_speed_over_ground(safe_int(get_segment(binary_string, 46, 56))),
-            "Position Accuracy": safe_int(get_segment(binary_string, 56, 57)),
-            "Longitude": calculate_longitude(safe_int(get_segment(binary_string, 57, 85), signed=True)),
-            "Latitude": calculate_latitude(safe_int(get_segment(binary_string, 85, 112), signed=True)),
-            "Course Over Ground": calculate_course_over_ground(safe_int(get_segment(binary_string, 112, 124))),
-            "True Heading": calculate_heading(safe_int(get_segment(binary_string, 124, 133))),
-            "Timestamp": calculate_timestamp(safe_int(get_segment(binary_string, 133, 139))),
-            "Spare 2": safe_int(get_segment(binary_string, 139, 143)),
-            "Name": bitstring_to_ascii(get_segment(binary_string, 143, 263)).split("@")[0].strip(),
-            "Type of Ship and Cargo": safe_int(get_segment(binary_string, 263, 271)),
-            "Dimension to Bow": safe_int(get_segment(binary_string, 271, 280)),
-            "Dimension to Stern": safe_int(get_segment(binary_string, 280, 289)),
-            "Dimension to Port": safe_int(get_segment(binary_string, 289, 295)),
-            "Dimension to Starboard": safe_int(get_segment(binary_string, 295, 301)),
-            "Position Fix Type": safe_int(get_segment(binary_string, 301, 305)),
-            "RAIM Flag": safe_int(get_segment(binary_string, 305, 306)),
-            "DTE": safe_int(get_segment(binary_string, 306, 307)),
-            "Assigned Mode Flag": safe_int(get_segment(binary_string, 307, 308)),
-            "Spare 3": safe_int(get_segment(binary_string, 308, 311)),
-        }
+        decoded_data = _decode_fields(binary_string)
 
         stringified_data = {
             "MMSI": str(get_val(decoded_data["MMSI"])),
@@ -2,6 +2,16 @@
 from typing import Dict, Tuple, Optional, List
 from constants import safe_int, get_segment, get_val, bitstring_to_ascii, error_tuple
 
+"""Fields the decoder produces (the text is variable-length, so there is no FIELD_LAYOUT)"""
+FIELDS: Tuple[str, ...] = (
+    "MMSI",
+    "Sequence Number",
+    "Destination MMSI",
+    "Retransmit Flag",
+    "Spare",
+    "Text",
+)
+
 def decode_safety_related_broadcast(binary_payload: str):
     """
     Decode an addressed safety-related message (SRM), message type 14
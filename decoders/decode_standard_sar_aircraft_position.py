@@ -1,6 +1,6 @@
 # decode_standard_sar_aircraft_position.py -- logic for decoding Standard SAR Aircraft Position Reports (Message Type 9)
-from typing import Dict, Tuple, Optional, List
-from constants import safe_int, get_segment, get_val, calculate_longitude, calculate_latitude, longitude_to_string, latitude_to_string, speed_over_ground_to_string, calculate_speed_over_ground, calculate_course_over_ground, course_over_ground_to_string, error_tuple
+from typing import Dict, Tuple, Optional, List, Union
+from constants import get_val, calculate_longitude, calculate_latitude, longitude_to_string, latitude_to_string, speed_over_ground_to_string, calculate_speed_over_ground, calculate_course_over_ground, course_over_ground_to_string, error_tuple, FieldLayout, RawScaling, compile_field_layout, RAW_SPEED_OVER_GROUND_NOT_AVAILABLE
 
 # -- String conversion functions --
 def altitude_to_string(altitude: int) -> str:
@@ -13,6 +13,38 @@ def altitude_to_string(altitude: int) -> str:
     else:
         return f"{altitude} meters"
 
+def scale_speed_over_ground(raw_sog: int) -> int:
+    """Speed over ground from whole knots (1023: not available, 1022: 1022 knots or more) to tenths of a knot."""
+    if raw_sog == RAW_SPEED_OVER_GROUND_NOT_AVAILABLE:
+        return raw_sog
+    return raw_sog * 10 if raw_sog != -1 else raw_sog
+
+def convert_speed_over_ground(sog: int) -> Union[int, float]:
+    """calculate_speed_over_ground of a speed in tenths of a knot, keeping -1 (missing from the message) unchanged."""
+    return sog if sog == -1 else calculate_speed_over_ground(sog)
+
+"""Bit layout of each decoded field (see FieldLayout in constants.py). Conversions take the common raw units of RAW_SCALING."""
+FIELD_LAYOUT: FieldLayout = {
+    "MMSI": (8, 38, "u", None),
+    "Altitude": (38, 50, "u", None),
+    "Speed Over Ground": (50, 60, "u", convert_speed_over_ground),
+    "Position Accuracy": (60, 61, "u", None),
+    "Longitude": (61, 89, "s", calculate_longitude),
+    "Latitude": (89, 116, "s", calculate_latitude),
+    "Course Over Ground": (116, 128, "u", calculate_course_over_ground),
+    "Time Stamp": (128, 134, "u", None),
+    "Regional Reserved": (134, 142, "u", None),
+    "DTE": (142, 143, "u", None),
+    "Spare": (143, 146, "u", None),
+    "Assigned Mode Flag": (146, 147, "u", None),
+    "RAIM Flag": (147, 148, "u", None),
+    "Radio Status": (148, 168, "u", None),
+}
+
+"""Scaling of the speed over ground, transmitted in whole knots, to the common raw units (see RAW_FIELDS)"""
+RAW_SCALING: RawScaling = {"Speed Over Ground": scale_speed_over_ground}
+_decode_fields = compile_field_layout(FIELD_LAYOUT, raw_scaling=RAW_SCALING)
+
 def decode_standard_sar_aircraft_position(binary_payload: str):
     """
     Decode a Standard SAR Aircraft Position Report (Message Type 9)
@@ -25,22 +57,7 @@ def decode_standard_sar_aircraft_position(binary_payload: str):
     """
 
     try:
-        decoded_data = {
-            "MMSI": safe_int(get_segment(binary_payload, 8, 38)),
-            "Altitude": safe_int(get_segment(binary_payload, 38, 50)),
-            "Speed Over Ground": calculate_speed_over_ground(safe_int(get_segment(binary_payload, 50, 60))) * 10,
-            "Position Accuracy": safe_int(get_segment(binary_payload, 60, 61)),
-            "Longitude": calculate_longitude(safe_int(get_segment(binary_payload, 61, 89), signed=True)),
-            "Latitude": calculate_latitude(safe_int(get_segment(binary_payload, 89, 116), signed=True)),
-            "Course Over Ground": calculate_course_over_ground(safe_int(get_segment(binary_payload, 116, 128))),
-            "Time Stamp": safe_int(get_segment(binary_payload, 128, 134)),
-            "Regional Reserved": safe_int(get_segment(binary_payload, 134, 142)),
-            "DTE": safe_int(get_segment(binary_payload, 142, 143)),
-            "Spare": safe_int(get_segment(binary_payload, 143, 146)),
-            "Assigned Mode Flag": safe_int(get_segment(binary_payload, 146, 147)),
-            "RAIM Flag": safe_int(get_segment(binary_payload, 147, 148)),
-            "Radio Status": safe_int(get_segment(binary_payload, 148, 168))
-        }
+        decoded_data = _decode_fields(binary_payload)
  
         stringified_data = {
             "MMSI": f"{get_val(decoded_data['MMSI'])}",
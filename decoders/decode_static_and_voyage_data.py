@@ -1,6 +1,30 @@
 # decode_static_and_voyage_data.py -- logic for decoding Static and Voyage Related Data (Message Type 5)
 from typing import Dict, Tuple, Optional
-from constants import safe_int, get_segment, get_val, bitstring_to_ascii, EFIX_TYPES, SHIP_TYPE, AIS_TYPES, MONTHS, error_tuple
+from constants import get_val, EFIX_TYPES, SHIP_TYPE, AIS_TYPES, MONTHS, error_tuple, FieldLayout, compile_field_layout
+
+"""Bit layout of each decoded field (see FieldLayout in constants.py)"""
+FIELD_LAYOUT: FieldLayout = {
+    "MMSI": (8, 38, "u", None),
+    "AIS Version": (38, 40, "u", None),
+    "IMO Number": (40, 70, "u", None),
+    "Call Sign": (70, 112, "t", None),
+    "Vessel Name": (112, 232, "t", None),
+    "Type of Ship and Cargo": (232, 240, "u", None),
+    "Dimensions to Bow": (240, 249, "u", None),
+    "Dimensions to Stern": (249, 258, "u", None),
+    "Dimensions to Port": (258, 264, "u", None),
+    "Dimensions to Starboard": (264, 270, "u", None),
+    "Position Fixing Device": (270, 274, "u", None),
+    "ETA Month": (274, 278, "u", None),
+    "ETA Day": (278, 283, "u", None),
+    "ETA Hour": (283, 288, "u", None),
+    "ETA Minute": (288, 294, "u", None),
+    "Draught": (294, 302, "u", lambda raw: raw / 10),
+    "Destination": (302, 422, "t", None),
+    "Data Terminal Ready": (422, 423, "u", None),
+    "Spare": (423, 424, "u", None),
+}
+_decode_fields = compile_field_layout(FIELD_LAYOUT)
 
 def decode_static_and_voyage_data(binary_string: str) -> Tuple[Dict[str, Optional[int]], Dict[str, str]]:
     """
@@ -15,27 +39,7 @@ def decode_static_and_voyage_data(binary_string: str) -> Tuple[Dict[str, Optiona
     and a dictionary of the stringified values.
     """
     try:
-        decoded_data = {
-            "MMSI": safe_int(get_segment(binary_string, 8, 38)),
-            "AIS Version": safe_int(get_segment(binary_string, 38, 40)),
-            "IMO Number": safe_int(get_segment(binary_string, 40, 70)),
-            "Call Sign": bitstring_to_ascii(get_segment(binary_string, 70, 112)).split('@')[0].strip(),
-            "Vessel Name": bitstring_to_ascii(get_segment(binary_string, 112, 232)).split('@')[0].strip(),
-            "Type of Ship and Cargo": safe_int(get_segment(binary_string, 232, 240)),
-            "Dimensions to Bow": safe_int(get_segment(binary_string, 240, 249)),
-            "Dimensions to Stern": safe_int(get_segment(binary_string, 249, 258)),
-            "Dimensions to Port": safe_int(get_segment(binary_string, 258, 264)),
-            "Dimensions to Starboard": safe_int(get_segment(binary_string, 264, 270)),
-            "Position Fixing Device": safe_int(get_segment(binary_string, 270, 274)),
-            "ETA Month": safe_int(get_segment(binary_string, 274, 278)),
-            "ETA Day": safe_int(get_segment(binary_string, 278, 283)),
-            "ETA Hour": safe_int(get_segment(binary_string, 283, 288)),
-            "ETA Minute": safe_int(get_segment(binary_string, 288, 294)),
-            "Draught": safe_int(get_segment(binary_string, 294, 302)) / 10,
-            "Destination": bitstring_to_ascii(get_segment(binary_string, 302, 422)).split('@')[0].strip(),
-            "Data Terminal Ready": safe_int(get_segment(binary_string, 422, 423)),
-            "Spare": safe_int(get_segment(binary_string, 423, 424))
-        }
+        decoded_data = _decode_fields(binary_string)
 
         stringified_data = {
             "MMSI": f"{get_val(decoded_data['MMSI'])}",
@@ -1,6 +1,23 @@
 # decode_static_data_report.py -- logic for decoding static data reports (Message type 24)
 from typing import Dict, Tuple, Optional, List, Union
-from constants import safe_int, get_segment, bitstring_to_ascii, get_val, error_tuple
+from constants import safe_int, get_segment, decode_text_field, get_val, error_tuple
+
+"""Fields the decoder can produce: part A (0) carries the vessel name, part B (1) the other static data, so there is no single FIELD_LAYOUT"""
+FIELDS: Tuple[str, ...] = (
+    "MMSI",
+    "Part Number",
+    "Vessel Name",
+    "Ship Type",
+    "Vendor ID",
+    "Unit Model Code",
+    "Serial Number",
+    "Call Sign",
+    "Dimension to Bow",
+    "Dimension to Stern",
+    "Dimension to Port",
+    "Dimension to Starboard",
+    "Spare",
+)
 
 def decode_static_data_report(encodedPayload: str) -> Tuple[Dict, Dict]:
     """
@@ -22,7 +39,7 @@ def decode_static_data_report(encodedPayload: str) -> Tuple[Dict, Dict]:
         part_number = decoded_data_1["Part Number"]
         if(part_number == 0):
             decoded_data_2 = {
-                "Vessel Name": bitstring_to_ascii(get_segment(encodedPayload, 40, 160)).split("@")[0],
+                "Vessel Name": decode_text_field(get_segment(encodedPayload, 40, 160)),
                 "Spare": safe_int(get_segment(encodedPayload, 160, 168)),
             }
 
@@ -35,10 +52,10 @@ def decode_static_data_report(encodedPayload: str) -> Tuple[Dict, Dict]:
         elif(part_number == 1):
             decoded_data_2 = {
                 "Ship Type": safe_int(get_segment(encodedPayload, 40, 48)),
-                "Vendor ID": bitstring_to_ascii(get_segment(encodedPayload, 48, 66)).split("@")[0],
+                "Vendor ID": decode_text_field(get_segment(encodedPayload, 48, 66)),
                 "Unit Model Code": safe_int(get_segment(encodedPayload, 66, 70)),
                 "Serial Number": safe_int(get_segment(encodedPayload, 70, 90)),
-                "Call Sign": bitstring_to_ascii(get_segment(encodedPayload, 90, 132)).split("@")[0],
+                "Call Sign": decode_text_field(get_segment(encodedPayload, 90, 132)),
                 "Dimension to Bow": safe_int(get_segment(encodedPayload, 132, 141)),
                 "Dimension to Stern": safe_int(get_segment(encodedPayload, 141, 150)),
                 "Dimension to Port": safe_int(get_segment(encodedPayload, 150, 156)),
@@ -70,5 +87,6 @@ def decode_static_data_report(encodedPayload: str) -> Tuple[Dict, Dict]:
     except Exception as e:
         return error_tuple(e)
     
-    return (decoded_data_1.update(decoded_data_2), stringified_data)
+    decoded_data_1.update(decoded_data_2)
+    return (decoded_data_1, stringified_data)
 
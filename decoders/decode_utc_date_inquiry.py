@@ -1,6 +1,15 @@
 # decode_utc_date_inquiry.py -- logic for decoding UTC/Date Inquiry Messages (type 10)
 from typing import Dict, Tuple, Optional, List
-from constants import safe_int, get_segment, get_val, error_tuple
+from constants import get_val, error_tuple, FieldLayout, compile_field_layout
+
+"""Bit layout of each decoded field (see FieldLayout in constants.py)"""
+FIELD_LAYOUT: FieldLayout = {
+    "MMSI": (8, 38, "u", None),
+    "Spare": (38, 40, "u", None),
+    "Destination MMSI": (40, 70, "u", None),
+    "Spare 2": (70, 72, "u", None),
+}
+_decode_fields = compile_field_layout(FIELD_LAYOUT)
 
 def decode_utc_date_inquiry(binary_string: str):
     """
@@ -14,12 +23,7 @@ def decode_utc_date_inquiry(binary_string: str):
     """
 
     try:
-        decoded_data = {
-            "MMSI": safe_int(get_segment(binary_string, 8, 38)),
-            "Spare": safe_int(get_segment(binary_string, 38, 40)),
-            "Destination MMSI": safe_int(get_segment(binary_string, 40, 70)),
-            "Spare": safe_int(get_segment(binary_string, 70, 72))
-        }
+        decoded_data = _decode_fields(binary_string)
 
         stringified_data = {
             "MMSI": f"{get_val(decoded_data['MMSI'])}",
@@ -0,0 +1,76 @@
+# projection.py -- projected decoders that extract only a requested subset of fields, optionally as raw fixed-point integers
+from typing import Callable, Dict, Optional, Sequence, Tuple
+from constants import compile_field_layout, RAW_FIELDS
+from .registry import DECODER_REGISTRY, DecoderRegistry
+
+
+"""Projected decoders already built, keyed by (full decoder, requested fields, raw)"""
+_PROJECTED_DECODERS: Dict[Tuple[Callable, Optional[Tuple[str, ...]], bool], Callable[[str], Tuple[Dict, Dict]]] = {}
+
+
+def _build_layout_decoder(layout: Dict, fields: Tuple[str, ...], raw: bool = False, raw_scaling: Optional[Dict] = None) -> Callable[[str], Tuple[Dict, Dict]]:
+    """
+    Build a decoder reading only the bit ranges of `fields`. Stringified values are not produced.
+    In raw mode, the conversions of RAW_FIELDS are skipped and their integer values are returned as-is.
+    """
+    decode_fields = compile_field_layout(layout, fields, raw, raw_scaling)
+
+    def decode_projected(binary_string: str) -> Tuple[Dict, Dict]:
+        return (decode_fields(binary_string), {})
+
+    return decode_projected
+
+
+def _build_filtering_decoder(decoder: Callable[[str], Tuple[Dict, Dict]], fields: Tuple[str, ...]) -> Callable[[str], Tuple[Dict, Dict]]:
+    """Fallback for message types without a field layout: run the full decoder and keep the requested fields."""
+    def decode_filtered(binary_string: str) -> Tuple[Dict, Dict]:
+        decoded_data, stringified_data = decoder(binary_string)
+        if "Error" in decoded_data:
+            return (decoded_data, stringified_data)
+        return ({field: decoded_data[field] for field in fields if field in decoded_data},
+                {field: stringified_data[field] for field in fields if field in stringified_data})
+
+    return decode_filtered
+
+
+def get_projected_decoder(message_type: int, fields: Optional[Sequence[str]] = None, raw: bool = False, registry: DecoderRegistry = DECODER_REGISTRY) -> Optional[Callable[[str], Tuple[Dict, Dict]]]:
+    """
+    Return a decoder for `message_type` that only extracts `fields` (all fields if None), building and caching it on first use.
+
+    Message types whose decoder declares a FIELD_LAYOUT get a decoder that reads only the requested bit ranges;
+    other types fall back to the full decoder with its output filtered. Returns None if the type has no decoder.
+
+    If `raw` is set, latitude/longitude are returned as integers in 1/10000 minute and SOG/COG in tenths (see
+    RAW_FIELDS in constants.py), with sentinel values preserved; types transmitting other units (9, 27) are scaled
+    to these. Types without a layout are decoded normally.
+    """
+    decoder = registry.get(message_type)
+    if decoder is None:
+        return None
+    cache_key = (decoder, tuple(fields) if fields is not None else None, raw)
+    projected_decoder = _PROJECTED_DECODERS.get(cache_key)
+    if projected_decoder is None:
+        layout = registry.get_field_layout(message_type)
+        if layout is not None:
+            projected_decoder = _build_layout_decoder(layout, cache_key[1] if fields is not None else tuple(layout), raw, registry.get_raw_scaling(message_type))
+        elif fields is not None:
+            projected_decoder = _build_filtering_decoder(decoder, cache_key[1])
+        else:
+            projected_decoder = decoder
+        _PROJECTED_DECODERS[cache_key] = projected_decoder
+    return projected_decoder
+
+
+def convert_raw_fields(message_type: int, decoded_data: Dict, registry: DecoderRegistry = DECODER_REGISTRY) -> Dict:
+    """
+    Convert the raw fixed-point fields of a raw-mode result to the values the full decoder produces (floats in
+    degrees and knots, with the same sentinel handling). Returns a new dictionary; other fields are copied as-is.
+    """
+    layout = registry.get_field_layout(message_type)
+    if layout is None:
+        return dict(decoded_data)
+    converted_data = dict(decoded_data)
+    for field in RAW_FIELDS:
+        if field in converted_data and field in layout and layout[field][3] is not None:
+            converted_data[field] = layout[field][3](converted_data[field])
+    return converted_data
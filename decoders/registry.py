@@ -0,0 +1,112 @@
+# registry.py -- message type -> decoder registry. Decoder modules are imported on first use of their message type.
+import importlib
+import sys
+from typing import Any, Callable, Dict, Optional, Set, Tuple, Union
+
+
+"""Default decoder for each supported message type, as "module:function" import paths"""
+DEFAULT_DECODERS: Dict[int, str] = {
+    1: "decoders.decode_position_report_class_a:decode_position_report_class_a",
+    2: "decoders.decode_position_report_class_a:decode_position_report_class_a",
+    3: "decoders.decode_position_report_class_a:decode_position_report_class_a",
+    4: "decoders.decode_base_station_report:decode_base_station_report",
+    5: "decoders.decode_static_and_voyage_data:decode_static_and_voyage_data",
+    6: "decoders.decode_binary_addressed_message:decode_binary_addressed_messsage",
+    7: "decoders.decode_binary_acknowledge:decode_binary_acknowledge",
+    8: "decoders.decode_binary_broadcast_message:decode_binary_broadcast_message",
+    9: "decoders.decode_standard_sar_aircraft_position:decode_standard_sar_aircraft_position",
+    10: "decoders.decode_utc_date_inquiry:decode_utc_date_inquiry",
+    11: "decoders.decode_base_station_report:decode_base_station_report",
+    13: "decoders.decode_binary_acknowledge:decode_binary_acknowledge",
+    14: "decoders.decode_safety_related_broadcast:decode_safety_related_broadcast",
+    15: "decoders.decode_interrogation:decode_interrogation",
+    16: "decoders.decode_assignment_mode_command:decode_assignment_mode_command",
+    18: "decoders.decode_position_report_class_b:decode_position_report_class_b",
+    19: "decoders.decode_position_report_class_b_ext:decode_position_report_class_b_ext",
+    21: "decoders.decode_aid_to_navigation:decode_aid_to_navigation",
+    24: "decoders.decode_static_data_report:decode_static_data_report",
+    25: "decoders.decode_single_slot_binary_message:decode_single_slot_binary_message",
+    26: "decoders.decode_multi_slot_binary_message:decode_multi_slot_binary_message",
+    27: "decoders.decode_long_range_broadcast:decode_long_range_broadcast",
+}
+
+
+def import_decoder(import_path: str) -> Callable:
+    """Import a decoder from a "module:function" path."""
+    module_name, _, function_name = import_path.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+class DecoderRegistry:
+    """
+    Maps message types to decoder functions.
+
+    Decoders may be registered as callables or as "module:function" import paths; the latter are imported the
+    first time a message of that type is decoded. Disabled types are not decoded at all.
+    """
+
+    def __init__(self, decoders: Optional[Dict[int, Union[Callable, str]]] = None):
+        self._decoders: Dict[int, Union[Callable, str]] = dict(DEFAULT_DECODERS if decoders is None else decoders)
+        self._loaded: Dict[int, Callable] = {}
+        self.disabled: Set[int] = set()
+
+    def get(self, message_type: int, default: Optional[Callable] = None) -> Optional[Callable]:
+        """Return the decoder for a message type (importing it if necessary), or `default` if the type is unsupported or disabled."""
+        decoder = self._loaded.get(message_type)
+        if decoder is not None:
+            return decoder
+        if message_type in self.disabled or message_type not in self._decoders:
+            return default
+        decoder = self._decoders[message_type]
+        if isinstance(decoder, str):
+            decoder = import_decoder(decoder)
+        self._loaded[message_type] = decoder
+        return decoder
+
+    def _module_attribute(self, message_type: int, name: str) -> Optional[Any]:
+        decoder = self.get(message_type)
+        if decoder is None:
+            return None
+        return getattr(sys.modules.get(decoder.__module__), name, None)
+
+    def get_field_layout(self, message_type: int) -> Optional[Dict]:
+        """The FIELD_LAYOUT declared alongside the decoder for a message type, or None if its module has none."""
+        return self._module_attribute(message_type, "FIELD_LAYOUT")
+
+    def get_fields(self, message_type: int) -> Optional[Tuple[str, ...]]:
+        """
+        Every field the decoder of a message type can produce, in output order: the fields of its FIELD_LAYOUT, or the
+        FIELDS its module declares when the fields depend on the message (e.g. type 24 parts). None if neither is declared.
+        """
+        layout = self.get_field_layout(message_type)
+        if layout is not None:
+            return tuple(layout)
+        return self._module_attribute(message_type, "FIELDS")
+
+    def get_raw_scaling(self, message_type: int) -> Optional[Dict]:
+        """The RAW_SCALING declared alongside the decoder for a message type (see RawScaling in constants.py), or None."""
+        return self._module_attribute(message_type, "RAW_SCALING")
+
+    def register(self, message_type: int, decoder: Union[Callable, str]) -> None:
+        """Register or override the decoder for a message type. Also re-enables the type if it was disabled."""
+        self._decoders[message_type] = decoder
+        self._loaded.pop(message_type, None)
+        self.disabled.discard(message_type)
+
+    def disable(self, message_type: int) -> None:
+        """Stop decoding a message type. Messages of disabled types are skipped by parse_ais_messages."""
+        self.disabled.add(message_type)
+        self._loaded.pop(message_type, None)
+
+    def enable(self, message_type: int) -> None:
+        self.disabled.discard(message_type)
+
+    def is_disabled(self, message_type: int) -> bool:
+        return message_type in self.disabled
+
+    def __contains__(self, message_type: int) -> bool:
+        return message_type in self._decoders and message_type not in self.disabled
+
+
+"""Registry used by ais_decoder"""
+DECODER_REGISTRY: DecoderRegistry = DecoderRegistry()
@@ -0,0 +1,157 @@
+# delta_stream.py -- per-vessel delta encoding of decoded messages: only the fields that changed since the vessel's previous record are sent
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+"""Records of a vessel and message type between keyframes"""
+DEFAULT_KEYFRAME_EVERY: int = 20
+
+"""Seconds (receive time, or the wall clock for untagged input) after which a vessel's next record is a keyframe"""
+DEFAULT_KEYFRAME_SECONDS: float = 300.0
+
+"""Fields identifying the stream a record belongs to, sent in every record ("Part Number" only in type 24 records)"""
+KEY_FIELDS: Tuple[str, ...] = ("MMSI", "Message Type", "Part Number")
+
+"""Marks full records; consumers (re)synchronize on them"""
+KEYFRAME_FIELD: str = "Keyframe"
+
+"""Receive time of a record, sent whenever it is known (it changes with every record)"""
+RECEIVE_TIME_FIELD: str = "Receive Time"
+
+"""Lists the fields the previous record of the stream carried and this one does not"""
+REMOVED_FIELD: str = "Removed"
+
+"""Compact JSON separators for serialized records"""
+JSON_SEPARATORS: Tuple[str, str] = (",", ":")
+
+"""Key of the state of a record stream: MMSI, message type and (for type 24) part number"""
+StreamKey = Tuple[Any, int, Any]
+
+
+def stream_key(message_type: int, payload_info: Dict) -> StreamKey:
+    # Type 24 alternates between parts A and B, which carry different fields
+    return (payload_info.get("MMSI"), message_type, payload_info.get("Part Number"))
+
+
+class _StreamState:
+    __slots__ = ("fields", "records_since_keyframe", "keyframe_time")
+
+    def __init__(self, fields: Dict, keyframe_time: float):
+        self.fields = fields
+        self.records_since_keyframe = 0
+        self.keyframe_time = keyframe_time
+
+
+class DeltaEncoder:
+    """
+    Turns decoded payloads into a delta stream. The encoder keeps the last record sent for each MMSI and message type
+    (and type 24 part); a new record carries only the key (MMSI, message type and the type 24 part number), the
+    receive time and the fields whose value changed. Fields a record no longer carries are listed under "Removed".
+
+    Every `keyframe_every` records of a stream, or once `keyframe_seconds` have passed since its last keyframe, the
+    full record is sent instead, marked with "Keyframe": true, so consumers that join late or lose records
+    resynchronize. The first record of every stream is a keyframe. Payloads that failed to decode are sent in full
+    and do not change the state.
+
+    Args:
+    keyframe_every (int): Records of a stream between keyframes.
+    keyframe_seconds (float): Seconds after which the next record of a stream is a keyframe.
+    clock (Callable[[], float]): Time source for records without a receive time.
+    """
+
+    def __init__(self, keyframe_every: int = DEFAULT_KEYFRAME_EVERY, keyframe_seconds: float = DEFAULT_KEYFRAME_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        self.keyframe_every = keyframe_every
+        self.keyframe_seconds = keyframe_seconds
+        self.clock = clock
+        self.records = 0
+        self.keyframes = 0
+        self.fields_sent = 0
+        self.fields_total = 0
+        self._streams: Dict[StreamKey, _StreamState] = {}
+
+    def encode(self, message_type: int, payload_info: Dict, receive_time: Optional[float] = None) -> Dict:
+        """The record to send for a decoded payload: a keyframe, or its changes since the stream's previous record."""
+        self.records += 1
+        self.fields_total += len(payload_info)
+        record = {"MMSI": payload_info.get("MMSI"), "Message Type": message_type}
+        if "Part Number" in payload_info:
+            record["Part Number"] = payload_info["Part Number"]
+        if receive_time is not None:
+            record[RECEIVE_TIME_FIELD] = receive_time
+        if "Error" in payload_info:
+            record.update(payload_info)
+            self.fields_sent += len(payload_info)
+            return record
+        now = receive_time if receive_time is not None else self.clock()
+        key = stream_key(message_type, payload_info)
+        state = self._streams.get(key)
+        if state is None or state.records_since_keyframe + 1 >= self.keyframe_every or now - state.keyframe_time >= self.keyframe_seconds:
+            self._streams[key] = _StreamState(payload_info, now)
+            self.keyframes += 1
+            record[KEYFRAME_FIELD] = True
+            record.update(payload_info)
+            self.fields_sent += len(payload_info)
+            return record
+        previous = state.fields
+        for field, value in payload_info.items():
+            if field not in previous or previous[field] != value:
+                record[field] = value
+        removed = [field for field in previous if field not in payload_info]
+        self.fields_sent += sum(1 for field in record if field not in KEY_FIELDS and field != RECEIVE_TIME_FIELD) + len(removed)
+        if removed:
+            record[REMOVED_FIELD] = removed
+        state.fields = payload_info
+        state.records_since_keyframe += 1
+        return record
+
+    def encode_messages(self, messages: Iterable) -> List[Dict]:
+        """Records for decoded AISMessage objects."""
+        return [self.encode(message.message_type_int, message.payload_info, message.receive_time) for message in messages]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "records": self.records,
+            "keyframes": self.keyframes,
+            "streams": len(self._streams),
+            "fields_sent_ratio": self.fields_sent / self.fields_total if self.fields_total else 0.0,
+        }
+
+
+class DeltaDecoder:
+    """
+    Rebuilds full payloads from a delta stream written by DeltaEncoder. Deltas of a stream whose keyframe has not
+    been seen (e.g. after joining a live stream) cannot be applied: they are counted in `missing_keyframes` and
+    dropped until the stream's next keyframe.
+    """
+
+    def __init__(self):
+        self.missing_keyframes = 0
+        self._streams: Dict[StreamKey, Dict] = {}
+
+    def decode(self, record: Dict) -> Optional[Dict]:
+        """The full payload of a record (without its message type, keyframe and receive time fields), or None if it cannot be rebuilt yet."""
+        message_type = record["Message Type"]
+        if "Error" in record:
+            return {field: value for field, value in record.items() if field not in (RECEIVE_TIME_FIELD, "Message Type")}
+        if record.get(KEYFRAME_FIELD):
+            payload_info = {field: value for field, value in record.items() if field not in (KEYFRAME_FIELD, RECEIVE_TIME_FIELD, "Message Type")}
+            self._streams[stream_key(message_type, payload_info)] = payload_info
+            return dict(payload_info)
+        previous = self._streams.get(stream_key(message_type, record))
+        if previous is None:
+            self.missing_keyframes += 1
+            return None
+        for field, value in record.items():
+            if field not in (RECEIVE_TIME_FIELD, "Message Type", REMOVED_FIELD):
+                previous[field] = value
+        for field in record.get(REMOVED_FIELD, ()):
+            if field in previous:
+                del previous[field]
+        return dict(previous)
+
+
+def encode_json_lines(records: Iterable[Dict], default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Serialize records as compact JSON, one per line."""
+    return "".join(json.dumps(record, separators=JSON_SEPARATORS, default=default) + "\n" for record in records)
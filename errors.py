@@ -0,0 +1,61 @@
+# errors.py -- structured error records and counters for the decode loop
+from collections import Counter, deque
+from enum import IntEnum
+from typing import Deque, Dict, NamedTuple, Optional
+
+
+class ErrorCode(IntEnum):
+    """Categories of errors encountered while parsing sentences. OK (0) is falsy, so codes can be tested directly."""
+    OK = 0
+    INVALID_INPUT = 1
+    MALFORMED_SENTENCE = 2
+    INVALID_PAYLOAD = 3
+    UNSUPPORTED_MESSAGE_TYPE = 4
+    NON_SEQUENTIAL_FRAGMENT = 5
+    UNEXPECTED_ERROR = 6
+
+
+ERROR_DESCRIPTIONS: Dict[ErrorCode, str] = {
+    ErrorCode.OK: "No error",
+    ErrorCode.INVALID_INPUT: "Invalid input type: expected string or list",
+    ErrorCode.MALFORMED_SENTENCE: "Malformed sentence",
+    ErrorCode.INVALID_PAYLOAD: "Invalid characters in payload",
+    ErrorCode.UNSUPPORTED_MESSAGE_TYPE: "Unsupported message type",
+    ErrorCode.NON_SEQUENTIAL_FRAGMENT: "Received non-sequential fragment while reassembling a multipart message",
+    ErrorCode.UNEXPECTED_ERROR: "Unexpected error",
+}
+
+
+class DecodeError(NamedTuple):
+    """A failed sentence (or group of fragments) and the reason it was rejected. Formatting is deferred to __str__."""
+    code: ErrorCode
+    raw_sentence: str
+
+    def __str__(self) -> str:
+        return f"Error: {ERROR_DESCRIPTIONS[self.code]}: {self.raw_sentence}"
+
+
+class ErrorStats:
+    """
+    Aggregated per-category error counters, with an optional bounded dead-letter sink.
+
+    Args:
+    dead_letter_size (int): Number of most recent failed records to keep (with their raw sentences). 0 disables the sink.
+    """
+
+    def __init__(self, dead_letter_size: int = 0):
+        self.counts: Counter = Counter()
+        self.dead_letters: Optional[Deque[DecodeError]] = deque(maxlen=dead_letter_size) if dead_letter_size > 0 else None
+
+    def record(self, error: DecodeError) -> None:
+        self.counts[error.code] += 1
+        if self.dead_letters is not None:
+            self.dead_letters.append(error)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def summary(self) -> Dict[str, int]:
+        """Counts keyed by error category name, e.g. {"INVALID_PAYLOAD": 3}."""
+        return {code.name: count for code, count in sorted(self.counts.items())}
@@ -0,0 +1,248 @@
+# geofence.py -- indexed point-in-polygon evaluation of position reports, with per-vessel enter/exit events
+import json
+import math
+from constants import POSITION_REPORT_TYPES
+from decoders.projection import convert_raw_fields
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+"""A polygon ring as a closed or open sequence of (longitude, latitude) vertices"""
+Ring = Sequence[Tuple[float, float]]
+
+"""Default size of the index grid cells, in degrees"""
+DEFAULT_CELL_SIZE_DEGREES: float = 1.0
+
+"""Maximum (point, fence edge) combinations evaluated at once by batch point-in-polygon"""
+BATCH_CHUNK_EDGES: int = 1 << 20
+
+
+def point_in_ring(longitude: float, latitude: float, ring: Ring) -> bool:
+    """Ray casting test of a point against a single ring. Points exactly on an edge may fall either way."""
+    inside = False
+    previous_longitude, previous_latitude = ring[-1]
+    for vertex_longitude, vertex_latitude in ring:
+        if (vertex_latitude > latitude) != (previous_latitude > latitude):
+            crossing = (previous_longitude - vertex_longitude) * (latitude - vertex_latitude) / (previous_latitude - vertex_latitude) + vertex_longitude
+            if longitude < crossing:
+                inside = not inside
+        previous_longitude, previous_latitude = vertex_longitude, vertex_latitude
+    return inside
+
+
+class Geofence:
+    """
+    A named area made of one or more polygons, each an exterior ring followed by optional hole rings.
+
+    Args:
+    fence_id (str): Identifier reported in events.
+    polygons (Sequence[Sequence[Ring]]): Polygons as lists of rings of (longitude, latitude) vertices.
+    properties (Optional[Dict]): Arbitrary properties (e.g. from GeoJSON).
+    """
+
+    def __init__(self, fence_id: str, polygons: Sequence[Sequence[Ring]], properties: Optional[Dict[str, Any]] = None):
+        self.fence_id = fence_id
+        self.polygons: List[List[List[Tuple[float, float]]]] = [[[(float(x), float(y)) for x, y in ring] for ring in polygon] for polygon in polygons if polygon]
+        self.properties = properties or {}
+        exterior_points = [point for polygon in self.polygons for point in polygon[0]]
+        self.bbox: Tuple[float, float, float, float] = (min(x for x, _ in exterior_points), min(y for _, y in exterior_points),
+                                                        max(x for x, _ in exterior_points), max(y for _, y in exterior_points))
+
+    def __repr__(self) -> str:
+        return f"Geofence({self.fence_id!r})"
+
+    def contains(self, longitude: float, latitude: float) -> bool:
+        min_longitude, min_latitude, max_longitude, max_latitude = self.bbox
+        if not (min_longitude <= longitude <= max_longitude and min_latitude <= latitude <= max_latitude):
+            return False
+        for polygon in self.polygons:
+            if point_in_ring(longitude, latitude, polygon[0]) and not any(point_in_ring(longitude, latitude, hole) for hole in polygon[1:]):
+                return True
+        return False
+
+
+class GeofenceIndex:
+    """
+    Grid index over geofence bounding boxes, so each point is only tested against the fences whose bounding box
+    covers its grid cell.
+
+    Args:
+    fences (Iterable[Geofence]): The fences to index.
+    cell_size (float): Grid cell size in degrees.
+    """
+
+    def __init__(self, fences: Iterable[Geofence] = (), cell_size: float = DEFAULT_CELL_SIZE_DEGREES):
+        self.cell_size = cell_size
+        self.fences: List[Geofence] = []
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        self._arrays: Optional[Dict[str, Any]] = None
+        for fence in fences:
+            self.add(fence)
+
+    def __len__(self) -> int:
+        return len(self.fences)
+
+    def _cell(self, longitude: float, latitude: float) -> Tuple[int, int]:
+        return (math.floor(longitude / self.cell_size), math.floor(latitude / self.cell_size))
+
+    def add(self, fence: Geofence) -> None:
+        fence_index = len(self.fences)
+        self.fences.append(fence)
+        self._arrays = None
+        min_x, min_y = self._cell(fence.bbox[0], fence.bbox[1])
+        max_x, max_y = self._cell(fence.bbox[2], fence.bbox[3])
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                self.cells.setdefault((cell_x, cell_y), []).append(fence_index)
+
+    def candidates(self, longitude: float, latitude: float) -> List[int]:
+        """Indices of the fences whose bounding box covers the point's grid cell."""
+        return self.cells.get(self._cell(longitude, latitude), [])
+
+    def containing(self, longitude: float, latitude: float) -> List[int]:
+        """Indices of the fences containing the point."""
+        return [fence_index for fence_index in self.candidates(longitude, latitude) if self.fences[fence_index].contains(longitude, latitude)]
+
+    def _build_arrays(self) -> Dict[str, Any]:
+        """Flat numpy arrays of the grid (cell key -> fence indices) and of every fence's edges, for batch evaluation."""
+        cell_items = sorted((cell_x * (1 << 32) + cell_y, fence_indices) for (cell_x, cell_y), fence_indices in self.cells.items())
+        edges = [(fence_index, ring[position - 1], ring[position])
+                 for fence_index, fence in enumerate(self.fences) for polygon in fence.polygons for ring in polygon for position in range(len(ring))]
+        edge_counts = np.bincount(np.array([edge[0] for edge in edges], dtype=np.int64), minlength=len(self.fences))
+        return {
+            "cell_keys": np.array([key for key, _ in cell_items], dtype=np.int64),
+            "cell_offsets": np.cumsum([0] + [len(fence_indices) for _, fence_indices in cell_items]),
+            "cell_fences": np.array([fence_index for _, fence_indices in cell_items for fence_index in fence_indices], dtype=np.int64),
+            "edges": np.array([start + end for _, start, end in edges], dtype=np.float64).reshape(-1, 4),
+            "edge_starts": np.cumsum(edge_counts) - edge_counts,
+            "edge_counts": edge_counts,
+        }
+
+    def containing_points(self, longitudes: Any, latitudes: Any) -> Tuple[Any, Any]:
+        """
+        Batch point-in-polygon for backfills (requires numpy). Candidate (point, fence) pairs come from the grid,
+        and the ray casting of all their edges is evaluated in vectorized chunks (even-odd rule over all rings of a fence).
+
+        Returns:
+        Tuple[np.ndarray, np.ndarray]: Point indices and fence indices of every point/fence membership.
+        """
+        if np is None:
+            raise ImportError("Batch point-in-polygon requires numpy (pip install numpy)")
+        if self._arrays is None:
+            self._arrays = self._build_arrays()
+        arrays = self._arrays
+        if len(arrays["cell_keys"]) == 0:
+            return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        point_keys = np.floor(longitudes / self.cell_size).astype(np.int64) * (1 << 32) + np.floor(latitudes / self.cell_size).astype(np.int64)
+        cell_positions = np.searchsorted(arrays["cell_keys"], point_keys)
+        cell_positions = np.minimum(cell_positions, len(arrays["cell_keys"]) - 1)
+        found = arrays["cell_keys"][cell_positions] == point_keys
+        counts = np.where(found, arrays["cell_offsets"][cell_positions + 1] - arrays["cell_offsets"][cell_positions], 0)
+        points = np.repeat(np.arange(len(longitudes)), counts)
+        fence_positions = np.repeat(arrays["cell_offsets"][cell_positions] - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+        fences = arrays["cell_fences"][fence_positions]
+
+        bboxes = np.array([fence.bbox for fence in self.fences], dtype=np.float64).reshape(-1, 4)[fences]
+        in_bbox = (longitudes[points] >= bboxes[:, 0]) & (longitudes[points] <= bboxes[:, 2]) & (latitudes[points] >= bboxes[:, 1]) & (latitudes[points] <= bboxes[:, 3])
+        points, fences = points[in_bbox], fences[in_bbox]
+
+        inside = np.zeros(len(points), dtype=bool)
+        pair_edge_counts = arrays["edge_counts"][fences]
+        chunk_size = max(1, BATCH_CHUNK_EDGES // max(int(arrays["edge_counts"].max(initial=1)), 1))
+        for chunk_start in range(0, len(points), chunk_size):
+            chunk = slice(chunk_start, chunk_start + chunk_size)
+            chunk_counts = pair_edge_counts[chunk]
+            pair_ids = np.repeat(np.arange(len(chunk_counts)), chunk_counts)
+            edge_ids = np.repeat(arrays["edge_starts"][fences[chunk]] - np.cumsum(chunk_counts) + chunk_counts, chunk_counts) + np.arange(int(chunk_counts.sum()))
+            x, y = longitudes[points[chunk]][pair_ids], latitudes[points[chunk]][pair_ids]
+            start_x, start_y, end_x, end_y = arrays["edges"][edge_ids].T
+            straddles = (end_y > y) != (start_y > y)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossing = (start_x - end_x) * (y - end_y) / (start_y - end_y) + end_x
+            crossings = np.bincount(pair_ids, weights=straddles & (x < crossing), minlength=len(chunk_counts))
+            inside[chunk] = crossings.astype(np.int64) % 2 == 1
+        return (points[inside], fences[inside])
+
+
+def geofences_from_geojson(source: Union[str, Dict]) -> List[Geofence]:
+    """
+    Load Polygon and MultiPolygon features from a GeoJSON file path or an already parsed GeoJSON dictionary.
+
+    The fence ID is the feature's "id", else its "name" property, else its position in the collection.
+    Other geometry types are skipped.
+    """
+    if isinstance(source, str):
+        with open(source, "r") as f:
+            source = json.load(f)
+    features = source["features"] if source.get("type") == "FeatureCollection" else [source]
+    fences: List[Geofence] = []
+    for position, feature in enumerate(features):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            continue
+        properties = feature.get("properties") or {}
+        fence_id = str(feature.get("id", properties.get("name", position)))
+        fences.append(Geofence(fence_id, [[[vertex[:2] for vertex in ring] for ring in polygon] for polygon in polygons], properties))
+    return fences
+
+
+class GeofenceEvent(NamedTuple):
+    mmsi: int
+    fence_id: str
+    event: str  # "enter" or "exit"
+    receive_time: Optional[float]
+    latitude: float
+    longitude: float
+
+
+class GeofenceTracker:
+    """
+    Tracks which fences each vessel is in and emits an event whenever a position report enters or leaves one.
+
+    Args:
+    index (GeofenceIndex): The indexed fences.
+    raw (bool): Set if the messages were decoded with raw=True.
+    """
+
+    def __init__(self, index: GeofenceIndex, raw: bool = False):
+        self.index = index
+        self.raw = raw
+        self.membership: Dict[int, FrozenSet[int]] = {}
+
+    def update(self, mmsi: int, longitude: float, latitude: float, receive_time: Optional[float] = None) -> List[GeofenceEvent]:
+        """Record a vessel's position. Returns the enter/exit events it caused (exits first)."""
+        current = frozenset(self.index.containing(longitude, latitude))
+        previous = self.membership.get(mmsi, frozenset())
+        if current == previous:
+            return []
+        if current:
+            self.membership[mmsi] = current
+        else:
+            self.membership.pop(mmsi, None)
+        fences = self.index.fences
+        events = [GeofenceEvent(mmsi, fences[fence_index].fence_id, "exit", receive_time, latitude, longitude) for fence_index in sorted(previous - current)]
+        events += [GeofenceEvent(mmsi, fences[fence_index].fence_id, "enter", receive_time, latitude, longitude) for fence_index in sorted(current - previous)]
+        return events
+
+    def process(self, messages: Iterable) -> Iterator[GeofenceEvent]:
+        """Yield the events caused by the position reports among decoded AISMessage objects. Reports without a valid position are ignored."""
+        for message in messages:
+            payload_info = message.payload_info
+            if message.message_type_int not in POSITION_REPORT_TYPES or "Error" in payload_info:
+                continue
+            if self.raw:
+                payload_info = convert_raw_fields(message.message_type_int, payload_info)
+            latitude, longitude = payload_info.get("Latitude"), payload_info.get("Longitude")
+            if latitude is None or longitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                continue
+            yield from self.update(payload_info["MMSI"], longitude, latitude, message.receive_time)
@@ -0,0 +1,425 @@
+# log_reader.py -- readers for NMEA log files (compressed input, time-range seeking over time-sorted logs, timestamp-ordered merging of several logs)
+import heapq
+import queue
+import threading
+from collections import deque
+from glob import glob
+from typing import Any, BinaryIO, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from tag_block import get_tag_block_time, split_tag_block, parse_tag_block, MILLISECOND_TIMESTAMP_THRESHOLD
+
+
+"""Characters separating a prefix timestamp from the sentence, e.g. "1727481600.25 !AIVDM,..." or "1727481600,\\s:rx1*..\\!AIVDM,..." """
+LINE_PREFIX_SEPARATORS: str = " \t,;"
+
+"""Default read buffer per merged file, in bytes"""
+DEFAULT_MERGE_BUFFER_SIZE: int = 64 * 1024
+
+"""A log source: a file path, or an iterable of lines (e.g. a live stream)"""
+LogSource = Union[str, Iterable[str]]
+
+"""Leading bytes identifying each supported compression format"""
+COMPRESSION_MAGIC: Dict[str, bytes] = {
+    "gzip": b"\x1f\x8b",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+    "bz2": b"BZh",
+}
+
+"""Characters that make a log path a glob"""
+GLOB_CHARACTERS: str = "*?["
+
+"""Size of the decompressed chunks passed from the background thread, and the number of chunks it may read ahead"""
+READ_AHEAD_CHUNK_SIZE: int = 1 << 20
+READ_AHEAD_CHUNKS: int = 8
+
+
+# -- Compressed input --
+
+def _lines_from_chunks(chunks: Iterable[bytes], delimiter: bytes) -> Iterator[str]:
+    """Split a stream of byte chunks into decoded lines, carrying partial lines over chunk boundaries."""
+    remainder = b""
+    for chunk in chunks:
+        lines = (remainder + chunk).split(delimiter)
+        remainder = lines.pop()
+        for line in lines:
+            yield line.decode("ascii", errors="replace").rstrip("\r")
+    if remainder:
+        yield remainder.decode("ascii", errors="replace").rstrip("\r")
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """The compression format of a file ("gzip", "xz", "zstd" or "bz2") from its magic bytes, or None for plain files."""
+    with open(path, "rb") as f:
+        header = f.read(6)
+    for compression, magic in COMPRESSION_MAGIC.items():
+        if header.startswith(magic):
+            return compression
+    return None
+
+
+def open_compressed(path: str, compression: str) -> BinaryIO:
+    """Open a compressed file for streaming decompression. zstd requires the optional zstandard package."""
+    if compression == "gzip":
+        import gzip
+        return gzip.open(path, "rb")
+    if compression == "xz":
+        import lzma
+        return lzma.open(path, "rb")
+    if compression == "bz2":
+        import bz2
+        return bz2.open(path, "rb")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading zstd-compressed logs requires the zstandard package (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+class ReadAheadReader:
+    """
+    Lines of a binary stream read (and decompressed) by a background thread into a bounded queue of chunks, so
+    decompression overlaps with decoding. zlib, lzma and bz2 release the GIL while decompressing.
+
+    Args:
+    open_stream (Callable[[], BinaryIO]): Opens the stream; called on the background thread.
+    delimiter (str): Line delimiter.
+    chunk_size (int): Bytes read per chunk.
+    max_chunks (int): Chunks the background thread may read ahead of the consumer.
+    """
+
+    def __init__(self, open_stream: Callable[[], BinaryIO], delimiter: str = "\n", chunk_size: int = READ_AHEAD_CHUNK_SIZE, max_chunks: int = READ_AHEAD_CHUNKS):
+        self.open_stream = open_stream
+        self.delimiter = delimiter.encode("ascii")
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+
+    def _read(self, chunks: "queue.Queue[Any]", stopped: threading.Event) -> None:
+        try:
+            with self.open_stream() as stream:
+                while not stopped.is_set():
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    self._put(chunks, stopped, chunk)
+            self._put(chunks, stopped, None)
+        except BaseException as e:
+            self._put(chunks, stopped, e)
+
+    @staticmethod
+    def _put(chunks: "queue.Queue[Any]", stopped: threading.Event, item: Any) -> None:
+        """Put an item on the queue, giving up once the consumer has stopped."""
+        while not stopped.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    @staticmethod
+    def _queued_chunks(chunks: "queue.Queue[Any]") -> Iterator[bytes]:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+
+    def __iter__(self) -> Iterator[str]:
+        # A fresh queue and stop flag per iteration, so the reader can be iterated more than once
+        chunks: "queue.Queue[Any]" = queue.Queue(maxsize=self.max_chunks)
+        stopped = threading.Event()
+        thread = threading.Thread(target=self._read, args=(chunks, stopped), name="ais-read-ahead", daemon=True)
+        thread.start()
+        try:
+            yield from _lines_from_chunks(self._queued_chunks(chunks), self.delimiter)
+        finally:
+            stopped.set()
+            thread.join()
+
+
+def read_log_lines(path: str, delimiter: str = "\n") -> Iterator[str]:
+    """
+    Lines of a log file, without their delimiter. Compressed files (gzip, xz, zstd, bz2) are detected by their magic
+    bytes and decompressed on a background thread (see ReadAheadReader); plain files are read directly.
+    """
+    compression = detect_compression(path)
+    if compression is None:
+        with open(path, "rb") as f:
+            yield from _lines_from_chunks(iter(lambda: f.read(READ_AHEAD_CHUNK_SIZE), b""), delimiter.encode("ascii"))
+    else:
+        yield from ReadAheadReader(lambda: open_compressed(path, compression), delimiter)
+
+
+def split_line_prefix(line: str) -> Tuple[Optional[Union[int, float]], str]:
+    """Split a line into its prefix timestamp (None if it has none) and the sentence that follows it."""
+    if not line[:1].isdigit():
+        return (None, line)
+    end = 0
+    while end < len(line) and (line[end].isdigit() or line[end] == "."):
+        end += 1
+    sentence_start = end
+    while sentence_start < len(line) and line[sentence_start] in LINE_PREFIX_SEPARATORS:
+        sentence_start += 1
+    if sentence_start == end or line[sentence_start:sentence_start + 1] not in ("!", "$", "\\"):
+        return (None, line)
+    try:
+        timestamp = float(line[:end]) if "." in line[:end] else int(line[:end])
+    except ValueError:
+        return (None, line)
+    if timestamp > MILLISECOND_TIMESTAMP_THRESHOLD:
+        timestamp /= 1000
+    return (timestamp, line[sentence_start:])
+
+
+def line_timestamp(line: str) -> Optional[Union[int, float]]:
+    """Return the receive time of a raw log line (tag block "c:" or prefix timestamp), or None if the line carries no timestamp."""
+    timestamp, line = split_line_prefix(line)
+    if timestamp is not None:
+        return timestamp
+    return get_tag_block_time(line)
+
+
+def nmea_checksum(data: str) -> str:
+    checksum = 0
+    for character in data:
+        checksum ^= ord(character)
+    return f"{checksum:02X}"
+
+
+def prefix_to_tag_block(line: str) -> str:
+    """
+    Move a prefix timestamp into the sentence's tag block ("\\c:<time>*hh\\!AIVDM,..."), so the decoder sees
+    its receive time. Sub-second times are written in milliseconds. Lines without a prefix are returned as-is.
+    """
+    timestamp, sentence = split_line_prefix(line)
+    if timestamp is None:
+        return line
+    tag_block, sentence = split_tag_block(sentence)
+    parameters = tag_block.split("*", 1)[0] if tag_block else ""
+    if get_tag_block_time(f"\\{parameters}\\") is None:
+        time_parameter = f"c:{int(timestamp)}" if float(timestamp).is_integer() else f"c:{round(timestamp * 1000)}"
+        parameters = f"{parameters},{time_parameter}" if parameters else time_parameter
+    return f"\\{parameters}*{nmea_checksum(parameters)}\\{sentence}"
+
+
+def _next_timestamped_line(log_file: BinaryIO, offset: int) -> Tuple[Optional[Union[int, float]], int]:
+    """
+    Find the first timestamped line starting at or after `offset`.
+
+    If `offset` falls in the middle of a line, that partial line is skipped. Returns the line's timestamp
+    and byte offset, or (None, end of file offset) if no timestamped line follows.
+    """
+    log_file.seek(offset)
+    if offset > 0:
+        log_file.readline()
+    while True:
+        position = log_file.tell()
+        line = log_file.readline()
+        if not line:
+            return (None, position)
+        timestamp = line_timestamp(line.decode("ascii", errors="replace"))
+        if timestamp is not None:
+            return (timestamp, position)
+
+
+def find_time_offset(log_file: BinaryIO, start_time: Union[int, float]) -> int:
+    """
+    Binary search a time-sorted log for the byte offset of the first line with a timestamp >= `start_time`.
+
+    Lines without a timestamp (e.g. later fragments of a multipart message) never become the start
+    offset, so decoding begins on a message boundary.
+    """
+    log_file.seek(0, 2)
+    low, high = 0, log_file.tell()
+    while low < high:
+        middle = (low + high) // 2
+        timestamp, _ = _next_timestamped_line(log_file, middle)
+        if timestamp is None or timestamp >= start_time:
+            high = middle
+        else:
+            low = middle + 1
+    return _next_timestamped_line(log_file, low)[1]
+
+
+def log_paths(source: str) -> List[str]:
+    """The files of a log path: the path itself, or every file matching a glob in sorted order (possibly none)."""
+    if any(character in source for character in GLOB_CHARACTERS):
+        return sorted(glob(source))
+    return [source]
+
+
+def filter_time_range(lines: Iterable[str], start_time: Union[int, float], end_time: Optional[Union[int, float]] = None) -> Iterator[str]:
+    """
+    Yield the lines of a time-sorted log whose receive time lies in [start_time, end_time), scanning from the
+    first line. Untimestamped lines following a matching line (multipart fragments) are included.
+    """
+    started = False
+    for line in lines:
+        timestamp = line_timestamp(line)
+        if timestamp is not None:
+            if end_time is not None and timestamp >= end_time:
+                return
+            started = started or timestamp >= start_time
+        if started:
+            yield line
+
+
+def read_time_range(path: str, start_time: Union[int, float], end_time: Optional[Union[int, float]] = None) -> Iterator[str]:
+    """
+    Yield the lines of a time-sorted log whose receive time lies in [start_time, end_time).
+
+    Plain files are not scanned from the beginning: the first matching line is located by a binary search
+    over byte offsets. Compressed files cannot be searched by offset and are filtered as they are decompressed.
+    Untimestamped lines following a matching line (multipart fragments) are included.
+
+    Args:
+    path (str): Path to a log whose lines carry tag block or prefix timestamps, in ascending order.
+    start_time (Union[int, float]): UNIX time of the first line to return.
+    end_time (Optional[Union[int, float]]): UNIX time at which to stop, or None to read to the end of the file.
+    """
+    if detect_compression(path) is not None:
+        yield from filter_time_range(read_log_lines(path), start_time, end_time)
+        return
+    with open(path, "rb") as log_file:
+        log_file.seek(find_time_offset(log_file, start_time))
+        for raw_line in log_file:
+            line = raw_line.decode("ascii", errors="replace").rstrip("\r\n")
+            if end_time is not None:
+                timestamp = line_timestamp(line)
+                if timestamp is not None and timestamp >= end_time:
+                    return
+            yield line
+
+
+def _fragment_position(sentence: str) -> Tuple[int, int]:
+    """(fragment count, fragment number) of an NMEA sentence, or (1, 1) if they cannot be read."""
+    parts = sentence.split(",", 3)
+    if len(parts) < 4 or not parts[1].isdigit() or not parts[2].isdigit():
+        return (1, 1)
+    return (int(parts[1]), int(parts[2]))
+
+
+def _payload(line: str) -> str:
+    sentence = split_tag_block(line)[1]
+    parts = sentence.split(",", 6)
+    return parts[5] if len(parts) > 5 else sentence
+
+
+def read_message_groups(lines: Iterable[str]) -> Iterator[Tuple[Union[int, float], List[str]]]:
+    """
+    Group the lines of a time-sorted log into messages (a sentence, or the consecutive fragments of a multipart
+    message), each with its receive time. Groups without a timestamp inherit the last timestamp seen in the log.
+    Prefix timestamps are moved into the lines' tag blocks (see prefix_to_tag_block).
+    """
+    last_timestamp: Union[int, float] = 0
+    group: List[str] = []
+    group_timestamp: Optional[Union[int, float]] = None
+    expected_fragment = (0, 0)
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+        timestamp, sentence = split_line_prefix(line)
+        if timestamp is not None:
+            line = prefix_to_tag_block(line)
+        tag_block, sentence = split_tag_block(sentence)
+        if timestamp is None and tag_block is not None:
+            timestamp = parse_tag_block(tag_block).get("c")
+        fragment_position = _fragment_position(sentence)
+        if group and fragment_position != expected_fragment:
+            yield (group_timestamp if group_timestamp is not None else last_timestamp, group)
+            group = []
+            group_timestamp = None
+        if timestamp is not None:
+            last_timestamp = timestamp
+            if group_timestamp is None:
+                group_timestamp = timestamp
+        group.append(line)
+        fragment_count, fragment_number = fragment_position
+        if fragment_number >= fragment_count:
+            yield (group_timestamp if group_timestamp is not None else last_timestamp, group)
+            group = []
+            group_timestamp = None
+        expected_fragment = (fragment_count, fragment_number + 1)
+    if group:
+        yield (group_timestamp if group_timestamp is not None else last_timestamp, group)
+
+
+def _read_lines(source: LogSource, buffer_size: int) -> Iterator[str]:
+    if isinstance(source, str) and detect_compression(source) is not None:
+        yield from read_log_lines(source)
+    elif isinstance(source, str):
+        with open(source, "rb", buffering=buffer_size) as log_file:
+            for raw_line in log_file:
+                yield raw_line.decode("ascii", errors="replace")
+    else:
+        yield from source
+
+
+class MergedLogReader:
+    """
+    Merge several time-sorted logs (files or live line streams) into one stream ordered by receive time.
+
+    Each source is read lazily: only its next message is held in the merge heap, and files are read through a
+    buffer of `buffer_size` bytes, so memory is bounded by the number of sources rather than their size. Receive
+    times come from tag blocks or prefix timestamps; prefix timestamps are moved into a tag block so the decoder
+    sees them. Compressed files are detected and decompressed on a background thread (see read_log_lines). Multipart
+    fragments are kept together. A live source that has no line ready blocks the merge.
+
+    Args:
+    sources (Sequence[LogSource]): File paths and/or iterables of lines, each in ascending time order.
+    dedupe_window (Optional[float]): If given, drop a message whose payload was already output within this many
+    seconds (e.g. the same transmission heard by several receivers).
+    buffer_size (int): Read buffer per file source, in bytes.
+    """
+
+    def __init__(self, sources: Sequence[LogSource], dedupe_window: Optional[float] = None, buffer_size: int = DEFAULT_MERGE_BUFFER_SIZE):
+        self.sources = list(sources)
+        self.dedupe_window = dedupe_window
+        self.buffer_size = buffer_size
+        self.messages_read: int = 0
+        self.duplicates: int = 0
+
+    def __iter__(self) -> Iterator[str]:
+        groups = [read_message_groups(_read_lines(source, self.buffer_size)) for source in self.sources]
+        heap: List[Tuple[Union[int, float], int, List[str]]] = []
+        for index, source_groups in enumerate(groups):
+            first = next(source_groups, None)
+            if first is not None:
+                heap.append((first[0], index, first[1]))
+        heapq.heapify(heap)
+        recent_payloads: Dict[Tuple[str, ...], Union[int, float]] = {}
+        recent_order: Deque[Tuple[Union[int, float], Tuple[str, ...]]] = deque()
+        while heap:
+            # The message stays at the top of the heap until it has been output, so a live source is only read
+            # for its next message after the current one has been yielded
+            timestamp, index, lines = heap[0]
+            self.messages_read += 1
+            duplicate = False
+            if self.dedupe_window is not None:
+                while recent_order and recent_order[0][0] < timestamp - self.dedupe_window:
+                    expired_timestamp, expired_key = recent_order.popleft()
+                    if recent_payloads.get(expired_key) == expired_timestamp:
+                        del recent_payloads[expired_key]
+                key = tuple(_payload(line) for line in lines)
+                duplicate = key in recent_payloads
+                if duplicate:
+                    self.duplicates += 1
+                else:
+                    recent_payloads[key] = timestamp
+                    recent_order.append((timestamp, key))
+            if not duplicate:
+                yield from lines
+            following = next(groups[index], None)
+            if following is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (following[0], index, following[1]))
+
+
+def merge_logs(sources: Sequence[LogSource], dedupe_window: Optional[float] = None, buffer_size: int = DEFAULT_MERGE_BUFFER_SIZE) -> Iterator[str]:
+    """Merge time-sorted logs into one time-ordered stream of lines. See MergedLogReader."""
+    return iter(MergedLogReader(sources, dedupe_window, buffer_size))
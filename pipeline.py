@@ -0,0 +1,279 @@
+# pipeline.py -- reader, decode and writer stages connected by bounded queues, so reading, decoding and output overlap
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Any, Callable, Collection, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from ais_decoder import AISMessage, parse_ais_messages
+from decoders import DECODER_REGISTRY
+from errors import DecodeError, ErrorStats
+from log_reader import _fragment_position, log_paths, read_log_lines
+from priority_lanes import LaneStats, PriorityLanes, SheddingPolicy, message_groups
+from tag_block import split_tag_block
+
+
+"""Lines handed to the decode stage at a time (batches are extended to the end of a multipart message)"""
+PIPELINE_BATCH_SIZE: int = 5000
+
+"""Batches each queue may hold before the stage feeding it blocks"""
+PIPELINE_QUEUE_SIZE: int = 8
+
+"""Marks the end of a stage's output"""
+_END = None
+
+
+class QueueStats:
+    """Depth of a bounded queue, sampled each time a batch is put on it."""
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = capacity
+        self.puts = 0
+        self.blocked_puts = 0
+        self.max_depth = 0
+        self._depth_total = 0
+
+    def record(self, depth: int, blocked: bool) -> None:
+        self.puts += 1
+        self.blocked_puts += blocked
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_total += depth
+
+    @property
+    def mean_depth(self) -> float:
+        return self._depth_total / self.puts if self.puts else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {"capacity": self.capacity, "mean_depth": self.mean_depth, "max_depth": self.max_depth, "blocked_puts": self.blocked_puts}
+
+
+class PipelineStats:
+    """
+    End-to-end counters of a pipeline run. A queue that stays full (blocked_puts close to puts) feeds the bottleneck
+    stage; a queue that stays empty is fed by it.
+    """
+
+    def __init__(self, queue_size: int):
+        self.lines_read = 0
+        self.batches = 0
+        self.messages = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        self.decode_queue = QueueStats("decode", queue_size)
+        self.write_queue = QueueStats("write", queue_size)
+        self.lanes: Optional[LaneStats] = None
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.messages / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def lines_per_second(self) -> float:
+        return self.lines_read / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {
+            "lines_read": self.lines_read,
+            "messages": self.messages,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "messages_per_second": self.messages_per_second,
+            "queues": {stats.name: stats.summary() for stats in (self.decode_queue, self.write_queue)},
+        }
+        if self.lanes is not None:
+            summary["lanes"] = self.lanes.summary()
+        return summary
+
+
+def source_lines(source: Union[str, Iterable[str]]) -> Iterable[str]:
+    """Lines of a log file path (compressed or not), of every file matching a glob in sorted order, or of an iterable of lines."""
+    if not isinstance(source, str):
+        return source
+    return chain.from_iterable(read_log_lines(path) for path in log_paths(source))
+
+
+def batch_lines(lines: Iterable[str], batch_size: int = PIPELINE_BATCH_SIZE) -> Iterator[List[str]]:
+    """
+    Split lines into batches of about `batch_size` lines, decodable independently of each other: a batch only ends
+    before a sentence that starts a new message, never between the fragments of a multipart message.
+    """
+    batch: List[str] = []
+    for line in lines:
+        if len(batch) >= batch_size:
+            fragment_count, fragment_number = _fragment_position(split_tag_block(line)[1])
+            if fragment_count == 1 or fragment_number == 1:
+                yield batch
+                batch = []
+        batch.append(line)
+    if batch:
+        yield batch
+
+
+def _decode_lines(lines: List[str], fields: Optional[Sequence[str]], raw: bool,
+                  decode_applications: Optional[Collection[Tuple[int, int]]]) -> Tuple[List[AISMessage], List[DecodeError]]:
+    return parse_ais_messages(lines, decode_applications=decode_applications, fields=fields, raw=raw)
+
+
+def _init_worker(disabled_types: Collection[int]) -> None:
+    """Carry message types disabled in the parent process over to a decode worker."""
+    for message_type in disabled_types:
+        DECODER_REGISTRY.disable(message_type)
+
+
+class Pipeline:
+    """
+    Decode a log in three stages running concurrently: a reader thread splitting lines into batches, a decode stage
+    (a thread, or a pool of worker processes) and a writer thread, connected by bounded queues. At most
+    2 * queue_size batches (plus those being decoded) are held in memory at once, and batches are written in
+    input order.
+
+    Args:
+    source (Union[str, Iterable[str]]): Log path or glob (see source_lines), or an iterable of lines.
+    write (Callable[[List[AISMessage]], None]): Called on the writer thread with each batch of decoded messages.
+    workers (int): Decode worker processes. 0 decodes on a single thread, which is fastest unless several CPUs are available.
+    batch_size (int): Lines per batch.
+    queue_size (int): Capacity, in batches, of the queues between stages.
+    error_stats (Optional[ErrorStats]): Records every error (on the writer thread).
+    write_errors (Optional[Callable[[List[DecodeError]], None]]): Called on the writer thread with the errors of each batch.
+    fields, raw, decode_applications: As for parse_ais_messages.
+    shedding (Optional[SheddingPolicy]): Feed the decode stage through priority lanes (see PriorityLanes) instead of
+    the decode queue: safety messages are decoded first and low-priority messages are shed under overload, so
+    batches are no longer written in input order. Lane counters are reported in stats.lanes.
+    """
+
+    def __init__(self, source: Union[str, Iterable[str]], write: Callable[[List[AISMessage]], None], workers: int = 0,
+                 batch_size: int = PIPELINE_BATCH_SIZE, queue_size: int = PIPELINE_QUEUE_SIZE, error_stats: Optional[ErrorStats] = None,
+                 fields: Optional[Sequence[str]] = None, raw: bool = False, decode_applications: Optional[Collection[Tuple[int, int]]] = None,
+                 write_errors: Optional[Callable[[List[DecodeError]], None]] = None, shedding: Optional[SheddingPolicy] = None):
+        self.source = source
+        self.write = write
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.error_stats = error_stats
+        self.fields = fields
+        self.raw = raw
+        self.decode_applications = decode_applications
+        self.write_errors = write_errors
+        self.stats = PipelineStats(queue_size)
+        self._stopped = threading.Event()
+        self._lanes = PriorityLanes(shedding, self._stopped) if shedding is not None else None
+        if self._lanes is not None:
+            self.stats.lanes = self._lanes.stats
+        self._failure: Optional[BaseException] = None
+
+    def _put(self, stage_queue: queue.Queue, stats: Optional[QueueStats], item: Any) -> None:
+        """Put an item on a queue, giving up once another stage has failed."""
+        blocked = stage_queue.full()
+        while not self._stopped.is_set():
+            try:
+                stage_queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        if stats is not None and item is not _END:
+            stats.record(stage_queue.qsize(), blocked)
+
+    def _get(self, stage_queue: queue.Queue) -> Any:
+        while not self._stopped.is_set():
+            try:
+                return stage_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _run_stage(self, stage: Callable[[], None]) -> None:
+        try:
+            stage()
+        except BaseException as e:
+            if self._failure is None:
+                self._failure = e
+            self._stopped.set()
+
+    def _read(self, decode_queue: queue.Queue) -> None:
+        if self._lanes is not None:
+            try:
+                for lines in message_groups(source_lines(self.source)):
+                    if self._stopped.is_set():
+                        return
+                    self.stats.lines_read += len(lines)
+                    self._lanes.put(lines)
+            finally:
+                self._lanes.close()
+            return
+        for batch in batch_lines(source_lines(self.source), self.batch_size):
+            if self._stopped.is_set():
+                return
+            self.stats.lines_read += len(batch)
+            self._put(decode_queue, self.stats.decode_queue, batch)
+        self._put(decode_queue, None, _END)
+
+    def _next_batch(self, decode_queue: queue.Queue) -> Any:
+        if self._lanes is not None:
+            return self._lanes.get_batch(self.batch_size)
+        return self._get(decode_queue)
+
+    def _decode(self, decode_queue: queue.Queue, write_queue: queue.Queue) -> None:
+        while True:
+            batch = self._next_batch(decode_queue)
+            if batch is _END:
+                break
+            self._put(write_queue, self.stats.write_queue, _decode_lines(batch, self.fields, self.raw, self.decode_applications))
+        self._put(write_queue, None, _END)
+
+    def _decode_in_processes(self, decode_queue: queue.Queue, write_queue: queue.Queue) -> None:
+        # Results are collected in submission order; queue_size batches are in flight at most
+        in_flight: Deque = deque()
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(frozenset(DECODER_REGISTRY.disabled),)) as executor:
+            while True:
+                batch = self._next_batch(decode_queue)
+                if batch is not _END:
+                    in_flight.append(executor.submit(_decode_lines, batch, self.fields, self.raw, self.decode_applications))
+                while in_flight and (batch is _END or len(in_flight) >= self.queue_size or in_flight[0].done()):
+                    self._put(write_queue, self.stats.write_queue, in_flight.popleft().result())
+                if batch is _END:
+                    break
+        self._put(write_queue, None, _END)
+
+    def _write_batches(self, write_queue: queue.Queue) -> None:
+        while True:
+            decoded = self._get(write_queue)
+            if decoded is _END:
+                return
+            messages, errors = decoded
+            self.stats.batches += 1
+            self.stats.messages += len(messages)
+            self.stats.errors += len(errors)
+            if self.error_stats is not None:
+                for error in errors:
+                    self.error_stats.record(error)
+            if self.write_errors is not None and errors:
+                self.write_errors(errors)
+            self.write(messages)
+
+    def run(self) -> PipelineStats:
+        """Run the pipeline to completion. An exception raised by any stage is re-raised here."""
+        start_time = time.perf_counter()
+        decode_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        write_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        decode = self._decode_in_processes if self.workers > 0 else self._decode
+        threads = [
+            threading.Thread(target=self._run_stage, args=(lambda: self._read(decode_queue),), name="ais-pipeline-reader", daemon=True),
+            threading.Thread(target=self._run_stage, args=(lambda: decode(decode_queue, write_queue),), name="ais-pipeline-decoder", daemon=True),
+            threading.Thread(target=self._run_stage, args=(lambda: self._write_batches(write_queue),), name="ais-pipeline-writer", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stats.elapsed = time.perf_counter() - start_time
+        if self._failure is not None:
+            raise self._failure
+        return self.stats
+
+
+def run_pipeline(source: Union[str, Iterable[str]], write: Callable[[List[AISMessage]], None], **kwargs) -> PipelineStats:
+    """Decode `source` through a Pipeline, passing each batch of decoded messages to `write`."""
+    return Pipeline(source, write, **kwargs).run()
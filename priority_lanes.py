@@ -0,0 +1,256 @@
+# priority_lanes.py -- classification of incoming messages into priority lanes, with load shedding of low-priority traffic under overload
+import threading
+import time
+from collections import Counter, deque
+from typing import Collection, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from log_reader import _fragment_position
+from tag_block import split_tag_block
+
+
+"""Lanes, served in this order: a lane is only served while every lane before it is empty"""
+SAFETY_LANE: int = 0
+NORMAL_LANE: int = 1
+BULK_LANE: int = 2
+LANE_NAMES: Tuple[str, ...] = ("safety", "normal", "bulk")
+
+"""Message categories and the lane each is queued in"""
+CATEGORY_LANES: Dict[str, int] = {
+    "safety": SAFETY_LANE,
+    "position": NORMAL_LANE,
+    "other": NORMAL_LANE,
+    "base_station": BULK_LANE,
+    "static": BULK_LANE,
+    "duplicate": BULK_LANE,
+}
+
+"""Message types of the categories decided by type alone"""
+SAFETY_MESSAGE_TYPES = frozenset({14})
+POSITION_MESSAGE_TYPES = frozenset({1, 2, 3, 9, 18, 19, 27})
+BASE_STATION_MESSAGE_TYPES = frozenset({4, 11})
+STATIC_MESSAGE_TYPES = frozenset({5, 24})
+
+"""MMSI prefixes (first three digits) of search and rescue transmitters: AIS-SART, man overboard, EPIRB-AIS"""
+SART_MMSI_PREFIXES = frozenset({970, 972, 974})
+
+"""Categories shed by default when the lanes hold more than the shedding threshold"""
+DEFAULT_SHED_CATEGORIES: Tuple[str, ...] = ("duplicate", "base_station", "static")
+
+"""Messages queued in all lanes together above which sheddable messages are dropped"""
+DEFAULT_SHED_THRESHOLD: int = 10000
+
+"""Messages each lane holds at most; a full lane drops sheddable messages and blocks the reader for others"""
+DEFAULT_LANE_CAPACITY: Tuple[int, int, int] = (100000, 20000, 20000)
+
+"""Recent messages remembered for duplicate detection: a payload seen among them (the same transmission heard by several receivers, or an unchanged periodic report) carries nothing new"""
+DEFAULT_DUPLICATE_WINDOW: int = 10000
+
+
+def _armor_value(character: str) -> int:
+    value = ord(character) - 48
+    return value - 8 if value > 40 else value
+
+
+def payload_of(line: str) -> str:
+    """The armored payload of a raw line, or "" if it has none."""
+    parts = split_tag_block(line)[1].split(",", 6)
+    return parts[5] if len(parts) > 5 else ""
+
+
+def message_type_of(payload: str) -> Optional[int]:
+    """The message type of an armored payload, from its first character."""
+    return _armor_value(payload[0]) if payload else None
+
+
+def mmsi_of(payload: str) -> Optional[int]:
+    """The MMSI of an armored payload (bits 8-37, in its first seven characters)."""
+    if len(payload) < 7:
+        return None
+    bits = 0
+    for character in payload[:7]:
+        bits = (bits << 6) | (_armor_value(character) & 0x3F)
+    return (bits >> 4) & 0x3FFFFFFF
+
+
+def classify_payload(payload: str) -> str:
+    """
+    The category of a message from its payload: "safety" for safety-related broadcasts (type 14) and position
+    reports or broadcasts from search and rescue transmitters (SART, MOB and EPIRB MMSIs), "position",
+    "base_station", "static" or "other". Only the first character is decoded, and the MMSI of types 1-3.
+    """
+    message_type = message_type_of(payload)
+    if message_type in SAFETY_MESSAGE_TYPES:
+        return "safety"
+    if message_type in POSITION_MESSAGE_TYPES:
+        if message_type <= 3:
+            mmsi = mmsi_of(payload)
+            if mmsi is not None and mmsi // 1000000 in SART_MMSI_PREFIXES:
+                return "safety"
+        return "position"
+    if message_type in BASE_STATION_MESSAGE_TYPES:
+        return "base_station"
+    if message_type in STATIC_MESSAGE_TYPES:
+        return "static"
+    return "other"
+
+
+def message_groups(lines: Iterable[str]) -> Iterator[List[str]]:
+    """Group lines into messages: a single sentence, or the consecutive fragments of a multipart message."""
+    group: List[str] = []
+    for line in lines:
+        if not line:
+            continue
+        fragment_count, fragment_number = _fragment_position(split_tag_block(line)[1])
+        if group and (fragment_count == 1 or fragment_number == 1):
+            yield group
+            group = []
+        group.append(line)
+        if fragment_number >= fragment_count:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+class SheddingPolicy:
+    """
+    When to drop low-priority messages instead of queueing them.
+
+    Args:
+    shed_categories (Collection[str]): Categories that may be dropped (see CATEGORY_LANES). Safety messages never are.
+    shed_threshold (int): Messages queued in all lanes together above which messages of these categories are dropped.
+    lane_capacity (Tuple[int, int, int]): Messages each lane holds at most. A sheddable message for a full lane is
+    dropped; any other message waits for room (backpressure on the reader).
+    duplicate_window (int): Recent messages remembered to detect duplicates (0 disables duplicate detection).
+    """
+
+    def __init__(self, shed_categories: Collection[str] = DEFAULT_SHED_CATEGORIES, shed_threshold: int = DEFAULT_SHED_THRESHOLD,
+                 lane_capacity: Tuple[int, int, int] = DEFAULT_LANE_CAPACITY, duplicate_window: int = DEFAULT_DUPLICATE_WINDOW):
+        unknown = set(shed_categories) - set(CATEGORY_LANES)
+        if unknown:
+            raise ValueError(f"Unknown message categories: {', '.join(sorted(unknown))}")
+        self.shed_categories = frozenset(shed_categories) - {"safety"}
+        self.shed_threshold = shed_threshold
+        self.lane_capacity = lane_capacity
+        self.duplicate_window = duplicate_window
+
+
+class LaneStats:
+    """Messages received and dropped per category, and the depth and queueing delay of each lane."""
+
+    def __init__(self):
+        self.received: Counter = Counter()
+        self.dropped: Counter = Counter()
+        self.max_depth = [0] * len(LANE_NAMES)
+        self.served = [0] * len(LANE_NAMES)
+        self.max_wait = [0.0] * len(LANE_NAMES)
+        self._wait_total = [0.0] * len(LANE_NAMES)
+
+    def record_served(self, lane: int, wait: float) -> None:
+        self.served[lane] += 1
+        self._wait_total[lane] += wait
+        self.max_wait[lane] = max(self.max_wait[lane], wait)
+
+    def mean_wait(self, lane: int) -> float:
+        return self._wait_total[lane] / self.served[lane] if self.served[lane] else 0.0
+
+    def summary(self) -> Dict:
+        return {
+            "received": dict(self.received),
+            "dropped": dict(self.dropped),
+            "lanes": {name: {"served": self.served[lane], "max_depth": self.max_depth[lane],
+                             "mean_wait": self.mean_wait(lane), "max_wait": self.max_wait[lane]}
+                      for lane, name in enumerate(LANE_NAMES)},
+        }
+
+
+class PriorityLanes:
+    """
+    Bounded priority queues of messages between a reader and a decode stage. Messages are classified as they are
+    put (see classify_payload; repeats of a recent message are "duplicate"), and get_batch() serves the safety lane
+    first, then the normal lane, then the bulk lane. Under overload, messages of the policy's sheddable categories
+    are dropped and counted in `stats.dropped`.
+
+    Args:
+    policy (SheddingPolicy): Capacities and shedding rules.
+    stopped (Optional[threading.Event]): Set when the consumer has failed; a blocked put() then gives up.
+    """
+
+    def __init__(self, policy: Optional[SheddingPolicy] = None, stopped: Optional[threading.Event] = None):
+        self.policy = policy or SheddingPolicy()
+        self.stopped = stopped or threading.Event()
+        self.stats = LaneStats()
+        self._lanes: List[Deque[Tuple[float, List[str]]]] = [deque() for _ in LANE_NAMES]
+        self._queued = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._recent: Deque[str] = deque()
+        self._recent_counts: Counter = Counter()
+
+    def _is_duplicate(self, key: str) -> bool:
+        window = self.policy.duplicate_window
+        if not window:
+            return False
+        duplicate = key in self._recent_counts
+        self._recent.append(key)
+        self._recent_counts[key] += 1
+        if len(self._recent) > window:
+            oldest = self._recent.popleft()
+            self._recent_counts[oldest] -= 1
+            if not self._recent_counts[oldest]:
+                del self._recent_counts[oldest]
+        return duplicate
+
+    def classify(self, lines: List[str]) -> str:
+        payloads = [payload_of(line) for line in lines]
+        category = classify_payload(payloads[0])
+        if category != "safety" and self._is_duplicate("".join(payloads)):
+            return "duplicate"
+        return category
+
+    def put(self, lines: List[str]) -> bool:
+        """Queue the lines of one message. Returns False if it was dropped."""
+        category = self.classify(lines)
+        lane = CATEGORY_LANES[category]
+        sheddable = category in self.policy.shed_categories
+        with self._condition:
+            self.stats.received[category] += 1
+            if sheddable and self._queued >= self.policy.shed_threshold:
+                self.stats.dropped[category] += 1
+                return False
+            while len(self._lanes[lane]) >= self.policy.lane_capacity[lane]:
+                if sheddable or self.stopped.is_set():
+                    self.stats.dropped[category] += 1
+                    return False
+                self._condition.wait(0.1)
+            self._lanes[lane].append((time.perf_counter(), lines))
+            self._queued += 1
+            self.stats.max_depth[lane] = max(self.stats.max_depth[lane], len(self._lanes[lane]))
+            self._condition.notify_all()
+        return True
+
+    def close(self) -> None:
+        """Mark the end of the input: get_batch() returns None once the lanes are empty."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def get_batch(self, max_lines: int) -> Optional[List[str]]:
+        """
+        Lines of the next messages to decode, highest priority first, up to about `max_lines` lines (whole messages).
+        Waits for messages if the lanes are empty; returns None once they are empty and closed (or the reader failed).
+        """
+        with self._condition:
+            while not self._queued:
+                if self._closed or self.stopped.is_set():
+                    return None
+                self._condition.wait(0.1)
+            batch: List[str] = []
+            now = time.perf_counter()
+            for lane, messages in enumerate(self._lanes):
+                while messages and len(batch) < max_lines:
+                    enqueue_time, lines = messages.popleft()
+                    batch.extend(lines)
+                    self.stats.record_served(lane, now - enqueue_time)
+                    self._queued -= 1
+            self._condition.notify_all()
+            return batch
@@ -0,0 +1,302 @@
+# replay.py -- replay of NMEA logs at their recorded pace (or faster) to a UDP or TCP socket or stdout, for load testing
+import random
+import socket
+import sys
+import time
+from itertools import chain
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from log_reader import line_timestamp, read_message_groups
+
+
+"""Messages per second assumed for logs without receive times"""
+DEFAULT_UNTIMED_RATE: float = 100.0
+
+"""Seconds before a send is due at which the scheduler stops sleeping and spins on the clock (time.sleep overshoots by up to a millisecond or more)"""
+DEFAULT_SPIN_THRESHOLD: float = 0.001
+
+"""Messages sent at once when replaying at maximum speed"""
+MAX_SPEED_BATCH_SIZE: int = 1000
+
+"""Lateness samples kept for the percentiles (reservoir sample); count, mean and maximum are exact"""
+LATENESS_SAMPLE_SIZE: int = 10000
+
+
+def parse_address(address: str, default_host: str = "127.0.0.1") -> Tuple[str, int]:
+    """Split "host:port" (or just "port", on `default_host`) into (host, port)."""
+    host, separator, port = address.rpartition(":")
+    return (host if separator and host else default_host, int(port))
+
+
+class UDPSender:
+    """Sends each message (a sentence, or the fragments of a multipart message) as one datagram."""
+
+    def __init__(self, host: str, port: int):
+        self.address = (host, port)
+        self.socket = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, messages: List[bytes]) -> None:
+        for message in messages:
+            self.socket.sendto(message, self.address)
+
+    def close(self) -> None:
+        self.socket.close()
+
+
+class TCPSender:
+    """Sends messages over a TCP connection. A receiver that falls behind blocks the sender, which shows as lateness."""
+
+    def __init__(self, host: str, port: int):
+        self.socket = socket.create_connection((host, port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send(self, messages: List[bytes]) -> None:
+        self.socket.sendall(b"".join(messages))
+
+    def close(self) -> None:
+        self.socket.close()
+
+
+class StreamSender:
+    """Writes messages to a binary stream (stdout by default), flushing after each send when `flush` is set."""
+
+    def __init__(self, stream: Optional[BinaryIO] = None, flush: bool = True):
+        self.stream = stream if stream is not None else sys.stdout.buffer
+        self.flush = flush
+
+    def send(self, messages: List[bytes]) -> None:
+        self.stream.write(b"".join(messages))
+        if self.flush:
+            self.stream.flush()
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class ReplayStats:
+    """
+    Counters of a replay. Lateness is how long after its scheduled time each send started: its mean and percentiles
+    are the pacing jitter, and a lateness that keeps growing means the sender (or the receiver, over TCP) cannot keep
+    up with the target rate.
+    """
+
+    def __init__(self, speed: Optional[float]):
+        self.speed = speed
+        self.messages = 0
+        self.sentences = 0
+        self.bytes_sent = 0
+        self.sends = 0
+        self.elapsed = 0.0
+        self.log_duration = 0.0
+        self.max_lateness = 0.0
+        self._lateness_total = 0.0
+        self._lateness_sample: List[float] = []
+        self._random = random.Random(0)
+
+    def record_lateness(self, lateness: float) -> None:
+        self.sends += 1
+        self._lateness_total += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        if len(self._lateness_sample) < LATENESS_SAMPLE_SIZE:
+            self._lateness_sample.append(lateness)
+        else:
+            index = self._random.randrange(self.sends)
+            if index < LATENESS_SAMPLE_SIZE:
+                self._lateness_sample[index] = lateness
+
+    @property
+    def mean_lateness(self) -> float:
+        return self._lateness_total / self.sends if self.sends else 0.0
+
+    def lateness_percentile(self, percentile: float) -> float:
+        if not self._lateness_sample:
+            return 0.0
+        sample = sorted(self._lateness_sample)
+        return sample[min(int(len(sample) * percentile / 100), len(sample) - 1)]
+
+    @property
+    def achieved_rate(self) -> float:
+        """Messages sent per second of wall time."""
+        return self.messages / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def target_rate(self) -> Optional[float]:
+        """Messages per second the schedule asked for, or None at maximum speed."""
+        if self.speed is None:
+            return None
+        scheduled_duration = self.log_duration / self.speed
+        return self.messages / scheduled_duration if scheduled_duration else None
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            "messages": self.messages,
+            "sentences": self.sentences,
+            "bytes_sent": self.bytes_sent,
+            "elapsed": self.elapsed,
+            "target_rate": self.target_rate,
+            "achieved_rate": self.achieved_rate,
+            "lateness_mean": self.mean_lateness,
+            "lateness_p50": self.lateness_percentile(50),
+            "lateness_p99": self.lateness_percentile(99),
+            "lateness_max": self.max_lateness,
+        }
+
+    def __str__(self) -> str:
+        target = f"{self.target_rate:.1f}/s" if self.target_rate is not None else "max speed"
+        return (f"{self.messages} messages in {self.elapsed:.2f} s: {self.achieved_rate:.1f}/s (target {target}), "
+                f"lateness mean {self.mean_lateness * 1000:.3f} ms, p50 {self.lateness_percentile(50) * 1000:.3f} ms, "
+                f"p99 {self.lateness_percentile(99) * 1000:.3f} ms, max {self.max_lateness * 1000:.3f} ms")
+
+
+def schedule_messages(lines: Iterable[str], untimed_rate: float = DEFAULT_UNTIMED_RATE) -> Iterator[Tuple[float, List[str]]]:
+    """
+    The messages of a log (see read_message_groups) with their offset in seconds from the start of the log.
+
+    Offsets follow the receive times of tag blocks or line prefixes. Messages received before the first timestamp
+    of the log (or in a log without any) are spaced 1 / untimed_rate seconds apart. Receive times going backwards
+    (e.g. logs of several receivers) do not move the schedule back: such messages are sent right away.
+    """
+    offset = 0.0
+    timed_start: Optional[float] = None
+    for index, (timestamp, group) in enumerate(read_message_groups(lines)):
+        if timed_start is None and any(line_timestamp(line) is not None for line in group):
+            timed_start = timestamp - offset
+        if timed_start is not None:
+            offset = max(offset, timestamp - timed_start)
+        elif untimed_rate:
+            offset = index / untimed_rate
+        yield (offset, group)
+
+
+class Replayer:
+    """
+    Send the messages of a log on the schedule of their receive times, sped up by `speed`, with a monotonic clock.
+
+    Sends are scheduled against the start of the replay rather than the previous send, so timing errors do not
+    accumulate: a late send is followed by the next ones as soon as they are due. Messages due at the same time are
+    sent together. Each scheduled send sleeps until shortly before it is due and then spins on the clock (see
+    `spin_threshold`; spinning takes CPU from a decoder running on the same core).
+
+    Args:
+    source (Union[str, Iterable[str]]): Log path or glob (compressed files are streamed), or an iterable of lines.
+    send (Callable[[List[bytes]], None]): Called with the messages due (CRLF-terminated sentences, fragments together).
+    speed (Optional[float]): Replay speed (1.0 is real time, 10.0 ten times faster); None sends as fast as possible.
+    untimed_rate (float): Messages per second (before speed-up) for logs without receive times.
+    spin_threshold (float): Seconds before a send is due to stop sleeping; 0 relies on time.sleep alone.
+    report (Optional[Callable[[ReplayStats], None]]): Called with the running stats every `report_interval` seconds.
+    report_interval (float): Seconds between reports.
+    clock, sleep: Time source and sleep function (for tests).
+    """
+
+    def __init__(self, source: Union[str, Iterable[str]], send: Callable[[List[bytes]], None], speed: Optional[float] = 1.0,
+                 untimed_rate: float = DEFAULT_UNTIMED_RATE, spin_threshold: float = DEFAULT_SPIN_THRESHOLD,
+                 report: Optional[Callable[[ReplayStats], None]] = None, report_interval: float = 1.0,
+                 clock: Callable[[], float] = time.perf_counter, sleep: Callable[[float], None] = time.sleep):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive (or None for maximum speed)")
+        self.source = source
+        self.send = send
+        self.speed = speed
+        self.untimed_rate = untimed_rate
+        self.spin_threshold = spin_threshold
+        self.report = report
+        self.report_interval = report_interval
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = ReplayStats(speed)
+
+    def _wait_until(self, due: float) -> None:
+        remaining = due - self.clock()
+        if remaining > self.spin_threshold:
+            self.sleep(remaining - self.spin_threshold)
+        while self.clock() < due:
+            pass
+
+    def _send(self, messages: List[bytes], sentence_count: int, due: float) -> None:
+        self.stats.record_lateness(max(self.clock() - due, 0.0))
+        self.send(messages)
+        self.stats.messages += len(messages)
+        self.stats.sentences += sentence_count
+        self.stats.bytes_sent += sum(map(len, messages))
+
+    def _batches(self) -> Iterator[Tuple[float, List[bytes], int]]:
+        """(log offset, messages, sentence count) of each send: messages due at the same offset, or MAX_SPEED_BATCH_SIZE messages at maximum speed."""
+        from pipeline import source_lines
+        batch: List[bytes] = []
+        sentence_count = 0
+        batch_offset = 0.0
+        for offset, group in schedule_messages(source_lines(self.source), self.untimed_rate):
+            if batch and (offset != batch_offset if self.speed is not None else len(batch) >= MAX_SPEED_BATCH_SIZE):
+                yield (batch_offset, batch, sentence_count)
+                batch = []
+                sentence_count = 0
+            batch_offset = offset
+            batch.append("".join(line + "\r\n" for line in group).encode("ascii", errors="replace"))
+            sentence_count += len(group)
+        if batch:
+            yield (batch_offset, batch, sentence_count)
+
+    def run(self) -> ReplayStats:
+        """Replay the whole log. Returns the final stats (also kept up to date if the replay is interrupted)."""
+        batches = self._batches()
+        # The clock starts once the first batch has been read, so opening the log does not make the first sends late
+        first_batch = next(batches, None)
+        if first_batch is None:
+            return self.stats
+        start_time = self.clock()
+        next_report = start_time + self.report_interval
+        try:
+            for offset, messages, sentence_count in chain((first_batch,), batches):
+                due = start_time + offset / self.speed if self.speed is not None else self.clock()
+                self._wait_until(due)
+                self._send(messages, sentence_count, due)
+                self.stats.log_duration = offset
+                if self.report is not None and self.clock() >= next_report:
+                    self.stats.elapsed = self.clock() - start_time
+                    self.report(self.stats)
+                    next_report += self.report_interval
+        finally:
+            self.stats.elapsed = self.clock() - start_time
+        return self.stats
+
+
+def replay(source: Union[str, Iterable[str]], send: Callable[[List[bytes]], None], **kwargs) -> ReplayStats:
+    """Replay `source` through a Replayer, passing each batch of due messages to `send`."""
+    return Replayer(source, send, **kwargs).run()
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay NMEA logs at their recorded pace (using tag block or prefix receive times) for load testing")
+    parser.add_argument("file_path", help="Log to replay, or a glob of logs; gzip, xz, zstd and bz2 files are decompressed on the fly")
+    parser.add_argument("--speed", default="1", help="Replay speed: 1 for real time, 10 for ten times faster, 'max' for as fast as possible (default: 1)")
+    parser.add_argument("--udp", help="Send to this UDP address ([host:]port, default host 127.0.0.1), one datagram per message")
+    parser.add_argument("--tcp", help="Send to this TCP address ([host:]port, default host 127.0.0.1)")
+    parser.add_argument("--untimed_rate", type=float, default=DEFAULT_UNTIMED_RATE, help=f"Messages per second for logs without receive times (default: {DEFAULT_UNTIMED_RATE:.0f})")
+    parser.add_argument("--spin_threshold", type=float, default=DEFAULT_SPIN_THRESHOLD, help=f"Seconds before each send to stop sleeping and spin, for accurate pacing (default: {DEFAULT_SPIN_THRESHOLD})")
+    parser.add_argument("--report_interval", type=float, default=5.0, help="Seconds between progress reports on stderr (default: 5)")
+    args = parser.parse_args()
+
+    speed = None if args.speed == "max" else float(args.speed)
+    if args.udp and args.tcp:
+        parser.error("--udp and --tcp are mutually exclusive")
+    if args.udp:
+        sender = UDPSender(*parse_address(args.udp))
+    elif args.tcp:
+        sender = TCPSender(*parse_address(args.tcp))
+    else:
+        # At maximum speed stdout is flushed only by its buffer
+        sender = StreamSender(flush=speed is not None)
+    replayer = Replayer(args.file_path, sender.send, speed=speed, untimed_rate=args.untimed_rate, spin_threshold=args.spin_threshold,
+                        report=lambda stats: print(stats, file=sys.stderr), report_interval=args.report_interval)
+    try:
+        replayer.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sender.close()
+    print(replayer.stats, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+# shm_ring.py -- fan-out of decoded messages to local consumer processes through a shared-memory ring buffer of fixed-layout records
+import math
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+from constants import POSITION_REPORT_TYPES
+
+
+"""Records the ring holds; a subscriber more than this many records behind the publisher is overrun"""
+DEFAULT_RING_CAPACITY: int = 1 << 16
+
+"""File signature and layout version at the start of the shared memory block"""
+RING_MAGIC: bytes = b"AISRING\x01"
+
+"""Ring header: magic, capacity, slot size; the published record count and the closed flag sit on their own cache line at offset 64"""
+RING_HEADER = struct.Struct("<8sQQ")
+RING_COUNTERS_OFFSET: int = 64
+RING_COUNTERS = struct.Struct("<QQ")
+RING_DATA_OFFSET: int = 128
+
+"""Sequence number at the start of every slot: the 1-based number of the record it holds, 0 while it is being written"""
+SLOT_SEQUENCE = struct.Struct("<Q")
+
+"""Record kinds, stored after the slot sequence number"""
+RECORD_POSITION: int = 1
+RECORD_STATIC: int = 2
+RECORD_BASE_STATION: int = 3
+RECORD_OTHER: int = 4
+
+"""Message types with static vessel data, and with a UTC time and position of a base station"""
+STATIC_RECORD_TYPES = frozenset({5, 24})
+BASE_STATION_RECORD_TYPES = frozenset({4, 11})
+
+"""Common slot header: sequence, kind, message type, MMSI, receive time (NaN if unknown)"""
+_HEADER_FORMAT = "<QBB2xId"
+
+
+class PositionRecord(NamedTuple):
+    """Position report (types 1, 2, 3, 9, 18, 19, 27; also the positions of types 21). Values the message does not carry are NaN or -1."""
+    message_type: int
+    mmsi: int
+    receive_time: float
+    latitude: float
+    longitude: float
+    speed: float
+    course: float
+    heading: int
+    navigation_status: int
+    position_accuracy: int
+
+
+class StaticRecord(NamedTuple):
+    """Static vessel data (types 5 and 24). Values the message does not carry (e.g. the call sign in type 24 part A) are empty, NaN, -1 or 0 (IMO number)."""
+    message_type: int
+    mmsi: int
+    receive_time: float
+    name: str
+    call_sign: str
+    destination: str
+    ship_type: int
+    imo_number: int
+    to_bow: int
+    to_stern: int
+    to_port: int
+    to_starboard: int
+    draught: float
+
+
+class BaseStationRecord(NamedTuple):
+    """Base station report or UTC date response (types 4 and 11)."""
+    message_type: int
+    mmsi: int
+    receive_time: float
+    latitude: float
+    longitude: float
+    year: int
+    month: int
+    day: int
+    hour: int
+    minute: int
+    second: int
+
+
+class OtherRecord(NamedTuple):
+    """Any other message type: only its type, MMSI and receive time are published."""
+    message_type: int
+    mmsi: int
+    receive_time: float
+
+
+Record = Union[PositionRecord, StaticRecord, BaseStationRecord, OtherRecord]
+
+"""Slot layout of each record kind (common header, then the kind's fields in NamedTuple order) and its NamedTuple"""
+RECORD_LAYOUTS: Dict[int, Tuple[struct.Struct, type]] = {
+    RECORD_POSITION: (struct.Struct(_HEADER_FORMAT + "ddddhbb"), PositionRecord),
+    RECORD_STATIC: (struct.Struct(_HEADER_FORMAT + "20s7s20shIhhbbd"), StaticRecord),
+    RECORD_BASE_STATION: (struct.Struct(_HEADER_FORMAT + "ddHBBBBB"), BaseStationRecord),
+    RECORD_OTHER: (struct.Struct(_HEADER_FORMAT), OtherRecord),
+}
+
+"""Bytes per slot: the largest record layout, rounded up to 8 bytes"""
+SLOT_SIZE: int = (max(layout.size for layout, _ in RECORD_LAYOUTS.values()) + 7) // 8 * 8
+
+"""Offset of the record kind within a slot"""
+_KIND_OFFSET: int = SLOT_SEQUENCE.size
+
+
+def _float(value) -> float:
+    return math.nan if value is None else value
+
+
+def _int(value, maximum: int) -> int:
+    return value if value is not None and 0 <= value <= maximum else -1
+
+
+def _text(value, size: int) -> bytes:
+    return value.encode("ascii", errors="replace")[:size] if value else b""
+
+
+def record_kind(message_type: int) -> int:
+    if message_type in POSITION_REPORT_TYPES or message_type == 21:
+        return RECORD_POSITION
+    if message_type in STATIC_RECORD_TYPES:
+        return RECORD_STATIC
+    if message_type in BASE_STATION_RECORD_TYPES:
+        return RECORD_BASE_STATION
+    return RECORD_OTHER
+
+
+def record_fields(kind: int, payload_info: Dict) -> Tuple:
+    """The kind-specific fields of a record (after message type, MMSI and receive time), in slot layout order."""
+    get = payload_info.get
+    if kind == RECORD_POSITION:
+        return (_float(get("Latitude")), _float(get("Longitude")), _float(get("Speed Over Ground")), _float(get("Course Over Ground")),
+                _int(get("True Heading"), 32767), _int(get("Navigation Status", get("Status")), 127), _int(get("Position Accuracy"), 127))
+    if kind == RECORD_STATIC:
+        return (_text(get("Vessel Name"), 20), _text(get("Call Sign"), 7), _text(get("Destination"), 20),
+                _int(get("Type of Ship and Cargo", get("Ship Type")), 32767), get("IMO Number") or 0,
+                _int(get("Dimensions to Bow", get("Dimension to Bow")), 32767), _int(get("Dimensions to Stern", get("Dimension to Stern")), 32767),
+                _int(get("Dimensions to Port", get("Dimension to Port")), 127), _int(get("Dimensions to Starboard", get("Dimension to Starboard")), 127),
+                _float(get("Draught")))
+    if kind == RECORD_BASE_STATION:
+        return (_float(get("Latitude")), _float(get("Longitude")), get("Year (UTC)") or 0, get("Month (UTC)") or 0, get("Day (UTC)") or 0,
+                get("Hour (UTC)") or 0, get("Minute (UTC)") or 0, get("Second (UTC)") or 0)
+    return ()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing block without registering it with this process's resource tracker, which would unlink it when the process exits."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # Python < 3.13 has no track argument. Unregistering afterwards is not an option: a forked subscriber shares the
+    # publisher's resource tracker, and would remove the publisher's own registration
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class RingPublisher:
+    """
+    Publishes decoded messages into a shared-memory ring of `capacity` fixed-size slots, for any number of local
+    subscriber processes (RingSubscriber) that read them with their own cursors, without pickling.
+
+    Each message becomes one record with the fixed layout of its kind (see RECORD_LAYOUTS): positions, static
+    vessel data, base stations, or only type, MMSI and receive time for other messages. A slot is written as a
+    seqlock: its sequence number is zeroed with the record and set once the record is complete, and the count of
+    published records in the ring header is updated after each batch. The publisher never waits for subscribers;
+    one that falls more than `capacity` records behind is overrun and skips ahead.
+
+    Args:
+    name (Optional[str]): Name of the shared memory block (random if None); subscribers attach by this name.
+    capacity (int): Number of slots.
+    """
+
+    def __init__(self, name: Optional[str] = None, capacity: int = DEFAULT_RING_CAPACITY):
+        self.capacity = capacity
+        self.block = shared_memory.SharedMemory(name=name, create=True, size=RING_DATA_OFFSET + capacity * SLOT_SIZE)
+        self.name = self.block.name
+        self.published = 0
+        RING_HEADER.pack_into(self.block.buf, 0, RING_MAGIC, capacity, SLOT_SIZE)
+        RING_COUNTERS.pack_into(self.block.buf, RING_COUNTERS_OFFSET, 0, 0)
+
+    def __enter__(self) -> 'RingPublisher':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _write(self, message_type: int, mmsi: Optional[int], receive_time: Optional[float], payload_info: Dict) -> None:
+        kind = record_kind(message_type)
+        offset = RING_DATA_OFFSET + (self.published % self.capacity) * SLOT_SIZE
+        buffer = self.block.buf
+        RECORD_LAYOUTS[kind][0].pack_into(buffer, offset, 0, kind, message_type, mmsi or 0, _float(receive_time), *record_fields(kind, payload_info))
+        self.published += 1
+        SLOT_SEQUENCE.pack_into(buffer, offset, self.published)
+
+    def _commit(self, closed: bool = False) -> None:
+        RING_COUNTERS.pack_into(self.block.buf, RING_COUNTERS_OFFSET, self.published, closed)
+
+    def publish(self, message_type: int, payload_info: Dict, receive_time: Optional[float] = None) -> None:
+        """Publish one decoded payload. Payloads that failed to decode ({"Error": ...}) are not published."""
+        if "Error" not in payload_info:
+            self._write(message_type, payload_info.get("MMSI"), receive_time, payload_info)
+            self._commit()
+
+    def publish_messages(self, messages: Iterable) -> None:
+        """Publish decoded AISMessage objects, making them visible to subscribers together."""
+        for message in messages:
+            payload_info = message.payload_info
+            if "Error" not in payload_info:
+                self._write(message.message_type_int, payload_info.get("MMSI"), message.receive_time, payload_info)
+        self._commit()
+
+    def close(self, unlink: bool = True) -> None:
+        """Mark the feed as ended and release the block. Subscribers already attached can still read what is left."""
+        self._commit(closed=True)
+        self.block.close()
+        if unlink:
+            self.block.unlink()
+
+
+class RingSubscriber:
+    """
+    Reads records from a RingPublisher's ring, in another process, with its own cursor.
+
+    A subscriber that falls more than `capacity` records behind the publisher (or whose slot is overwritten while it
+    is being read) is overrun: it skips to the oldest record still in the ring, and the records it missed are
+    counted in `records_lost` (with the number of overruns in `overruns`).
+
+    Args:
+    name (str): Name of the publisher's shared memory block.
+    from_start (bool): Start at the oldest record still in the ring instead of the next one published.
+    """
+
+    def __init__(self, name: str, from_start: bool = False):
+        self.block = _attach(name)
+        magic, self.capacity, slot_size = RING_HEADER.unpack_from(self.block.buf, 0)
+        if magic != RING_MAGIC or slot_size != SLOT_SIZE:
+            self.block.close()
+            raise ValueError(f"Not an AIS record ring: {name}")
+        published, _ = RING_COUNTERS.unpack_from(self.block.buf, RING_COUNTERS_OFFSET)
+        self.cursor = max(published - self.capacity, 0) if from_start else published
+        self.records_read = 0
+        self.records_lost = 0
+        self.overruns = 0
+
+    def __enter__(self) -> 'RingSubscriber':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        """True once the publisher has closed the feed."""
+        return bool(RING_COUNTERS.unpack_from(self.block.buf, RING_COUNTERS_OFFSET)[1])
+
+    @property
+    def lag(self) -> int:
+        """Records published but not read yet."""
+        return RING_COUNTERS.unpack_from(self.block.buf, RING_COUNTERS_OFFSET)[0] - self.cursor
+
+    def _skip_overrun(self, published: int) -> None:
+        oldest = max(published - self.capacity, 0)
+        if oldest > self.cursor:
+            self.records_lost += oldest - self.cursor
+            self.cursor = oldest
+        self.overruns += 1
+
+    def read(self, max_records: int = 4096) -> List[Record]:
+        """Read up to `max_records` records, oldest first. Returns an empty list if there are no new records."""
+        buffer = self.block.buf
+        published = RING_COUNTERS.unpack_from(buffer, RING_COUNTERS_OFFSET)[0]
+        if published - self.cursor > self.capacity:
+            self._skip_overrun(published)
+        records: List[Record] = []
+        append = records.append
+        capacity = self.capacity
+        sequence_struct = SLOT_SEQUENCE
+        end = min(published, self.cursor + max_records)
+        sequence = self.cursor
+        while sequence < end:
+            offset = RING_DATA_OFFSET + (sequence % capacity) * SLOT_SIZE
+            layout, record_type = RECORD_LAYOUTS[buffer[offset + _KIND_OFFSET]]
+            values = layout.unpack_from(buffer, offset)
+            if values[0] != sequence + 1 or sequence_struct.unpack_from(buffer, offset)[0] != sequence + 1:
+                # Overwritten before or while it was read
+                self.cursor = sequence
+                self._skip_overrun(RING_COUNTERS.unpack_from(buffer, RING_COUNTERS_OFFSET)[0] + 1)
+                break
+            if record_type is StaticRecord:
+                values = values[:5] + tuple(value.rstrip(b"\x00").decode("ascii") for value in values[5:8]) + values[8:]
+            append(record_type._make(values[2:]))
+            sequence += 1
+        else:
+            self.cursor = sequence
+        self.records_read += len(records)
+        return records
+
+    def __iter__(self):
+        """Records as they are published, until the publisher closes the feed (polling every millisecond when idle)."""
+        while True:
+            closed = self.closed
+            records = self.read()
+            yield from records
+            if not records:
+                if closed:
+                    return
+                time.sleep(0.001)
+
+    def close(self) -> None:
+        self.block.close()
@@ -0,0 +1,185 @@
+# sqlite_sink.py -- SQLite output with one table per message type, bulk loaded in large transactions
+import sqlite3
+from decoders import DECODER_REGISTRY
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+"""Rows buffered across all tables before they are inserted and committed in one transaction"""
+DEFAULT_BATCH_SIZE: int = 50000
+
+"""Columns indexed by default (if the table has them)"""
+DEFAULT_INDEX_FIELDS: Tuple[str, ...] = ("MMSI",)
+
+"""Message-level columns prepended to every table"""
+MESSAGE_COLUMNS: Tuple[str, ...] = ("Receive Time", "Source")
+
+"""Column affinity for values seen in decoded payloads. Converted layout fields use NUMERIC so raw-mode integers stay integers."""
+COLUMN_AFFINITIES: Dict[type, str] = {bool: "INTEGER", int: "INTEGER", float: "REAL", str: "TEXT", bytes: "BLOB"}
+
+
+def table_name(message_type: int) -> str:
+    return f"type_{message_type}"
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def to_sqlite_value(value: Any) -> Any:
+    """Values SQLite cannot store natively (e.g. nested dictionaries) are stored as their string representation."""
+    if value is None or type(value) in COLUMN_AFFINITIES:
+        return value
+    return str(value)
+
+
+class SQLiteSink:
+    """
+    Writes decoded messages to SQLite, one table per message type ("type_1", "type_5", ...).
+
+    Table columns are every field the decoder can produce (its FIELD_LAYOUT or FIELDS, or `fields` if decoding was
+    projected), so both parts of type 24 fit one table. For decoders that declare neither, columns are added with
+    ALTER TABLE as new fields appear. Rows are buffered and inserted with executemany, committing once per
+    `batch_size` rows. Index creation can be deferred until close(), which is much faster for bulk loads. The sink
+    may be created on one thread and written from another, but must not be used by two threads at once.
+
+    Args:
+    path (str): Database file. Existing tables are appended to; columns they lack are added.
+    fields (Optional[Sequence[str]]): The fields the messages were decoded with, if projected.
+    batch_size (int): Number of buffered rows that triggers an insert and commit.
+    wal (bool): Use write-ahead logging.
+    index_fields (Sequence[str]): Columns to index in every table that has them.
+    defer_indexes (bool): Create the indexes in close() instead of when a table is created.
+    """
+
+    def __init__(self, path: str, fields: Optional[Sequence[str]] = None, batch_size: int = DEFAULT_BATCH_SIZE, wal: bool = True,
+                 index_fields: Sequence[str] = DEFAULT_INDEX_FIELDS, defer_indexes: bool = True):
+        # The CLI creates the sink on the main thread and writes from the pipeline's writer thread; only one thread
+        # uses the connection at a time
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        if wal:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.fields = list(fields) if fields else None
+        self.batch_size = batch_size
+        self.index_fields = tuple(index_fields)
+        self.defer_indexes = defer_indexes
+        self.rows_written: int = 0
+        self.rows_skipped: int = 0
+        self._columns: Dict[int, Tuple[str, ...]] = {}
+        self._insert_statements: Dict[int, str] = {}
+        self._growing: Dict[int, Set[str]] = {}
+        self._buffers: Dict[int, List[Tuple]] = {}
+        self._buffered: int = 0
+
+    def __enter__(self) -> 'SQLiteSink':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _column_affinities(self, message_type: int, payload_info: Dict) -> List[Tuple[str, str]]:
+        layout = DECODER_REGISTRY.get_field_layout(message_type)
+        if layout is not None:
+            names = [field for field in self.fields if field in layout] if self.fields else list(layout)
+            return [(name, "TEXT" if layout[name][2] == "t" else "NUMERIC" if layout[name][3] is not None else "INTEGER") for name in names]
+        declared = DECODER_REGISTRY.get_fields(message_type)
+        if declared is not None:
+            names = [field for field in self.fields if field in declared] if self.fields else list(declared)
+        else:
+            names = self.fields if self.fields else list(payload_info)
+        return [(name, COLUMN_AFFINITIES.get(type(payload_info.get(name)), "")) for name in names]
+
+    def _add_columns(self, message_type: int, columns: List[Tuple[str, str]]) -> None:
+        name = quote_identifier(table_name(message_type))
+        for column, affinity in columns:
+            self.connection.execute(f"ALTER TABLE {name} ADD COLUMN {quote_identifier(column)} {affinity}".rstrip())
+        self.connection.commit()
+
+    def _set_columns(self, message_type: int, columns: Tuple[str, ...]) -> None:
+        self._columns[message_type] = columns
+        column_list = ", ".join(quote_identifier(column) for column in MESSAGE_COLUMNS + columns)
+        self._insert_statements[message_type] = f"INSERT INTO {quote_identifier(table_name(message_type))} ({column_list}) VALUES ({', '.join('?' * (len(MESSAGE_COLUMNS) + len(columns)))})"
+
+    def _create_table(self, message_type: int, payload_info: Dict) -> None:
+        columns = [("Receive Time", "REAL"), ("Source", "TEXT")] + self._column_affinities(message_type, payload_info)
+        name = quote_identifier(table_name(message_type))
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS {name} ({', '.join(f'{quote_identifier(column)} {affinity}'.rstrip() for column, affinity in columns)})")
+        existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({name})")}
+        self._add_columns(message_type, [(column, affinity) for column, affinity in columns if column not in existing])
+        self._set_columns(message_type, tuple(column for column, _ in columns[len(MESSAGE_COLUMNS):]))
+        self._buffers[message_type] = []
+        if not self.fields and DECODER_REGISTRY.get_fields(message_type) is None:
+            self._growing[message_type] = set(self._columns[message_type])
+        if not self.defer_indexes:
+            self._create_indexes(message_type)
+
+    def _grow_table(self, message_type: int, payload_info: Dict) -> None:
+        """Add columns for the fields of a payload the table lacks (decoders without declared fields only)."""
+        new_columns = [(field, COLUMN_AFFINITIES.get(type(value), "")) for field, value in payload_info.items() if field not in self._columns[message_type]]
+        self.flush()
+        self._add_columns(message_type, new_columns)
+        self._set_columns(message_type, self._columns[message_type] + tuple(column for column, _ in new_columns))
+        self._growing[message_type].update(column for column, _ in new_columns)
+
+    def _create_indexes(self, message_type: int) -> None:
+        for field in self.index_fields:
+            if field in self._columns[message_type]:
+                index_name = quote_identifier(f"{table_name(message_type)}_{field}")
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {quote_identifier(table_name(message_type))} ({quote_identifier(field)})")
+
+    def write(self, message_type: int, payload_info: Dict, receive_time: Optional[float] = None, source: Optional[str] = None) -> None:
+        """Buffer one decoded payload. Payloads that failed to decode ({"Error": ...}) are counted in rows_skipped."""
+        if "Error" in payload_info:
+            self.rows_skipped += 1
+            return
+        if message_type not in self._columns:
+            self._create_table(message_type, payload_info)
+        elif message_type in self._growing and not payload_info.keys() <= self._growing[message_type]:
+            self._grow_table(message_type, payload_info)
+        self._buffers[message_type].append((receive_time, source) + tuple(to_sqlite_value(payload_info.get(column)) for column in self._columns[message_type]))
+        self._buffered += 1
+        if self._buffered >= self.batch_size:
+            self.flush()
+
+    def write_messages(self, messages: Iterable) -> None:
+        """Buffer decoded AISMessage objects."""
+        for message in messages:
+            self.write(message.message_type_int, message.payload_info, message.receive_time, message.source)
+
+    def flush(self) -> None:
+        """Insert all buffered rows in a single transaction."""
+        if not self._buffered:
+            return
+        with self.connection:
+            for message_type, rows in self._buffers.items():
+                if rows:
+                    self.connection.executemany(self._insert_statements[message_type], rows)
+                    self.rows_written += len(rows)
+                    rows.clear()
+        self._buffered = 0
+
+    def close(self) -> None:
+        """Flush remaining rows, create any deferred indexes and close the database."""
+        self.flush()
+        if self.defer_indexes:
+            with self.connection:
+                for message_type in self._columns:
+                    self._create_indexes(message_type)
+        self.connection.close()
+
+
+def write_sqlite(messages: Iterable, path: str, **kwargs) -> SQLiteSink:
+    """
+    Write decoded AISMessage objects to a SQLite database.
+
+    Args:
+    messages (Iterable[AISMessage]): Messages as returned by parse_ais_messages.
+    path (str): Database file.
+    **kwargs: Passed to SQLiteSink (fields, batch_size, wal, index_fields, defer_indexes).
+
+    Returns:
+    SQLiteSink: The closed sink, for its rows_written and rows_skipped counts.
+    """
+    with SQLiteSink(path, **kwargs) as sink:
+        sink.write_messages(messages)
+    return sink
@@ -0,0 +1,260 @@
+# stream_decoder.py -- incremental decoder for long-running services, with atomic on-disk snapshots of its state
+import gc
+import marshal
+import math
+import os
+import struct
+import time
+import zlib
+from array import array
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from ais_decoder import AISMessage
+from constants import POSITION_REPORT_TYPES
+from decoders import DECODER_REGISTRY
+from errors import DecodeError, ErrorCode, ErrorStats
+from tag_block import split_tag_block
+
+
+"""Message types carrying static vessel data (name, call sign, ship type, dimensions, ...)"""
+STATIC_MESSAGE_TYPES = frozenset({5, 19, 24})
+
+"""Fields of static messages that are not cached (they describe the message rather than the vessel)"""
+STATIC_EXCLUDED_FIELDS = frozenset({"MMSI", "Message Type", "Repeat Indicator", "Spare", "Part Number", "Data Terminal Ready",
+                                    "Longitude", "Latitude", "Speed Over Ground", "Course Over Ground", "True Heading", "Timestamp"})
+
+"""Incomplete multipart messages kept at most; the oldest is dropped when a new one would exceed this"""
+DEFAULT_MAX_PENDING: int = 1000
+
+"""Seconds between automatic snapshots"""
+DEFAULT_SNAPSHOT_INTERVAL: float = 300.0
+
+"""File signature and format version of snapshots, followed by the CRC-32 of the marshalled body"""
+SNAPSHOT_MAGIC: bytes = b"AISSNAP\x01"
+SNAPSHOT_HEADER = struct.Struct("<8sI")
+
+
+class VesselPosition(NamedTuple):
+    """Latest position report of a vessel. Fields the report does not carry are None."""
+    receive_time: Optional[float]
+    message_type: int
+    latitude: Optional[float]
+    longitude: Optional[float]
+    speed: Optional[float]
+    course: Optional[float]
+    heading: Optional[int]
+    navigation_status: Optional[int]
+
+
+"""Columns of the latest-state table in snapshots: (VesselPosition field, array typecode). None is stored as NaN or -1."""
+POSITION_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("receive_time", "d"), ("message_type", "q"), ("latitude", "d"), ("longitude", "d"),
+    ("speed", "d"), ("course", "d"), ("heading", "q"), ("navigation_status", "q"),
+)
+
+
+def _to_column_value(value, typecode: str):
+    if value is None:
+        return math.nan if typecode == "d" else -1
+    return value
+
+
+def _from_column(values: List, typecode: str) -> List:
+    if typecode == "d":
+        return [None if value != value else value for value in values]
+    return [None if value == -1 else value for value in values]
+
+
+class StreamDecoder:
+    """
+    Decodes sentences as they arrive, keeping state across calls to feed():
+
+    - pending: incomplete multipart messages, keyed by (channel, sequence ID), as their raw sentences
+    - static: per-MMSI static data merged from message types 5, 19 and 24 (name, call sign, ship type, ...)
+    - latest: per-MMSI latest position report (VesselPosition)
+
+    The state can be written to a compact binary snapshot with snapshot() (atomically: a temporary file is
+    fsynced and renamed over the previous snapshot), automatically every `snapshot_interval` seconds if
+    `snapshot_path` is set, and restored on startup with StreamDecoder.restore().
+
+    Args:
+    fields, raw: As for parse_ais_messages.
+    error_stats (Optional[ErrorStats]): If given, rejected sentences are recorded here.
+    max_pending (int): Incomplete multipart messages kept at most.
+    snapshot_path (Optional[str]): File written by automatic snapshots.
+    snapshot_interval (float): Seconds between automatic snapshots.
+    clock (Callable[[], float]): Time source for the snapshot interval.
+    """
+
+    def __init__(self, fields: Optional[Sequence[str]] = None, raw: bool = False, error_stats: Optional[ErrorStats] = None,
+                 max_pending: int = DEFAULT_MAX_PENDING, snapshot_path: Optional[str] = None,
+                 snapshot_interval: float = DEFAULT_SNAPSHOT_INTERVAL, clock: Callable[[], float] = time.time):
+        self.fields = fields
+        self.raw = raw
+        self.error_stats = error_stats
+        self.max_pending = max_pending
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.clock = clock
+        self.pending: Dict[Tuple[str, str], List[str]] = {}
+        self.static: Dict[int, Dict] = {}
+        self.latest: Dict[int, VesselPosition] = {}
+        self.last_snapshot_time = clock()
+
+    def _record_error(self, code: ErrorCode, raw_sentence: str) -> None:
+        if self.error_stats is not None:
+            self.error_stats.record(DecodeError(code, raw_sentence))
+
+    def _assemble(self, sentence: str) -> Optional[AISMessage]:
+        """The message completed by `sentence`, or None if it is invalid or its message is still incomplete."""
+        sentence_parts = split_tag_block(sentence)[1].split(",", 6)
+        if len(sentence_parts) < 7 or sentence_parts[1] == "1" or not (sentence_parts[1].isdigit() and sentence_parts[2].isdigit()):
+            # Single-sentence message (malformed sentences are reported by AISMessage)
+            message = AISMessage(sentence, strict=False)
+            if message.error_code:
+                self._record_error(message.error_code, sentence)
+                return None
+            return message if message.is_complete() else None
+        fragment_count, fragment_number = int(sentence_parts[1]), int(sentence_parts[2])
+        key = (sentence_parts[4], sentence_parts[3])
+        if fragment_number == 1:
+            self.pending.pop(key, None)
+            if len(self.pending) >= self.max_pending:
+                del self.pending[next(iter(self.pending))]
+            self.pending[key] = [sentence]
+            return None
+        fragments = self.pending.get(key)
+        if fragments is None or fragment_number != len(fragments) + 1:
+            self.pending.pop(key, None)
+            self._record_error(ErrorCode.NON_SEQUENTIAL_FRAGMENT, sentence)
+            return None
+        fragments.append(sentence)
+        if fragment_number < fragment_count:
+            return None
+        del self.pending[key]
+        message = AISMessage(fragments, strict=False)
+        if message.error_code or not message.is_complete():
+            self._record_error(message.error_code or ErrorCode.NON_SEQUENTIAL_FRAGMENT, "\n".join(fragments))
+            return None
+        return message
+
+    def _update_state(self, message: AISMessage) -> None:
+        payload_info = message.payload_info
+        mmsi = payload_info.get("MMSI")
+        if mmsi is None or "Error" in payload_info:
+            return
+        message_type = message.message_type_int
+        if message_type in POSITION_REPORT_TYPES and payload_info.get("Latitude") is not None:
+            self.latest[mmsi] = VesselPosition(message.receive_time, message_type, payload_info.get("Latitude"), payload_info.get("Longitude"),
+                                               payload_info.get("Speed Over Ground"), payload_info.get("Course Over Ground"),
+                                               payload_info.get("True Heading"), payload_info.get("Navigation Status"))
+        if message_type in STATIC_MESSAGE_TYPES:
+            static = self.static.get(mmsi)
+            if static is None:
+                static = self.static[mmsi] = {}
+            for field, value in payload_info.items():
+                if field not in STATIC_EXCLUDED_FIELDS:
+                    static[field] = value
+
+    def feed(self, sentences: Iterable[str]) -> List[AISMessage]:
+        """
+        Decode `sentences`, continuing multipart messages left incomplete by earlier calls.
+
+        Returns:
+        List[AISMessage]: The messages completed by these sentences, decoded.
+        """
+        messages: List[AISMessage] = []
+        for sentence in sentences:
+            if not sentence:
+                continue
+            try:
+                message = self._assemble(sentence)
+                if message is None or DECODER_REGISTRY.is_disabled(message.message_type_int):
+                    continue
+                message.decode(self.fields, self.raw)
+            except Exception:
+                self._record_error(ErrorCode.UNEXPECTED_ERROR, sentence)
+                continue
+            self._update_state(message)
+            messages.append(message)
+        if self.snapshot_path is not None and self.clock() - self.last_snapshot_time >= self.snapshot_interval:
+            self.snapshot()
+        return messages
+
+    def _snapshot_body(self) -> bytes:
+        mmsis = list(self.latest)
+        positions = list(self.latest.values())
+        state = {
+            "pending": [(channel, sequence_id, fragments) for (channel, sequence_id), fragments in self.pending.items()],
+            "static": self.static,
+            "latest_mmsi": array("q", mmsis).tobytes(),
+        }
+        for index, (name, typecode) in enumerate(POSITION_COLUMNS):
+            state["latest_" + name] = array(typecode, [_to_column_value(position[index], typecode) for position in positions]).tobytes()
+        return marshal.dumps(state)
+
+    def snapshot(self, path: Optional[str] = None) -> int:
+        """
+        Write the decoder state to `path` (default: snapshot_path), replacing any previous snapshot atomically.
+
+        Returns:
+        int: Size of the snapshot in bytes.
+        """
+        path = path or self.snapshot_path
+        if path is None:
+            raise ValueError("No snapshot path given")
+        body = self._snapshot_body()
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, zlib.crc32(body)))
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, path)
+        self.last_snapshot_time = self.clock()
+        return SNAPSHOT_HEADER.size + len(body)
+
+    def load_snapshot(self, path: str) -> None:
+        """Replace the decoder state with the contents of a snapshot. Raises ValueError if the file is not a valid snapshot."""
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < SNAPSHOT_HEADER.size:
+            raise ValueError(f"Invalid snapshot: {path}")
+        magic, checksum = SNAPSHOT_HEADER.unpack_from(data)
+        body = memoryview(data)[SNAPSHOT_HEADER.size:]
+        if magic != SNAPSHOT_MAGIC or zlib.crc32(body) != checksum:
+            raise ValueError(f"Invalid snapshot: {path}")
+        # Loading allocates millions of containers that all survive; pausing the cyclic GC avoids repeated full scans
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._load_state(marshal.loads(body))
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _load_state(self, state: Dict) -> None:
+        mmsis = array("q")
+        mmsis.frombytes(state["latest_mmsi"])
+        columns = []
+        for name, typecode in POSITION_COLUMNS:
+            column = array(typecode)
+            column.frombytes(state["latest_" + name])
+            columns.append(_from_column(column.tolist(), typecode) if name != "message_type" else column.tolist())
+        self.latest = dict(zip(mmsis.tolist(), map(VesselPosition._make, zip(*columns))))
+        self.static = state["static"]
+        self.pending = {(channel, sequence_id): list(fragments) for channel, sequence_id, fragments in state["pending"]}
+
+    @classmethod
+    def restore(cls, path: str, **kwargs) -> 'StreamDecoder':
+        """
+        Create a decoder with the state of the snapshot at `path`, or with empty state if there is none yet.
+        Automatic snapshots are written back to `path`.
+
+        Args:
+        path (str): Snapshot file.
+        **kwargs: Passed to StreamDecoder.
+        """
+        decoder = cls(snapshot_path=path, **kwargs)
+        if os.path.exists(path):
+            decoder.load_snapshot(path)
+        return decoder
@@ -0,0 +1,63 @@
+# tag_block.py -- parsing of NMEA 4.x tag blocks (e.g. "\s:rx1,c:1727481600*5B\!AIVDM,...")
+from typing import Dict, Optional, Tuple, Union
+
+
+"""Timestamps above this value are assumed to be in milliseconds rather than seconds"""
+MILLISECOND_TIMESTAMP_THRESHOLD: int = 10**11
+
+
+def split_tag_block(sentence: str) -> Tuple[Optional[str], str]:
+    """
+    Split a sentence into its tag block and the NMEA sentence that follows it.
+
+    Args:
+    sentence (str): A raw line, optionally prefixed with a "\\...\\" tag block.
+
+    Returns:
+    Tuple[Optional[str], str]: The tag block contents (without the surrounding backslashes), or None
+    if the sentence has no tag block, and the remaining NMEA sentence.
+    """
+    if not sentence.startswith("\\"):
+        return (None, sentence)
+    end = sentence.find("\\", 1)
+    if end == -1:
+        return (None, sentence)
+    return (sentence[1:end], sentence[end + 1:])
+
+
+def parse_tag_block(tag_block: str) -> Dict[str, Union[str, int, float]]:
+    """
+    Parse the contents of a tag block into a dictionary keyed by the single-letter tag code.
+
+    Known codes are converted: "c" (UNIX time) becomes a number of seconds, "g" (sentence grouping,
+    "<sentence>-<total>-<group id>") is additionally split into "group_sentence", "group_total" and
+    "group_id". Unknown codes are kept as strings. Malformed parameters are skipped.
+    """
+    parameters = tag_block.split("*", 1)[0]
+    tags: Dict[str, Union[str, int, float]] = {}
+    for parameter in parameters.split(","):
+        code, separator, value = parameter.partition(":")
+        if not separator:
+            continue
+        if code == "c":
+            if value.isdigit():
+                timestamp = int(value)
+                tags["c"] = timestamp / 1000 if timestamp > MILLISECOND_TIMESTAMP_THRESHOLD else timestamp
+        elif code == "g":
+            group_parts = value.split("-")
+            if len(group_parts) == 3 and group_parts[0].isdigit() and group_parts[1].isdigit():
+                tags["g"] = value
+                tags["group_sentence"] = int(group_parts[0])
+                tags["group_total"] = int(group_parts[1])
+                tags["group_id"] = group_parts[2]
+        else:
+            tags[code] = value
+    return tags
+
+
+def get_tag_block_time(sentence: str) -> Optional[Union[int, float]]:
+    """Return the UNIX receive time ("c" tag) of a raw line, or None if it has no timestamped tag block."""
+    tag_block, _ = split_tag_block(sentence)
+    if tag_block is None:
+        return None
+    return parse_tag_block(tag_block).get("c")
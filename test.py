@@ -1,6 +1,34 @@
 import unittest
 import ais_decoder
 import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import log_reader
+import sqlite3
+from sqlite_sink import SQLiteSink, write_sqlite
+from csv_sink import CSVSink, write_csv
+from stream_decoder import StreamDecoder
+from traffic_stats import HeavyHitters, HyperLogLog, TrafficStats
+from throttle import PositionThrottle
+import cpa
+import geofence
+import bytes_parser
+import pipeline
+import replay
+import shm_ring
+import track_archive
+import delta_stream
+import priority_lanes
+import dataframes
+from tag_block import parse_tag_block, split_tag_block
+from constants import decode_text_field, RAW_FIELDS, RAW_LONGITUDE_NOT_AVAILABLE, RAW_LATITUDE_NOT_AVAILABLE
+from errors import ErrorCode, ErrorStats
+from decoders.decode_application_data import APPLICATION_DECODERS, register_application_decoder
+from decoders import DecoderRegistry, DECODER_REGISTRY
+from decoders.projection import get_projected_decoder, convert_raw_fields
 
 class test_AIS_decoder(unittest.TestCase):
     def assert_close(self, a, b, abs_tol=0.1):
@@ -212,8 +240,10 @@ class test_decode_binary_addressed_message(test_AIS_decoder):
         self.assertEqual(self.aisMessage2.payload_info["Functional ID"], 3)
     
     def test_data(self):
-        self.assertEqual(self.aisMessage.payload_info["Data"], "@D@@@@@@@@@@@")
-        self.assertEqual(self.aisMessage2.payload_info["Data"], "L @")
+        self.assertEqual(self.aisMessage.payload_info["Data"], bytes.fromhex("00400000000000000000"))
+        self.assertEqual(self.aisMessage.payload_info["Data Bits"], 80)
+        self.assertEqual(self.aisMessage2.payload_info["Data"], bytes.fromhex("320000"))
+        self.assertEqual(self.aisMessage2.payload_info["Data Bits"], 20)
 
 class test_decode_binary_acknowledge(test_AIS_decoder): # Can't find any test messages for this message type
     def setUp(self):
@@ -240,7 +270,1183 @@ class test_decode_binary_broadcast_message(test_AIS_decoder):
 
     def test_decode_data(self):
     #    self.assertEqual(self.aisMessage.payload_info["Data"], "")  -- Online decoders seem to be a little puzzled by this message
-        self.assertEqual(self.aisMessage2.payload_info["Data"], "2302440 CB!,>%TY4@")
+        self.assertEqual(self.aisMessage2.payload_info["Data"], bytes.fromhex("cb3c32d34c200c286cfa5519d000"))
+        self.assertEqual(self.aisMessage2.payload_info["Data Bits"], 112)
+
+
+class test_tag_block(test_AIS_decoder):
+    def setUp(self):
+        self.testMessage = "\\s:rx1,c:1727481600*5B\\!AIVDM,1,1,,A,13QWhR012COJ`0TDSdkCS2ph0@=j,0*6C"
+        self.testMessages = ['\\g:1-2-1234,s:rx2,c:1727481601*00\\!AIVDM,2,1,5,A,53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58',
+                             '\\g:2-2-1234*00\\!AIVDM,2,2,5,A,C`888888880,2*02']
+
+    def test_split_tag_block(self):
+        self.assertEqual(split_tag_block(self.testMessage), ("s:rx1,c:1727481600*5B", "!AIVDM,1,1,,A,13QWhR012COJ`0TDSdkCS2ph0@=j,0*6C"))
+        self.assertEqual(split_tag_block("!AIVDM,1,1,,A,13QWhR012COJ`0TDSdkCS2ph0@=j,0*6C")[0], None)
+
+    def test_parse_tag_block(self):
+        tags = parse_tag_block("g:1-2-1234,s:rx2,c:1727481601000*00")
+        self.assertEqual(tags["s"], "rx2")
+        self.assertEqual(tags["c"], 1727481601)
+        self.assertEqual(tags["group_id"], "1234")
+        self.assertEqual(tags["group_total"], 2)
+
+    def test_message_receive_time_and_source(self):
+        aisMessage = ais_decoder.AISMessage(self.testMessage).decode()
+        self.assertEqual(aisMessage.receive_time, 1727481600)
+        self.assertEqual(aisMessage.source, "rx1")
+        self.assertEqual(aisMessage.payload_info["MMSI"], 236581000)
+
+    def test_multipart_grouping(self):
+        messages, errors = ais_decoder.parse_ais_messages(self.testMessages)
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(len(errors), 0)
+        self.assertEqual(messages[0].payload_info["Vessel Name"], "FINNMILL")
+        self.assertEqual(messages[0].receive_time, 1727481601)
+
+    def test_read_time_range(self):
+        body = "!AIVDM,1,1,,A,13QWhR012COJ`0TDSdkCS2ph0@=j,0*6C"
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "log.nmea")
+            with open(path, "w") as f:
+                for i in range(1000):
+                    f.write(f"\\s:rx1,c:{1727481600 + i}*00\\{body}\n")
+            lines = list(log_reader.read_time_range(path, 1727481900, 1727481910))
+        self.assertEqual(len(lines), 10)
+        self.assertTrue(lines[0].startswith("\\s:rx1,c:1727481900*"))
+        messages, _ = ais_decoder.parse_ais_messages(lines)
+        self.assertEqual(messages[-1].receive_time, 1727481909)
+
+
+class test_merge_logs(test_AIS_decoder):
+    def setUp(self):
+        self.body = "!AIVDM,1,1,,A,13QWhR012COJ`0TDSdkCS2ph0@=j,0*6C"
+        self.multipart = ['!AIVDM,2,1,5,A,53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58', '!AIVDM,2,2,5,A,C`888888880,2*02']
+
+    def test_line_prefix_timestamp(self):
+        self.assertEqual(log_reader.split_line_prefix(f"1727481600.25 {self.body}"), (1727481600.25, self.body))
+        self.assertEqual(log_reader.line_timestamp(f"1727481600250,{self.body}"), 1727481600.25)
+        self.assertEqual(log_reader.split_line_prefix(self.body), (None, self.body))
+        line = log_reader.prefix_to_tag_block(f"1727481600 {self.body}")
+        self.assertEqual(ais_decoder.AISMessage(line).receive_time, 1727481600)
+
+    def test_merge_order_and_fragments(self):
+        source1 = [f"1727481600 {self.body}", f"1727481602 {self.multipart[0]}", self.multipart[1], f"1727481604 {self.body}"]
+        source2 = [f"\\s:rx2,c:1727481601*00\\{self.body}", f"\\s:rx2,c:1727481603*00\\{self.body}"]
+        lines = list(log_reader.merge_logs([iter(source1), iter(source2)]))
+        self.assertEqual([log_reader.line_timestamp(line) for line in lines], [1727481600, 1727481601, 1727481602, None, 1727481603, 1727481604])
+        messages, errors = ais_decoder.parse_ais_messages(lines)
+        self.assertEqual(len(errors), 0)
+        self.assertEqual([message.receive_time for message in messages], [1727481600, 1727481601, 1727481602, 1727481603, 1727481604])
+
+    def test_live_source_read_after_yield(self):
+        lines_read = []
+        def live_source():
+            for second in range(3):
+                lines_read.append(second)
+                yield f"{1727481600 + second} {self.body}"
+        merged = log_reader.merge_logs([live_source()])
+        for count in range(1, 4):
+            next(merged)
+            self.assertEqual(len(lines_read), count)
+
+    def test_merge_files_with_dedupe(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for receiver in range(3):
+                paths.append(os.path.join(directory, f"rx{receiver}.nmea"))
+                with open(paths[-1], "w") as f:
+                    f.write(f"\\s:rx{receiver},c:{1727481600 + receiver}*00\\{self.body}\n")
+                    f.write(f"\\s:rx{receiver},c:{1727481700 + receiver}*00\\{self.body}\n")
+            reader = log_reader.MergedLogReader(paths, dedupe_window=10)
+            lines = list(reader)
+        self.assertEqual([log_reader.line_timestamp(line) for line in lines], [1727481600, 1727481700])
+        self.assertEqual((reader.messages_read, reader.duplicates), (6, 4))
+
+
+class test_compressed_input(test_AIS_decoder):
+    def setUp(self):
+        self.sample_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data", "AISSample7,28,24.txt")
+        with open(self.sample_file, "rb") as f:
+            self.data = f.read()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_compressed_files(self):
+        import bz2
+        import gzip
+        import lzma
+        expected, _ = ais_decoder.parse_ais_messages(self.sample_file)
+        for compression, compress in (("gzip", gzip.compress), ("xz", lzma.compress), ("bz2", bz2.compress)):
+            path = os.path.join(self.directory.name, f"ais.{compression}")
+            with open(path, "wb") as f:
+                f.write(compress(self.data))
+            self.assertEqual(log_reader.detect_compression(path), compression)
+            messages, errors = ais_decoder.parse_ais_messages(path)
+            self.assertEqual([message.payload_info for message in messages], [message.payload_info for message in expected])
+        self.assertIsNone(log_reader.detect_compression(self.sample_file))
+
+    def test_read_ahead_chunk_boundaries(self):
+        import io
+        expected = [line for line in self.data.decode().split("\n") if line]
+        reader = log_reader.ReadAheadReader(lambda: io.BytesIO(self.data.replace(b"\n", b"\r\n")), chunk_size=7, max_chunks=2)
+        self.assertEqual([line for line in reader if line], expected)
+        self.assertEqual([line for line in reader if line], expected)
+
+    def test_early_close_stops_thread(self):
+        import io
+        lines = iter(log_reader.ReadAheadReader(lambda: io.BytesIO(self.data * 100), chunk_size=64, max_chunks=1))
+        next(lines)
+        lines.close()
+        self.assertFalse(any(thread.name == "ais-read-ahead" for thread in threading.enumerate()))
+
+    def test_time_range_of_compressed_and_globbed_logs(self):
+        import gzip
+        sentences = [line for line in self.data.decode().split("\n") if line.startswith("!")]
+        lines = [f"{1727481600 + index} {sentence}" for index, sentence in enumerate(sentences)]
+        plain_path = os.path.join(self.directory.name, "t.nmea")
+        with open(plain_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        with gzip.open(plain_path + ".gz", "wt") as f:
+            f.write("\n".join(lines) + "\n")
+        expected = list(log_reader.read_time_range(plain_path, 1727481605, 1727481615))
+        self.assertEqual(len(expected), 10)
+        self.assertEqual(list(log_reader.read_time_range(plain_path + ".gz", 1727481605, 1727481615)), expected)
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ais_decoder.py")
+        for file_path in (plain_path + ".gz", os.path.join(self.directory.name, "*.gz")):
+            result = subprocess.run([sys.executable, script, "--file_path", file_path, "--start", "1727481605", "--end", "1727481615"], capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertIn("Total messages parsed: 10\n", result.stdout)
+        result = subprocess.run([sys.executable, script, "--file_path", os.path.join(self.directory.name, "*.xz")], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("matches no files", result.stderr)
+
+
+class test_pipeline(test_AIS_decoder):
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data", "AISSample92824.txt")) as f:
+            self.lines = f.read().split("\n")
+        self.expected, self.expected_errors = ais_decoder.parse_ais_messages(self.lines)
+
+    def test_batches_keep_multipart_messages_together(self):
+        batches = list(pipeline.batch_lines(self.lines, batch_size=7))
+        self.assertEqual(sum(batches, []), self.lines)
+        self.assertGreater(len(batches), 1)
+        for batch in batches[1:]:
+            fragment_count, fragment_number = log_reader._fragment_position(split_tag_block(batch[0])[1])
+            self.assertTrue(fragment_count == 1 or fragment_number == 1)
+
+    def test_matches_parse_ais_messages(self):
+        for workers in (0, 2):
+            written = []
+            error_stats = ErrorStats()
+            stats = pipeline.run_pipeline(iter(self.lines), written.extend, workers=workers, batch_size=300, queue_size=2, error_stats=error_stats)
+            self.assertEqual([message.payload_info for message in written], [message.payload_info for message in self.expected])
+            self.assertEqual(stats.messages, len(self.expected))
+            self.assertEqual(stats.lines_read, len(self.lines))
+            self.assertEqual(error_stats.total, len(self.expected_errors))
+            self.assertLessEqual(stats.decode_queue.max_depth, 2)
+
+    def test_writer_failure_is_raised(self):
+        def write(messages):
+            raise ValueError("disk full")
+        with self.assertRaises(ValueError):
+            pipeline.run_pipeline(iter(self.lines), write, batch_size=10, queue_size=1)
+        self.assertFalse(any(thread.name.startswith("ais-pipeline") for thread in threading.enumerate()))
+
+
+class test_replay(test_AIS_decoder):
+    def setUp(self):
+        self.body = "!AIVDM,1,1,,A,13QWhR012COJ`0TDSdkCS2ph0@=j,0*6C"
+        self.multipart = ['!AIVDM,2,1,5,A,53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58', '!AIVDM,2,2,5,A,C`888888880,2*02']
+        self.lines = [f"\\c:1727481600*00\\{self.body}", f"\\c:1727481600*00\\{self.body}", f"\\c:1727481602*00\\{self.multipart[0]}",
+                      self.multipart[1], f"\\c:1727481601*00\\{self.body}", f"\\c:1727481610*00\\{self.body}"]
+
+    def fake_clock(self):
+        now = [0.0]
+        sleeps = []
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+        return (lambda: now[0]), sleep, sleeps
+
+    def test_schedule(self):
+        schedule = list(replay.schedule_messages(self.lines))
+        self.assertEqual([offset for offset, _ in schedule], [0, 0, 2, 2, 10])
+        self.assertEqual(schedule[2][1], self.lines[2:4])
+        untimed = list(replay.schedule_messages([self.body] * 3, untimed_rate=4))
+        self.assertEqual([offset for offset, _ in untimed], [0, 0.25, 0.5])
+
+    def test_paced_replay(self):
+        clock, sleep, sleeps = self.fake_clock()
+        sent = []
+        stats = replay.replay(iter(self.lines), sent.append, speed=10, spin_threshold=0, clock=clock, sleep=sleep)
+        self.assertEqual([len(messages) for messages in sent], [2, 2, 1])
+        self.assertEqual(sent[1][0], (self.lines[2] + "\r\n" + self.lines[3] + "\r\n").encode())
+        self.assert_close(sum(sleeps), 1.0, abs_tol=1e-9)
+        self.assertEqual((stats.messages, stats.sentences, stats.max_lateness), (5, 6, 0))
+        self.assert_close(stats.target_rate, 5.0, abs_tol=1e-9)
+        self.assert_close(stats.achieved_rate, 5.0, abs_tol=1e-9)
+
+    def test_max_speed_to_udp(self):
+        import socket
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(5)
+        sender = replay.UDPSender(*replay.parse_address(str(receiver.getsockname()[1])))
+        try:
+            stats = replay.replay(iter(self.lines), sender.send, speed=None)
+            datagrams = [receiver.recv(4096) for _ in range(stats.messages)]
+        finally:
+            sender.close()
+            receiver.close()
+        self.assertIsNone(stats.target_rate)
+        self.assertEqual(len(datagrams), 5)
+        self.assertEqual(datagrams[2].decode().split("\r\n")[:2], self.lines[2:4])
+
+
+def _read_ring(name, ready, counts):
+    with shm_ring.RingSubscriber(name) as subscriber:
+        ready.set()
+        counts.put([record.mmsi for record in subscriber])
+
+
+class test_shm_ring(test_AIS_decoder):
+    def setUp(self):
+        self.messages, _ = ais_decoder.parse_ais_messages([
+            "!AIVDM,1,1,,A,13QWhR012COJ`0TDSdkCS2ph0@=j,0*6C",
+            "!AIVDM,2,1,5,A,53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58", "!AIVDM,2,2,5,A,C`888888880,2*02",
+            "!AIVDM,1,1,,B,403OK@QvRMopPrsg90H:wag02@C2,0*7E",
+        ])
+        self.publisher = shm_ring.RingPublisher(capacity=8)
+
+    def tearDown(self):
+        self.publisher.close()
+
+    def test_record_layouts(self):
+        with shm_ring.RingSubscriber(self.publisher.name) as subscriber:
+            self.publisher.publish_messages(self.messages)
+            position, static, base_station = subscriber.read()
+        payload_info = self.messages[0].payload_info
+        self.assertIsInstance(position, shm_ring.PositionRecord)
+        self.assertEqual((position.mmsi, position.latitude, position.speed, position.heading),
+                         (payload_info["MMSI"], payload_info["Latitude"], payload_info["Speed Over Ground"], payload_info["True Heading"]))
+        self.assertTrue(math.isnan(position.receive_time))
+        payload_info = self.messages[1].payload_info
+        self.assertIsInstance(static, shm_ring.StaticRecord)
+        self.assertEqual((static.name, static.call_sign, static.destination, static.imo_number),
+                         (payload_info["Vessel Name"], payload_info["Call Sign"], payload_info["Destination"], payload_info["IMO Number"]))
+        self.assertEqual((base_station.message_type, base_station.year), (4, self.messages[2].payload_info["Year (UTC)"]))
+
+    def test_overrun(self):
+        with shm_ring.RingSubscriber(self.publisher.name) as subscriber:
+            for _ in range(4):
+                self.publisher.publish_messages(self.messages)
+            self.assertEqual(subscriber.lag, 12)
+            records = subscriber.read()
+            self.assertEqual((len(records), subscriber.records_lost, subscriber.overruns), (8, 4, 1))
+            self.assertEqual(subscriber.read(), [])
+
+    def test_subscriber_process(self):
+        import multiprocessing
+        ready = multiprocessing.Event()
+        counts = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_read_ring, args=(self.publisher.name, ready, counts))
+        process.start()
+        self.assertTrue(ready.wait(30))
+        self.publisher.publish_messages(self.messages)
+        self.publisher._commit(closed=True)
+        self.assertEqual(counts.get(timeout=30), [message.payload_info["MMSI"] for message in self.messages])
+        process.join()
+
+
+class test_track_archive(test_AIS_decoder):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "tracks.trk")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_column_encoding(self):
+        columns = ([1727481600000, 1727481610000, 1727481609000], [25347000, -25347000, 54600000], [0, 1, -1], [1023, 0, 5], [3600, 2**40, 0])
+        data = track_archive.encode_block(*columns)
+        self.assertEqual(track_archive.decode_block(data, 3), columns)
+
+    def test_write_and_read(self):
+        with track_archive.TrackArchiveWriter(self.path, block_seconds=60) as writer:
+            for second in range(0, 300, 10):
+                writer.add(366000001, 1727481600 + second, 42.0 + second / 1e4, -70.5, 12.3, 45.6)
+                writer.add(366000002, 1727481600 + second + 0.5, None, None, None, None)
+            # A late report, after the block it belongs to was written
+            writer.add(366000001, 1727481605, 42.5, -70.5, 1.0, 2.0)
+        with track_archive.TrackArchiveReader(self.path) as reader:
+            self.assertEqual(reader.mmsis, [366000001, 366000002])
+            self.assertEqual(len(list(reader.read())), 61)
+            points = list(reader.read(366000001, 1727481600, 1727481620))
+            self.assertEqual([point.time for point in points], [1727481600, 1727481605, 1727481610])
+            self.assertEqual(points[0], track_archive.TrackPoint(366000001, 1727481600, 42.0, -70.5, 12.3, 45.6))
+            reader.blocks_read = 0
+            points = list(reader.read(366000002, 1727481720, 1727481780))
+            self.assertEqual(reader.blocks_read, 1)
+            self.assertEqual(points[0], track_archive.TrackPoint(366000002, 1727481720.5, None, None, None, None))
+
+    def test_from_messages(self):
+        messages, _ = ais_decoder.parse_ais_messages(["\\c:1727481600*00\\!AIVDM,1,1,,A,13QWhR012COJ`0TDSdkCS2ph0@=j,0*6C",
+                                                      "\\c:1727481601*00\\!AIVDM,1,1,,B,403OK@QvRMopPrsg90H:wag02@C2,0*7E"])
+        writer = track_archive.write_track_archive(messages, self.path)
+        self.assertEqual((writer.points_written, writer.blocks_written), (1, 1))
+        payload_info = messages[0].payload_info
+        with track_archive.TrackArchiveReader(self.path) as reader:
+            point, = reader.read()
+        self.assertEqual(point, (payload_info["MMSI"], 1727481600, payload_info["Latitude"], payload_info["Longitude"],
+                                 payload_info["Speed Over Ground"], payload_info["Course Over Ground"]))
+        with open(self.path, "wb") as f:
+            f.write(b"\x00" * 64)
+        with self.assertRaises(ValueError):
+            track_archive.TrackArchiveReader(self.path)
+
+
+class test_delta_stream(test_AIS_decoder):
+    def setUp(self):
+        sample_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data")
+        lines = []
+        for file_name in ("AISSample92824.txt", "AISSample7,28,24.txt"):
+            with open(os.path.join(sample_directory, file_name)) as f:
+                lines.extend(f.read().split("\n"))
+        self.messages, _ = ais_decoder.parse_ais_messages(lines)
+
+    def test_round_trip(self):
+        encoder = delta_stream.DeltaEncoder(keyframe_every=5)
+        decoder = delta_stream.DeltaDecoder()
+        for message in self.messages:
+            record = encoder.encode(message.message_type_int, message.payload_info, message.receive_time)
+            self.assertEqual(decoder.decode(record), message.payload_info)
+        self.assertEqual(decoder.missing_keyframes, 0)
+        self.assertLess(encoder.summary()["fields_sent_ratio"], 0.5)
+
+    def test_deltas_and_keyframes(self):
+        encoder = delta_stream.DeltaEncoder(keyframe_every=3, keyframe_seconds=60)
+        payload_info = {"MMSI": 1, "Navigation Status": 5, "Latitude": 42.0}
+        self.assertTrue(encoder.encode(1, payload_info, 0)["Keyframe"])
+        self.assertEqual(encoder.encode(1, dict(payload_info, Latitude=42.1), 10), {"MMSI": 1, "Message Type": 1, "Receive Time": 10, "Latitude": 42.1})
+        self.assertEqual(encoder.encode(1, {"MMSI": 1, "Latitude": 42.1}, 20), {"MMSI": 1, "Message Type": 1, "Receive Time": 20, "Removed": ["Navigation Status"]})
+        self.assertTrue(encoder.encode(1, payload_info, 30)["Keyframe"])
+        self.assertTrue(encoder.encode(3, payload_info, 30)["Keyframe"])
+        self.assertNotIn("Keyframe", encoder.encode(3, payload_info, 89))
+        self.assertTrue(encoder.encode(3, payload_info, 90)["Keyframe"])
+        self.assertEqual(encoder.encode(24, {"MMSI": 1, "Part Number": 0, "Vessel Name": "A"})["Part Number"], 0)
+        self.assertTrue(encoder.encode(24, {"MMSI": 1, "Part Number": 1, "Call Sign": "B"})["Keyframe"])
+
+    def test_removed_fields(self):
+        encoder = delta_stream.DeltaEncoder()
+        decoder = delta_stream.DeltaDecoder()
+        for payload_info in ({"MMSI": 1, "Data": b"\x01", "Designated Area Code": 1}, {"MMSI": 1, "Data": None}, {"MMSI": 1, "Data": b"\x01"}):
+            self.assertEqual(decoder.decode(encoder.encode(6, payload_info, 0)), payload_info)
+
+    def test_join_late(self):
+        encoder = delta_stream.DeltaEncoder(keyframe_every=3)
+        records = encoder.encode_messages(self.messages[:60])
+        decoder = delta_stream.DeltaDecoder()
+        decoded = [decoder.decode(record) for record in records[30:]]
+        self.assertGreater(decoder.missing_keyframes, 0)
+        self.assertEqual(decoded.count(None), decoder.missing_keyframes)
+        self.assertIn("Keyframe", delta_stream.encode_json_lines(records[:1]))
+
+
+class test_priority_lanes(test_AIS_decoder):
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data", "AISSample92824.txt")) as f:
+            self.lines = f.read().split("\n")
+        self.expected, _ = ais_decoder.parse_ais_messages(self.lines)
+
+    def test_classify_payload(self):
+        self.assertEqual(priority_lanes.classify_payload(priority_lanes.payload_of("!AIVDM,1,1,,A,>5?Per18=HB1U:1@E=B0m<L,2*51")), "safety")
+        self.assertEqual(priority_lanes.classify_payload(priority_lanes.payload_of("!AIVDM,1,1,,B,15M67FC000G?ufbE`FepT@3n00Sa,0*5C")), "position")
+        self.assertEqual(priority_lanes.classify_payload(priority_lanes.payload_of("!AIVDM,1,1,,A,402M3b@000Htt0K0Vb`1Ct7000S:,0*00")), "base_station")
+        self.assertEqual(priority_lanes.classify_payload("55?MbV02;H;s<HtKR20EHE:0@T4@Dn2222222216L961O5Gf0NSQEp6ClRp8"), "static")
+        # Type 1 from an AIS-SART (MMSI 970xxxxxx)
+        bits = f"{1:06b}{0:02b}{970012345:030b}0000"
+        payload = "".join(chr(value + 48 if value < 40 else value + 56) for value in (int(bits[i:i + 6], 2) for i in range(0, 42, 6)))
+        self.assertEqual(priority_lanes.mmsi_of(payload), 970012345)
+        self.assertEqual(priority_lanes.classify_payload(payload), "safety")
+        with self.assertRaises(ValueError):
+            priority_lanes.SheddingPolicy(shed_categories=("position", "noise"))
+
+    def test_safety_first_and_shedding(self):
+        lanes = priority_lanes.PriorityLanes(priority_lanes.SheddingPolicy(shed_threshold=2))
+        base_station = ["!AIVDM,1,1,,A,402M3b@000Htt0K0Vb`1Ct7000S:,0*00"]
+        position = ["!AIVDM,1,1,,B,15M67FC000G?ufbE`FepT@3n00Sa,0*5C"]
+        safety = ["!AIVDM,1,1,,A,>5?Per18=HB1U:1@E=B0m<L,2*51"]
+        self.assertTrue(lanes.put(base_station))
+        self.assertTrue(lanes.put(position))
+        self.assertFalse(lanes.put(base_station))  # duplicate, and over the threshold
+        self.assertFalse(lanes.put(["!AIVDM,1,1,,A,402M3b@000Htt0K0Vb`1Ct7000S;,0*00"]))  # base station, over the threshold
+        self.assertTrue(lanes.put(safety))
+        lanes.close()
+        self.assertEqual(lanes.get_batch(2), safety + position)
+        self.assertEqual(lanes.get_batch(100), base_station)
+        self.assertIsNone(lanes.get_batch(100))
+        self.assertEqual(lanes.stats.dropped, {"duplicate": 1, "base_station": 1})
+        self.assertEqual(lanes.stats.received["duplicate"], 1)
+
+    def test_pipeline_with_lanes(self):
+        written = []
+        policy = priority_lanes.SheddingPolicy(shed_categories=(), duplicate_window=0)
+        stats = pipeline.run_pipeline(iter(self.lines), written.extend, batch_size=100, shedding=policy)
+        self.assertEqual(sorted(message.raw_sentences for message in written), sorted(message.raw_sentences for message in self.expected))
+        self.assertEqual(sum(stats.lanes.received.values()), len(self.expected))
+        self.assertFalse(stats.lanes.dropped)
+        self.assertIn("lanes", stats.summary())
+
+
+class test_decode_text_field(test_AIS_decoder):
+    def setUp(self):
+        self.testMessage = '!AIVDM,1,1,,A,H52TD=4UCBD4t0900000000`512t,0*0B'
+
+    def test_decode_text_field(self):
+        bits = ais_decoder.get_payload_binary("F@FD00")  # "VPVT" + "@@" padding
+        self.assertEqual(decode_text_field(bits), "VPVT")
+        self.assertEqual(decode_text_field(bits[:-3]), "VPVT")
+        self.assertEqual(decode_text_field(None), "Missing from AIS message")
+
+    def test_decoded_names_are_shared(self):
+        first = ais_decoder.AISMessage(['!AIVDM,2,1,5,A,53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58', '!AIVDM,2,2,5,A,C`888888880,2*02']).decode()
+        second = ais_decoder.AISMessage(['!AIVDM,2,1,7,A,53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58', '!AIVDM,2,2,7,A,C`888888880,2*02']).decode()
+        self.assertIs(first.payload_info["Vessel Name"], second.payload_info["Vessel Name"])
+
+    def test_decode_static_data_report(self):
+        aisMessage = ais_decoder.AISMessage(self.testMessage).decode()
+        self.assertEqual(aisMessage.payload_info["MMSI"], 338236468)
+        self.assertEqual(aisMessage.payload_info["Vendor ID"], "SRT")
+
+
+class test_error_records(test_AIS_decoder):
+    def setUp(self):
+        self.testMessages = [
+            "!AIVDM,1,1,,A,13QWhR012COJ`0TDSdkCS2ph0@=j,0*6C",
+            "!AIVDM,1,1,,A,13QW~R012COJ,0*6C",  # Invalid payload character
+            "!AIVDM,1,1",  # Truncated sentence
+            "!AIVDM,1,1,,A,03QWhR012COJ`0TDSdkCS2ph0@=j,0*6C",  # Message type 0
+            "!AIVDM,2,1,5,A,53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58",
+            "!AIVDM,1,1,,B,11mg=5OP00Pdu`JI>lS59Ov<0<0g,0*49",  # Interrupts the multipart message
+        ]
+
+    def test_error_codes(self):
+        messages, errors = ais_decoder.parse_ais_messages(self.testMessages)
+        self.assertEqual(len(messages), 1)
+        self.assertEqual([error.code for error in errors], [ErrorCode.INVALID_PAYLOAD, ErrorCode.MALFORMED_SENTENCE, ErrorCode.UNSUPPORTED_MESSAGE_TYPE, ErrorCode.NON_SEQUENTIAL_FRAGMENT])
+
+    def test_error_stats(self):
+        error_stats = ErrorStats(dead_letter_size=2)
+        ais_decoder.parse_ais_messages(self.testMessages * 2, error_stats=error_stats)
+        self.assertEqual(error_stats.total, 8)
+        self.assertEqual(error_stats.summary()["INVALID_PAYLOAD"], 2)
+        self.assertEqual(len(error_stats.dead_letters), 2)
+        self.assertEqual(error_stats.dead_letters[-1].code, ErrorCode.NON_SEQUENTIAL_FRAGMENT)
+
+    def test_strict_constructor(self):
+        with self.assertRaises(Exception):
+            ais_decoder.AISMessage("!AIVDM,1,1")
+        self.assertEqual(ais_decoder.AISMessage("!AIVDM,1,1", strict=False).error_code, ErrorCode.MALFORMED_SENTENCE)
+
+
+class test_application_data(test_AIS_decoder):
+    def setUp(self):
+        self.testMessage = "!AIVDM,1,1,,B,8>h8nkP0Glr=<hFI0D6??wvlFR06EuOwgwl?wnSwe7wvlOw?sAwwnSGmwvh0,0*17"
+
+    def test_meteorological_hydrographic(self):
+        aisMessage = ais_decoder.AISMessage(self.testMessage).decode()
+        self.assertEqual(aisMessage.application_id, (1, 31))
+        self.assert_close(aisMessage.application_info["Longitude"], 171.6)
+        self.assert_close(aisMessage.application_info["Latitude"], 12.23)
+        self.assertEqual(aisMessage.application_info["Hour (UTC)"], 24)
+        self.assertEqual(aisMessage.application_info["Wind Direction"], 360)
+        # Fields after the 7-bit horizontal visibility hold their not-available values in this message
+        expected = {"Horizontal Visibility": 12.7, "Water Level Trend": 3, "Surface Current Direction": 360, "Current Depth 3": 31,
+                    "Swell Period": 63, "Sea State": 13, "Precipitation Type": 7, "Salinity": 51.0, "Ice": 3}
+        self.assertEqual({field: aisMessage.application_info[field] for field in expected}, expected)
+
+    def test_signed_minus_one_and_missing_bits(self):
+        decoder = APPLICATION_DECODERS[(1, 31)]
+        application_info = decoder("0" * 98 + "1" * 11 + "0" * 7 + "1" * 10 + "0" * 178)
+        self.assert_close(application_info["Air Temperature"], -0.1)
+        self.assert_close(application_info["Dew Point"], -0.1)
+        application_info = decoder("0" * 100)
+        self.assertEqual(application_info["Air Temperature"], -1)
+        self.assertEqual(application_info["Ice"], -1)
+
+    def test_lazy_and_opt_in_decoding(self):
+        calls = []
+        original = APPLICATION_DECODERS[(1, 31)]
+        register_application_decoder(1, 31)(lambda bits: calls.append(bits) or {"Bits": len(bits)})
+        try:
+            messages, _ = ais_decoder.parse_ais_messages([self.testMessage])
+            self.assertEqual(len(calls), 0)
+            self.assertEqual(messages[0].application_info, {"Bits": 304})
+            self.assertEqual(len(calls), 1)
+            messages, _ = ais_decoder.parse_ais_messages([self.testMessage], decode_applications={(1, 31)})
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(messages[0].__dict__()["Application Info"], {"Bits": 304})
+        finally:
+            APPLICATION_DECODERS[(1, 31)] = original
+
+    def test_unregistered_application(self):
+        aisMessage = ais_decoder.AISMessage("!AIVDM,1,1,,A,601uEP@tH;3j<P<j00,4*51").decode()
+        self.assertEqual(aisMessage.application_id, (200, 3))
+        self.assertIsNone(aisMessage.application_info)
+
+
+class test_decoder_registry(test_AIS_decoder):
+    def setUp(self):
+        self.testMessage = "!AIVDM,1,1,,A,13QWhR012COJ`0TDSdkCS2ph0@=j,0*6C"
+        self.testMessage2 = "!AIVDM,1,1,,B,403t?hAuho;N>`Pc:j>Kgq700D2D,0*2C"
+
+    def test_decoders_imported_on_first_use(self):
+        script = ("import sys, ais_decoder; "
+                  "print('decoders.decode_position_report_class_a' in sys.modules); "
+                  "ais_decoder.AISMessage('" + self.testMessage + "').decode(); "
+                  "print('decoders.decode_position_report_class_a' in sys.modules, 'decoders.decode_static_and_voyage_data' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.stdout.split(), ["False", "True", "False"])
+
+    def test_register_and_disable(self):
+        registry = DecoderRegistry()
+        registry.register(1, lambda payload: ({"Custom": len(payload)}, {"Custom": str(len(payload))}))
+        self.assertEqual(registry.get(1)("0" * 168)[0], {"Custom": 168})
+        registry.disable(1)
+        self.assertIsNone(registry.get(1))
+        self.assertNotIn(1, registry)
+        self.assertIsNotNone(registry.get(4))
+
+    def test_disabled_types_are_skipped(self):
+        DECODER_REGISTRY.disable(4)
+        try:
+            messages, errors = ais_decoder.parse_ais_messages([self.testMessage, self.testMessage2])
+        finally:
+            DECODER_REGISTRY.enable(4)
+        self.assertEqual([message.message_type_int for message in messages], [1])
+        self.assertEqual(len(errors), 0)
+
+
+class test_decode_batch(test_AIS_decoder):
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data", "AISSample7,28,24.txt")) as f:
+            self.testMessages = f.read().split("\n")
+
+    def test_matches_per_message_decoding(self):
+        messages, _ = ais_decoder.parse_ais_messages(self.testMessages)
+        results = ais_decoder.decode_batch(self.testMessages)
+        self.assertEqual(len(results), len(messages))
+        for (message_type, payload_info), message in zip(results, messages):
+            self.assertEqual(message_type, message.message_type_int)
+            self.assertEqual(payload_info, message.payload_info)
+
+    def test_group_by_type(self):
+        grouped = ais_decoder.decode_batch(self.testMessages, group_by_type=True)
+        ordered = ais_decoder.decode_batch(self.testMessages)
+        self.assertEqual(grouped[24], [payload_info for message_type, payload_info in ordered if message_type == 24])
+        self.assertEqual(sum(len(group) for group in grouped.values()), len(ordered))
+
+    def test_multipart_and_errors(self):
+        error_stats = ErrorStats()
+        results = ais_decoder.decode_batch(['!AIVDM,2,1,5,A,53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58',
+                                            '!AIVDM,1,1,,A,13QW~R012COJ,0*6C',
+                                            '!AIVDM,2,2,5,A,C`888888880,2*02'], error_stats=error_stats)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][1]["Vessel Name"], "FINNMILL")
+        self.assertEqual(error_stats.summary(), {"INVALID_PAYLOAD": 1})
+
+    def test_tag_block_groups(self):
+        first_fragment = '!AIVDM,2,1,,{},53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58'
+        second_fragment = '!AIVDM,2,2,,{},C`888888880,2*02'
+        # Fragments of one group on different channels, as parse_ais_messages joins them
+        sentences = ['\\g:1-2-10*00\\' + first_fragment.format("A"), '\\g:2-2-10*00\\' + second_fragment.format("B")]
+        messages, _ = ais_decoder.parse_ais_messages(sentences)
+        self.assertEqual(ais_decoder.decode_batch(sentences), [(5, messages[0].payload_info)])
+        # Interleaved groups sharing a channel and an empty sequence ID
+        sentences = ['\\g:1-2-10*00\\' + first_fragment.format("A"), '\\g:1-2-20*00\\' + first_fragment.format("A"),
+                     '\\g:2-2-10*00\\' + second_fragment.format("A"), '\\g:2-2-20*00\\' + second_fragment.format("A")]
+        error_stats = ErrorStats()
+        results = ais_decoder.decode_batch(sentences, error_stats=error_stats)
+        self.assertEqual([payload_info["Vessel Name"] for _, payload_info in results], ["FINNMILL", "FINNMILL"])
+        self.assertEqual(error_stats.summary(), {})
+
+
+def load_mixed_sample_messages() -> list:
+    """Sample sentences covering several message types, ending with a two-part type 5 message."""
+    sample_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data")
+    with open(os.path.join(sample_directory, "AISSample7,28,24.txt")) as f:
+        messages = f.read().split("\n")
+    with open(os.path.join(sample_directory, "AISSample92824.txt")) as f:
+        messages += f.read().split("\n")[:500]
+    messages += ['!AIVDM,2,1,5,A,53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58', '!AIVDM,2,2,5,A,C`888888880,2*02']
+    return messages
+
+
+class test_field_projection(test_AIS_decoder):
+    def setUp(self):
+        self.testMessages = load_mixed_sample_messages()
+
+    def test_layouts_match_full_decoders(self):
+        messages, _ = ais_decoder.parse_ais_messages(self.testMessages)
+        checked_types = set()
+        for message in messages:
+            layout = DECODER_REGISTRY.get_field_layout(message.message_type_int)
+            if layout is None:
+                continue
+            projected_decoder = get_projected_decoder(message.message_type_int, list(layout))
+            self.assertEqual(projected_decoder("".join(message.payload_bitstrings))[0], message.payload_info)
+            checked_types.add(message.message_type_int)
+        self.assertTrue({1, 4, 5, 18, 21}.issubset(checked_types))
+
+    def test_full_decoders_read_layout(self):
+        # UTC/date inquiry (type 10) with both spare fields set
+        bits = "001010" + "00" + format(366123456, "030b") + "11" + format(265547250, "030b") + "01"
+        payload = "".join(chr(value + 48 if value < 40 else value + 56) for value in (int(bits[i:i + 6], 2) for i in range(0, len(bits), 6)))
+        payload_info = ais_decoder.decode_batch([f"!AIVDM,1,1,,A,{payload},0*00"])[0][1]
+        self.assertEqual(payload_info, {"MMSI": 366123456, "Spare": 3, "Destination MMSI": 265547250, "Spare 2": 1})
+
+    def test_minimal_projection(self):
+        fields = ["MMSI", "Latitude", "Longitude"]
+        full = ais_decoder.decode_batch(self.testMessages)
+        projected = ais_decoder.decode_batch(self.testMessages, fields=fields)
+        for (message_type, payload_info), (projected_type, projected_info) in zip(full, projected):
+            self.assertEqual(message_type, projected_type)
+            self.assertEqual(projected_info, {field: payload_info[field] for field in fields if field in payload_info})
+
+    def test_projected_decoders_are_cached(self):
+        self.assertIs(get_projected_decoder(1, ["MMSI", "Latitude"]), get_projected_decoder(1, ["MMSI", "Latitude"]))
+        messages, _ = ais_decoder.parse_ais_messages(self.testMessages, fields=["MMSI", "Vessel Name"])
+        self.assertEqual(messages[-1].payload_info, {"MMSI": 266294000, "Vessel Name": "FINNMILL"})
+
+
+class test_raw_mode(test_AIS_decoder):
+    def setUp(self):
+        self.testMessages = load_mixed_sample_messages()
+
+    def test_raw_fields_are_integers(self):
+        for message_type, payload_info in ais_decoder.decode_batch(self.testMessages, raw=True):
+            for field in RAW_FIELDS:
+                if field in payload_info:
+                    self.assertIsInstance(payload_info[field], int)
+
+    def test_conversion_matches_full_decode(self):
+        full = ais_decoder.decode_batch(self.testMessages)
+        raw = ais_decoder.decode_batch(self.testMessages, raw=True)
+        for (message_type, payload_info), (_, raw_info) in zip(full, raw):
+            if DECODER_REGISTRY.get_field_layout(message_type) is not None:
+                self.assertEqual(convert_raw_fields(message_type, raw_info), payload_info)
+
+    def test_sentinels_preserved(self):
+        # Class A position report with longitude, latitude, SOG and COG all "not available"
+        bits = "000001" + "00" + format(366123456, "030b") + "0000" + "00000000" + format(1023, "010b") + "0" \
+            + format(RAW_LONGITUDE_NOT_AVAILABLE, "028b") + format(RAW_LATITUDE_NOT_AVAILABLE, "027b") + format(3600, "012b") + "0" * 48
+        payload = "".join(chr(value + 48 if value < 40 else value + 56) for value in (int(bits[i:i + 6], 2) for i in range(0, len(bits), 6)))
+        sentence = f"!AIVDM,1,1,,A,{payload},0*00"
+        raw_info = ais_decoder.decode_batch([sentence], raw=True)[0][1]
+        self.assertEqual((raw_info["Longitude"], raw_info["Latitude"]), (RAW_LONGITUDE_NOT_AVAILABLE, RAW_LATITUDE_NOT_AVAILABLE))
+        self.assertEqual((raw_info["Speed Over Ground"], raw_info["Course Over Ground"]), (1023, 3600))
+        self.assertEqual(convert_raw_fields(1, raw_info), ais_decoder.decode_batch([sentence])[0][1])
+
+    def test_long_range_broadcast_scaled(self):
+        # Type 27 sends 1/10 minute, whole knots and whole degrees: 12.5 W 45.25 N at 12 knots, 270 degrees, then all "not available"
+        for longitude, latitude, sog, cog, expected_raw in ((-7500, 27150, 12, 270, (-7500000, 27150000, 120, 2700)),
+                                                              (108600, 54600, 63, 511, (RAW_LONGITUDE_NOT_AVAILABLE, RAW_LATITUDE_NOT_AVAILABLE, 1023, 3600))):
+            bits = "011011" + "00" + format(366123456, "030b") + "0" + "0" + "0000" + format(longitude & 0x3FFFF, "018b") \
+                + format(latitude & 0x1FFFF, "017b") + format(sog, "006b") + format(cog, "009b") + "0" + "0"
+            payload = "".join(chr(value + 48 if value < 40 else value + 56) for value in (int(bits[i:i + 6], 2) for i in range(0, len(bits), 6)))
+            sentence = f"!AIVDM,1,1,,A,{payload},0*00"
+            raw_info = ais_decoder.decode_batch([sentence], raw=True)[0][1]
+            self.assertEqual(tuple(raw_info[field] for field in RAW_FIELDS), expected_raw)
+            self.assertEqual(convert_raw_fields(27, raw_info), ais_decoder.decode_batch([sentence])[0][1])
+            payload_info = ais_decoder.decode_batch([sentence])[0][1]
+            self.assertEqual((payload_info["Longitude"], payload_info["Latitude"]), (longitude / 600, latitude / 600))
+
+    def test_truncated_sar_aircraft_speed(self):
+        # Type 9 payload cut off after the altitude: the speed over ground bits are missing
+        bits = "001001" + "00" + format(111232511, "030b") + format(300, "012b") + "0000"
+        payload = "".join(chr(value + 48 if value < 40 else value + 56) for value in (int(bits[i:i + 6], 2) for i in range(0, len(bits), 6)))
+        message = ais_decoder.AISMessage(f"!AIVDM,1,1,,A,{payload},0*00").decode()
+        self.assertEqual(message.payload_info["Speed Over Ground"], -1)
+        self.assertEqual(message.payload_info_stringified["Speed Over Ground"], "Missing from AIS message")
+        raw_info = ais_decoder.decode_batch([f"!AIVDM,1,1,,A,{payload},0*00"], raw=True)[0][1]
+        self.assertEqual(raw_info["Speed Over Ground"], -1)
+        self.assertEqual(convert_raw_fields(9, raw_info), message.payload_info)
+
+
+class test_sqlite_sink(test_AIS_decoder):
+    def setUp(self):
+        self.testMessages = load_mixed_sample_messages()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "ais.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_tables_per_message_type(self):
+        messages, _ = ais_decoder.parse_ais_messages(self.testMessages)
+        sink = write_sqlite(messages, self.path, batch_size=100)
+        connection = sqlite3.connect(self.path)
+        expected_counts = {}
+        for message in messages:
+            if "Error" not in message.payload_info:
+                expected_counts[message.message_type_int] = expected_counts.get(message.message_type_int, 0) + 1
+        for message_type, count in expected_counts.items():
+            self.assertEqual(connection.execute(f"SELECT COUNT(*) FROM type_{message_type}").fetchone()[0], count)
+        self.assertEqual(sink.rows_written, sum(expected_counts.values()))
+        row = connection.execute('SELECT "MMSI", "Vessel Name" FROM type_5').fetchall()[-1]
+        self.assertEqual(row, (266294000, "FINNMILL"))
+        indexes = [name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+        self.assertIn("type_1_MMSI", indexes)
+        connection.close()
+
+    def test_raw_values_stay_integers(self):
+        messages, _ = ais_decoder.parse_ais_messages(self.testMessages, raw=True, fields=["MMSI", "Longitude", "Latitude"])
+        with SQLiteSink(self.path, fields=["MMSI", "Longitude", "Latitude"], defer_indexes=False) as sink:
+            sink.write_messages(messages)
+        connection = sqlite3.connect(self.path)
+        self.assertEqual(connection.execute('SELECT DISTINCT typeof("Longitude") FROM type_1').fetchall(), [("integer",)])
+        connection.close()
+
+    def test_type_24_part_b_before_part_a(self):
+        messages, _ = ais_decoder.parse_ais_messages(["!AIVDM,1,1,,B,H52M=SDTFC@0DUb00000001@2310,0*1E", "!AIVDM,1,1,,B,H52M=S@8ELU@<PD@00000000000,0*75"])
+        write_sqlite(messages, self.path)
+        connection = sqlite3.connect(self.path)
+        rows = connection.execute('SELECT "Part Number", "Vessel Name", "Ship Type" FROM type_24').fetchall()
+        self.assertEqual(rows, [(1, None, 36), (0, "BEWITCHED", None)])
+        connection.close()
+
+    def test_existing_and_undeclared_columns(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute('CREATE TABLE type_5 ("Vessel Name" TEXT, "Extra" TEXT, "MMSI" INTEGER)')
+        connection.commit()
+        connection.close()
+        messages, _ = ais_decoder.parse_ais_messages(self.testMessages[-2:])
+        with SQLiteSink(self.path) as sink:
+            sink.write_messages(messages)
+            # A message type whose decoder declares no fields gains columns as they appear
+            sink.write(99, {"MMSI": 1, "A": 2})
+            sink.write(99, {"MMSI": 3, "B": "x"})
+        connection = sqlite3.connect(self.path)
+        self.assertEqual(connection.execute('SELECT "MMSI", "Vessel Name", "Extra", "Call Sign" FROM type_5').fetchall(), [(266294000, "FINNMILL", None, messages[0].payload_info["Call Sign"])])
+        self.assertEqual(connection.execute('SELECT "MMSI", "A", "B" FROM type_99').fetchall(), [(1, 2, None), (3, None, "x")])
+        connection.close()
+
+
+class test_cli_sinks(test_AIS_decoder):
+    """The CLI's sinks are created on the main thread and written from the pipeline's writer thread."""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.sample_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data", "AISSample92824.txt")
+        self.messages, _ = ais_decoder.parse_ais_messages(self.sample_file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_cli(self, *arguments):
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ais_decoder.py")
+        result = subprocess.run([sys.executable, script, "--file_path", self.sample_file, "--batch_size", "50", "--workers", "2", *arguments],
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout
+
+    def test_sqlite(self):
+        path = os.path.join(self.directory.name, "ais.db")
+        self.assertIn(f"Rows written to {path}: {len(self.messages)} (0 skipped)", self.run_cli("--sqlite", path))
+        with sqlite3.connect(path) as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM type_1").fetchone()[0],
+                             sum(1 for message in self.messages if message.message_type_int == 1))
+
+    def test_csv(self):
+        path = os.path.join(self.directory.name, "csv")
+        self.assertIn(f"Rows written to {path}: {len(self.messages)} (0 skipped)", self.run_cli("--csv", path))
+        with open(os.path.join(path, "type_1.csv"), newline="") as f:
+            self.assertEqual(len(f.readlines()) - 1, sum(1 for message in self.messages if message.message_type_int == 1))
+
+    def test_track_archive(self):
+        path = os.path.join(self.directory.name, "tracks.trk")
+        self.assertIn(f"Track archive written to {path}", self.run_cli("--track_archive", path))
+        with track_archive.TrackArchiveReader(path) as reader:
+            self.assertGreater(len(list(reader.read())), 0)
+
+
+class test_csv_sink(test_AIS_decoder):
+    def setUp(self):
+        self.testMessages = load_mixed_sample_messages()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_rows(self, path, opener=open):
+        import csv
+        with opener(path, "rt", newline="") as f:
+            return list(csv.reader(f))
+
+    def test_files_per_message_type(self):
+        messages, _ = ais_decoder.parse_ais_messages(self.testMessages)
+        sink = write_csv(messages, self.directory.name)
+        rows = self.read_rows(os.path.join(self.directory.name, "type_5.csv"))
+        self.assertEqual(rows[0][:3], ["Receive Time", "Source", "MMSI"])
+        self.assertEqual(rows[-1][rows[0].index("MMSI")], "266294000")
+        self.assertEqual(rows[-1][rows[0].index("Vessel Name")], "FINNMILL")
+        type_1 = [message for message in messages if message.message_type_int == 1 and "Error" not in message.payload_info]
+        rows = self.read_rows(os.path.join(self.directory.name, "type_1.csv"))
+        self.assertEqual(len(rows) - 1, len(type_1))
+        self.assertEqual(float(rows[1][rows[0].index("Longitude")]), type_1[0].payload_info["Longitude"])
+        self.assertEqual(sink.rows_written + sink.rows_skipped, len(messages))
+
+    def test_gzip_projected(self):
+        import gzip
+        messages, _ = ais_decoder.parse_ais_messages(self.testMessages, fields=["MMSI", "Latitude", "Longitude"])
+        write_csv(messages, self.directory.name, fields=["MMSI", "Latitude", "Longitude"], compress=True)
+        rows = self.read_rows(os.path.join(self.directory.name, "type_1.csv.gz"), gzip.open)
+        self.assertEqual(rows[0], ["Receive Time", "Source", "MMSI", "Latitude", "Longitude"])
+
+    def test_type_24_part_b_before_part_a(self):
+        messages, _ = ais_decoder.parse_ais_messages(["!AIVDM,1,1,,B,H52M=SDTFC@0DUb00000001@2310,0*1E", "!AIVDM,1,1,,B,H52M=S@8ELU@<PD@00000000000,0*75"])
+        with CSVSink(self.directory.name) as sink:
+            sink.write_messages(messages)
+            with self.assertRaises(ValueError):
+                sink.write(99, {"MMSI": 1})
+        header, part_b, part_a = self.read_rows(os.path.join(self.directory.name, "type_24.csv"))
+        self.assertEqual(header[2:], list(DECODER_REGISTRY.get_fields(24)))
+        self.assertEqual((part_a[header.index("Vessel Name")], part_a[header.index("Ship Type")]), ("BEWITCHED", ""))
+        self.assertEqual((part_b[header.index("Vessel Name")], part_b[header.index("Ship Type")]), ("", "36"))
+
+
+@unittest.skipUnless(dataframes.np is not None, "numpy is not installed")
+class test_dataframes(test_AIS_decoder):
+    def setUp(self):
+        self.testMessages = load_mixed_sample_messages()
+
+    def test_columns_match_decode_batch(self):
+        for raw in (False, True):
+            columns = dataframes.decode_columns(self.testMessages, raw=raw)
+            grouped = ais_decoder.decode_batch(self.testMessages, group_by_type=True, raw=raw)
+            self.assertEqual(set(columns), {message_type for message_type, records in grouped.items() if any("Error" not in record for record in records)})
+            for message_type, type_columns in columns.items():
+                records = [record for record in grouped[message_type] if "Error" not in record]
+                for field, column in type_columns.items():
+                    missing = None if column.dtype == object else -1
+                    self.assertEqual(column.tolist(), [record.get(field, missing) for record in records], (message_type, field))
+        self.assertEqual(dataframes.decode_columns(self.testMessages)[1]["MMSI"].dtype, dataframes.np.int64)
+
+    def test_columns_match_parse_ais_messages(self):
+        messages, _ = ais_decoder.parse_ais_messages(self.testMessages)
+        columns = dataframes.decode_columns(self.testMessages)
+        for message_type, type_columns in columns.items():
+            records = [message.payload_info for message in messages if message.message_type_int == message_type and "Error" not in message.payload_info]
+            self.assertEqual(list(type_columns), list(ais_decoder.DECODER_REGISTRY.get_fields(message_type)))
+            for field, column in type_columns.items():
+                missing = None if column.dtype == object else -1
+                self.assertEqual(column.tolist(), [record.get(field, missing) for record in records], (message_type, field))
+        self.assertEqual(columns[24]["Ship Type"].dtype, dataframes.np.int64)
+
+    def test_dtypes_do_not_depend_on_values(self):
+        np = dataframes.np
+        def sentence(message_type, rate_of_turn):
+            bits = format(message_type, "06b") + "0" * 36 + format(rate_of_turn & 0xFF, "08b") + "0" * 118
+            return "!AIVDM,1,1,,A," + "".join(chr(v + 48 if v < 40 else v + 56) for v in (int(bits[i:i + 6], 2) for i in range(0, 168, 6))) + ",0*00"
+        # Rate of turn 0 converts to the integer 0, 20 to a float
+        for message_type, rate_of_turn in ((1, 0), (1, 20), (3, 0), (3, 128)):
+            columns = dataframes.decode_columns([sentence(message_type, rate_of_turn)])[message_type]
+            self.assertEqual(columns["Rate of Turn"].dtype, np.float64, (message_type, rate_of_turn))
+            self.assertEqual(columns["Latitude"].dtype, np.float64)
+            self.assertEqual(columns["True Heading"].dtype, np.int64)
+        part_a = [sentence for sentence in self.testMessages
+                  if [(message_type, record.get("Part Number")) for message_type, record in ais_decoder.decode_batch([sentence])] == [(24, 0)]]
+        self.assertTrue(part_a)
+        self.assertEqual(dataframes.decode_columns(part_a)[24]["Ship Type"].dtype, np.int64)
+
+    def test_projected_columns(self):
+        columns = dataframes.decode_columns(self.testMessages, fields=["MMSI", "Latitude", "Longitude"])
+        self.assertEqual(list(columns[1]), ["MMSI", "Latitude", "Longitude"])
+
+    @unittest.skipUnless(dataframes.pd is not None, "pandas is not installed")
+    def test_to_dataframes(self):
+        frames = dataframes.to_dataframes(self.testMessages)
+        expected = [record for record in ais_decoder.decode_batch(self.testMessages, group_by_type=True)[1] if "Error" not in record]
+        self.assertEqual(len(frames[1]), len(expected))
+        self.assertEqual(frames[1]["Latitude"].tolist(), [record["Latitude"] for record in expected])
+        self.assertEqual(str(frames[1]["Navigation Status"].dtype), "category")
+
+
+class test_traffic_stats(test_AIS_decoder):
+    def test_hyperloglog_accuracy(self):
+        for distinct in (100, 50000):
+            sketch = HyperLogLog(12)
+            for mmsi in range(200000000, 200000000 + distinct):
+                sketch.add(mmsi)
+                sketch.add(mmsi)
+            self.assertAlmostEqual(sketch.count() / distinct, 1.0, delta=0.05)
+        self.assertEqual(len(sketch.registers), 4096)
+
+    def test_heavy_hitters(self):
+        hitters = HeavyHitters(k=3, width=256)
+        for mmsi in range(1000):
+            hitters.add(mmsi)
+        for count, mmsi in ((500, 7), (300, 8), (200, 9)):
+            hitters.add(mmsi, count)
+        top = hitters.top()
+        self.assertEqual([mmsi for mmsi, _ in top], [7, 8, 9])
+        self.assertGreaterEqual(top[0][1], 501)
+
+    def test_windows_and_json(self):
+        import json
+        lines = [f"\\c:{1727481600 + second},s:rx1*00\\!AIVDM,1,1,,{'AB'[second // 10 % 2]},13QWhR012COJ`0TDSdkCS2ph0@=j,0*6C" for second in range(0, 180, 10)]
+        messages, _ = ais_decoder.parse_ais_messages(lines)
+        stats = TrafficStats(minute_windows=2)
+        stats.record_messages(messages)
+        stats.record_errors([ais_decoder.DecodeError(ErrorCode.INVALID_PAYLOAD, "!AIVDM")], timestamp=1727481600 + 170)
+        summary = json.loads(stats.to_json())
+        self.assertEqual(summary["messages"], 18)
+        self.assertEqual(summary["unique_mmsi"], 1)
+        self.assertEqual([minute["messages"] for minute in summary["minutes"]], [6, 6])
+        self.assertEqual(summary["late_messages"], 0)
+        self.assertEqual(summary["minutes"][-1]["channels"], {"A": 3, "B": 3})
+        self.assertEqual(summary["minutes"][-1]["error_types"], {"INVALID_PAYLOAD": 1})
+        self.assertEqual(summary["top_talkers"][0]["messages"], 18)
+        stats.record_messages(messages[:1])
+        self.assertEqual(stats.late_messages, 1)
+
+    def test_errors_counted_at_receive_time(self):
+        lines = [f"\\c:{1727481600 + second},s:rx1*00\\!AIVDM,1,1,,A,13QWhR012COJ`0TDSdkCS2ph0@=j,0*6C" for second in range(0, 120, 10)]
+        lines[8] = "\\c:1727481680,s:rx1*00\\!AIVDM,1,1,,A,13QW~~,0*00"
+        stats = TrafficStats(minute_windows=60)
+        pipeline.run_pipeline(iter(lines), stats.record_messages, write_errors=stats.record_errors)
+        minutes = stats.summary()["minutes"]
+        self.assertEqual([(minute["start"], minute["messages"]) for minute in minutes], [(1727481600, 6), (1727481660, 5)])
+        self.assertEqual(minutes[1]["error_types"], {"INVALID_PAYLOAD": 1})
+        self.assertEqual(stats.errors, 1)
+
+
+class test_stream_decoder(test_AIS_decoder):
+    def setUp(self):
+        self.testMessages = load_mixed_sample_messages()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "decoder.snapshot")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_matches_parse_ais_messages(self):
+        expected, _ = ais_decoder.parse_ais_messages(self.testMessages)
+        decoder = StreamDecoder()
+        decoded = []
+        for start in range(0, len(self.testMessages), 7):
+            decoded += decoder.feed(self.testMessages[start:start + 7])
+        self.assertEqual([message.payload_info for message in decoded], [message.payload_info for message in expected])
+        self.assertEqual(decoder.static[266294000]["Vessel Name"], "FINNMILL")
+        position = [message for message in expected if message.message_type_int == 1][-1]
+        self.assertEqual(decoder.latest[position.payload_info["MMSI"]].latitude, position.payload_info["Latitude"])
+
+    def test_snapshot_restores_state(self):
+        decoder = StreamDecoder()
+        decoder.feed(self.testMessages[:-1])
+        self.assertEqual(len(decoder.pending), 1)
+        decoder.snapshot(self.path)
+        self.assertEqual(os.listdir(self.directory.name), ["decoder.snapshot"])
+        restored = StreamDecoder.restore(self.path)
+        self.assertEqual(restored.latest, decoder.latest)
+        self.assertEqual(restored.static, decoder.static)
+        # The multipart message left incomplete before the restart is completed after it
+        messages = restored.feed(self.testMessages[-1:])
+        self.assertEqual(messages[0].payload_info["Vessel Name"], "FINNMILL")
+
+    def test_periodic_and_invalid_snapshots(self):
+        now = [1000.0]
+        decoder = StreamDecoder.restore(self.path, snapshot_interval=60, clock=lambda: now[0])
+        decoder.feed(self.testMessages[:10])
+        self.assertFalse(os.path.exists(self.path))
+        now[0] += 60
+        decoder.feed(self.testMessages[10:20])
+        self.assertTrue(os.path.exists(self.path))
+        with open(self.path, "r+b") as f:
+            f.seek(-1, os.SEEK_END)
+            last_byte = f.read(1)[0]
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last_byte ^ 0xFF]))
+        with self.assertRaises(ValueError):
+            StreamDecoder.restore(self.path)
+
+
+class test_position_throttle(test_AIS_decoder):
+    def report(self, latitude=60.0, longitude=20.0, course=90.0, nav_status=0):
+        return {"MMSI": 230000001, "Latitude": latitude, "Longitude": longitude, "Course Over Ground": course, "Navigation Status": nav_status}
+
+    def test_keep_rules(self):
+        throttle = PositionThrottle(min_interval=60, min_distance=100, min_course_change=10)
+        self.assertTrue(throttle.keep(1, self.report(), 0))
+        self.assertFalse(throttle.keep(1, self.report(longitude=20.001), 10))  # ~56 m
+        self.assertTrue(throttle.keep(1, self.report(longitude=20.003), 20))  # ~167 m
+        self.assertFalse(throttle.keep(1, self.report(longitude=20.003, course=95), 30))
+        self.assertTrue(throttle.keep(1, self.report(longitude=20.003, course=105), 40))
+        self.assertTrue(throttle.keep(1, self.report(longitude=20.003, course=105, nav_status=5), 50))
+        self.assertTrue(throttle.keep(1, self.report(longitude=20.003, course=105, nav_status=5), 110))
+        self.assertTrue(throttle.keep(4, {"MMSI": 2300001}, 111))
+        self.assertEqual((throttle.stats.seen, throttle.stats.kept, throttle.stats.passed_through), (7, 5, 1))
+        self.assertAlmostEqual(throttle.stats.reduction_ratio, 2 / 7)
+
+    def test_course_wraps_around_north(self):
+        throttle = PositionThrottle(min_course_change=10)
+        throttle.keep(1, self.report(course=355), 0)
+        self.assertFalse(throttle.keep(1, self.report(course=3), 1))
+
+    def test_filter_messages(self):
+        sample_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data", "AISSample92824.txt")
+        messages, _ = ais_decoder.parse_ais_messages(sample_file)
+        raw_messages, _ = ais_decoder.parse_ais_messages(sample_file, raw=True)
+        kept = list(PositionThrottle(clock=lambda: 0).filter(messages))
+        raw_kept = list(PositionThrottle(raw=True, clock=lambda: 0).filter(raw_messages))
+        self.assertLess(len(kept), len(messages))
+        self.assertEqual([message.raw_sentences for message in kept], [message.raw_sentences for message in raw_kept])
+
+
+@unittest.skipUnless(cpa.np is not None, "numpy is not installed")
+class test_cpa(test_AIS_decoder):
+    def test_head_on_and_diverging(self):
+        np = cpa.np
+        # Vessel 1 heads north towards vessel 0 from 0.1 degrees (~11 km) south of it; vessel 2 sails away
+        latitude = np.array([60.0, 59.9, 60.05])
+        longitude = np.array([20.0, 20.0, 20.0])
+        speed = np.array([0.0, 20.0, 15.0])
+        course = np.array([np.nan, 0.0, 0.0])
+        result = cpa.screen_cpa(latitude, longitude, speed, course)
+        self.assertEqual(list(zip(result.index_a.tolist(), result.index_b.tolist())), [(0, 1)])
+        self.assertLess(result.cpa[0], 1)
+        self.assert_close(result.tcpa[0], 11119.5 / (20 * cpa.KNOTS_TO_METRES_PER_SECOND), abs_tol=5)
+
+    def test_matches_all_pairs(self):
+        np = cpa.np
+        generator = np.random.default_rng(1)
+        count = 400
+        latitude, longitude = generator.uniform(59.5, 60.5, count), generator.uniform(19, 21, count)
+        speed, course = generator.uniform(0, 25, count), generator.uniform(0, 360, count)
+        result = cpa.screen_cpa(latitude, longitude, speed, course, min_speed=0)
+        found = {tuple(sorted(pair)) for pair in zip(result.index_a.tolist(), result.index_b.tolist())}
+        # Brute force over all pairs, on the same flat-earth approximation
+        a, b = np.triu_indices(count, 1)
+        radius, knots = cpa.EARTH_RADIUS_METRES, cpa.KNOTS_TO_METRES_PER_SECOND
+        relative_x = radius * np.radians(longitude[b] - longitude[a]) * np.cos(np.radians((latitude[a] + latitude[b]) / 2))
+        relative_y = radius * np.radians(latitude[b] - latitude[a])
+        velocity_x, velocity_y = speed * knots * np.sin(np.radians(course)), speed * knots * np.cos(np.radians(course))
+        relative_velocity_x, relative_velocity_y = velocity_x[b] - velocity_x[a], velocity_y[b] - velocity_y[a]
+        tcpa = np.clip(-(relative_x * relative_velocity_x + relative_y * relative_velocity_y) / (relative_velocity_x ** 2 + relative_velocity_y ** 2), 0, None)
+        distance = np.hypot(relative_x + relative_velocity_x * tcpa, relative_y + relative_velocity_y * tcpa)
+        match = (distance <= cpa.DEFAULT_CPA_THRESHOLD_METRES) & (tcpa <= cpa.DEFAULT_TIME_HORIZON_SECONDS)
+        expected = set(zip(a[match].tolist(), b[match].tolist()))
+        self.assertTrue(expected)
+        self.assertEqual(found, expected)
+
+    def test_vessel_arrays(self):
+        messages, _ = ais_decoder.parse_ais_messages(os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data", "AISSample92824.txt"))
+        vessels = cpa.vessel_arrays(messages)
+        self.assertEqual(len(vessels["mmsi"]), len(set(vessels["mmsi"].tolist())))
+        self.assertTrue(((vessels["latitude"] >= -90) & (vessels["latitude"] <= 90)).all())
+        cpa.screen_cpa(vessels["latitude"], vessels["longitude"], vessels["speed"], vessels["course"])
+
+
+class test_geofence(test_AIS_decoder):
+    def setUp(self):
+        # A square harbour with an island (hole), and a second area overlapping its east side
+        self.harbour = geofence.Geofence("harbour", [[[(20.0, 60.0), (20.2, 60.0), (20.2, 60.1), (20.0, 60.1)],
+                                                      [(20.08, 60.04), (20.12, 60.04), (20.12, 60.06), (20.08, 60.06)]]])
+        self.anchorage = geofence.Geofence("anchorage", [[[(20.15, 60.0), (20.5, 60.0), (20.5, 60.1), (20.15, 60.1)]]])
+        self.index = geofence.GeofenceIndex([self.harbour, self.anchorage], cell_size=0.1)
+
+    def test_containment(self):
+        self.assertEqual(self.index.containing(20.05, 60.05), [0])
+        self.assertEqual(self.index.containing(20.1, 60.05), [])
+        self.assertEqual(sorted(self.index.containing(20.18, 60.05)), [0, 1])
+        self.assertEqual(self.index.containing(19.9, 60.05), [])
+
+    def test_enter_exit_events(self):
+        tracker = geofence.GeofenceTracker(self.index)
+        self.assertEqual(tracker.update(1, 19.9, 60.05), [])
+        self.assertEqual([(event.fence_id, event.event) for event in tracker.update(1, 20.05, 60.05, 10)], [("harbour", "enter")])
+        self.assertEqual(tracker.update(1, 20.06, 60.05, 20), [])
+        self.assertEqual([(event.fence_id, event.event) for event in tracker.update(1, 20.18, 60.05, 30)], [("anchorage", "enter")])
+        self.assertEqual([(event.fence_id, event.event) for event in tracker.update(1, 20.3, 60.05, 40)], [("harbour", "exit")])
+        self.assertEqual(tracker.membership, {1: frozenset({1})})
+
+    def test_geojson(self):
+        collection = {"type": "FeatureCollection", "features": [
+            {"type": "Feature", "properties": {"name": "box"}, "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]]}},
+            {"type": "Feature", "id": "two", "properties": {}, "geometry": {"type": "MultiPolygon", "coordinates": [[[[2, 0], [3, 0], [3, 1], [2, 0]]], [[[4, 0], [5, 0], [5, 1], [4, 0]]]]}},
+            {"type": "Feature", "properties": {}, "geometry": {"type": "Point", "coordinates": [0, 0]}}]}
+        fences = geofence.geofences_from_geojson(collection)
+        self.assertEqual([fence.fence_id for fence in fences], ["box", "two"])
+        self.assertTrue(fences[1].contains(4.9, 0.5))
+        self.assertFalse(fences[1].contains(3.5, 0.5))
+
+    def test_cli_prints_events_as_they_happen(self):
+        import json
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        fences_path = os.path.join(directory.name, "fences.geojson")
+        with open(fences_path, "w") as f:
+            json.dump({"type": "FeatureCollection", "features": [{"type": "Feature", "properties": {"name": "bay"},
+                       "geometry": {"type": "Polygon", "coordinates": [[[-71, 42], [-70, 42], [-70, 43], [-71, 43], [-71, 42]]]}}]}, f)
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ais_decoder.py")
+        sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data", "AISSample7,28,24.txt")
+        result = subprocess.run([sys.executable, script, "--file_path", sample, "--geofences", fences_path, "--batch_size", "10"], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        first_event = result.stdout.index("Geofence enter: MMSI")
+        self.assertLess(first_event, result.stdout.rindex("Raw Message(s)"))
+        self.assertRegex(result.stdout, r"Geofence events: [1-9]")
+        result = subprocess.run([sys.executable, script, "--file_path", sample, "--geofences", fences_path, "--json", "1"], capture_output=True, text=True)
+        self.assertIn("Geofence enter: MMSI", result.stderr)
+        self.assertNotIn("Geofence enter", result.stdout)
+
+    @unittest.skipUnless(geofence.np is not None, "numpy is not installed")
+    def test_batch_matches_single_points(self):
+        np = geofence.np
+        generator = np.random.default_rng(0)
+        longitudes, latitudes = generator.uniform(19.9, 20.6, 5000), generator.uniform(59.95, 60.15, 5000)
+        points, fences = self.index.containing_points(longitudes, latitudes)
+        expected = {(point, fence_index) for point in range(5000) for fence_index in self.index.containing(longitudes[point], latitudes[point])}
+        self.assertEqual(set(zip(points.tolist(), fences.tolist())), expected)
+
+    @unittest.skipUnless(geofence.np is not None, "numpy is not installed")
+    def test_batch_without_fences(self):
+        points, fences = geofence.GeofenceIndex().containing_points([1.0], [2.0])
+        self.assertEqual((points.tolist(), fences.tolist()), ([], []))
+        self.assertEqual((points.dtype, fences.dtype), (geofence.np.int64, geofence.np.int64))
+
+
+class test_bytes_parser(test_AIS_decoder):
+    def test_payload_to_bits(self):
+        for character in range(256):
+            payload = bytes([character, ord("1"), character])
+            self.assertEqual(bytes_parser.payload_to_bits(payload), ais_decoder.get_payload_binary(payload.decode("latin-1")) or None)
+
+    def test_parse_sentence_bytes(self):
+        line = b"\\s:rx1,c:1727481600*5B\\!AIVDM,2,1,5,A,53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58\r\n"
+        fragment_count, fragment_number, sequence_id, channel, payload = bytes_parser.parse_sentence_bytes(memoryview(line))
+        self.assertEqual((fragment_count, fragment_number, sequence_id, channel), (2, 1, b"5", b"A"))
+        self.assertEqual(payload, ais_decoder.get_payload_binary("53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ"))
+        self.assertEqual(bytes_parser.parse_sentence_bytes(b"!AIVDM,1,1,,A,13QWhR012COJ"), ErrorCode.MALFORMED_SENTENCE)
+        self.assertEqual(bytes_parser.parse_sentence_bytes(b"!AIVDM,1,1,,A,13QW hR012,0*6C"), ErrorCode.INVALID_PAYLOAD)
+
+    def test_matches_str_parser(self):
+        for path in (os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data", name) for name in ("AISSample7,28,24.txt", "AISSample92824.txt")):
+            with open(path) as f:
+                expected = ais_decoder.decode_batch(f.read().split("\n"))
+            self.assertEqual(bytes_parser.decode_batch_bytes(bytes_parser.read_lines_bytes(path)), expected)
+            messages, _ = ais_decoder.parse_ais_messages(path)
+            self.assertEqual([(message.message_type_int, message.payload_info) for message in messages], expected)
+        error_stats = ErrorStats()
+        bytes_parser.decode_batch_bytes([b"garbage\n", b"!AIVDM,2,2,5,A,C`888888880,2*02\n"], error_stats=error_stats)
+        self.assertEqual(error_stats.summary(), {"MALFORMED_SENTENCE": 1, "NON_SEQUENTIAL_FRAGMENT": 1})
+        sentences = ['\\g:1-2-10*00\\!AIVDM,2,1,,A,53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58',
+                     '\\g:1-2-20*00\\!AIVDM,2,1,,A,53uuBt02<Tg1<<Tv220HTpplThj222222222221?1rc<>Ho<0@0TQCADR0EQ,0*58',
+                     '\\g:2-2-10*00\\!AIVDM,2,2,,B,C`888888880,2*02', '\\g:2-2-20*00\\!AIVDM,2,2,,B,C`888888880,2*02']
+        self.assertEqual(bytes_parser.decode_batch_bytes([memoryview(sentence.encode()) for sentence in sentences]), ais_decoder.decode_batch(sentences))
+        self.assertEqual(len(ais_decoder.decode_batch(sentences)), 2)
 
 
 if __name__ == '__main__':
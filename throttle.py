@@ -0,0 +1,124 @@
+# throttle.py -- per-vessel adaptive downsampling of position reports
+import math
+import time
+from constants import POSITION_REPORT_TYPES
+from decoders.projection import convert_raw_fields
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+
+"""Mean Earth radius in metres"""
+EARTH_RADIUS_METRES: float = 6371008.8
+
+"""Last kept report of a vessel: (time, latitude, longitude, course, navigation status)"""
+VesselState = Tuple[float, Optional[float], Optional[float], Optional[float], Optional[int]]
+
+
+def equirectangular_distance(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """Approximate distance in metres between two positions. Accurate to well under 1% over the short distances between reports."""
+    x = math.radians(longitude2 - longitude1) * math.cos(math.radians((latitude1 + latitude2) / 2))
+    y = math.radians(latitude2 - latitude1)
+    return EARTH_RADIUS_METRES * math.hypot(x, y)
+
+
+def course_difference(course1: float, course2: float) -> float:
+    """Smallest angle between two courses in degrees (0-180)."""
+    difference = abs(course1 - course2) % 360
+    return 360 - difference if difference > 180 else difference
+
+
+class ThrottleStats:
+    """Counts of position reports seen and kept by a PositionThrottle."""
+
+    def __init__(self):
+        self.seen: int = 0
+        self.kept: int = 0
+        self.passed_through: int = 0
+
+    @property
+    def dropped(self) -> int:
+        return self.seen - self.kept
+
+    @property
+    def reduction_ratio(self) -> float:
+        """Fraction of position reports dropped (0 if none were seen)."""
+        return self.dropped / self.seen if self.seen else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {"seen": self.seen, "kept": self.kept, "dropped": self.dropped, "passed_through": self.passed_through,
+                "reduction_ratio": self.reduction_ratio}
+
+
+class PositionThrottle:
+    """
+    Streaming downsampler for position reports.
+
+    A report is kept if it is the first from its MMSI, or if, since the last kept report of that MMSI, at least
+    `min_interval` seconds have elapsed, the vessel moved more than `min_distance` metres, its course changed by
+    more than `min_course_change` degrees, or its navigation status changed. Only the last kept report of each
+    vessel is stored, so state and work per message are O(1).
+
+    Args:
+    min_interval (float): Seconds after which a report is always kept.
+    min_distance (float): Metres moved after which a report is kept. None disables the check.
+    min_course_change (float): Course change in degrees after which a report is kept. None disables the check.
+    track_nav_status (bool): Keep reports whose navigation status differs from the last kept report.
+    raw (bool): Set if the messages were decoded with raw=True.
+    clock (Callable[[], float]): Time source used for messages without a tag block receive time.
+    """
+
+    def __init__(self, min_interval: float = 60.0, min_distance: Optional[float] = 100.0, min_course_change: Optional[float] = 10.0,
+                 track_nav_status: bool = True, raw: bool = False, clock: Callable[[], float] = time.time):
+        self.min_interval = min_interval
+        self.min_distance = min_distance
+        self.min_course_change = min_course_change
+        self.track_nav_status = track_nav_status
+        self.raw = raw
+        self.clock = clock
+        self.vessels: Dict[int, VesselState] = {}
+        self.stats = ThrottleStats()
+
+    def keep(self, message_type: int, payload_info: Dict, receive_time: Optional[float] = None) -> bool:
+        """Return whether a decoded message should be kept, updating the vessel's state if it is."""
+        mmsi = payload_info.get("MMSI")
+        if message_type not in POSITION_REPORT_TYPES or mmsi is None or "Error" in payload_info:
+            self.stats.passed_through += 1
+            return True
+        if self.raw:
+            payload_info = convert_raw_fields(message_type, payload_info)
+        self.stats.seen += 1
+        now = receive_time if receive_time is not None else self.clock()
+        latitude, longitude = payload_info.get("Latitude"), payload_info.get("Longitude")
+        if latitude is None or longitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            latitude = longitude = None
+        course = payload_info.get("Course Over Ground")
+        if course is not None and not 0 <= course < 360:
+            course = None
+        nav_status = payload_info.get("Navigation Status")
+
+        previous = self.vessels.get(mmsi)
+        if previous is not None and not self._changed(previous, now, latitude, longitude, course, nav_status):
+            return False
+        self.vessels[mmsi] = (now, latitude, longitude, course, nav_status)
+        self.stats.kept += 1
+        return True
+
+    def _changed(self, previous: VesselState, now: float, latitude: Optional[float], longitude: Optional[float],
+                 course: Optional[float], nav_status: Optional[int]) -> bool:
+        previous_time, previous_latitude, previous_longitude, previous_course, previous_nav_status = previous
+        if now - previous_time >= self.min_interval:
+            return True
+        if self.track_nav_status and nav_status != previous_nav_status:
+            return True
+        if self.min_course_change is not None and course is not None and previous_course is not None \
+                and course_difference(course, previous_course) > self.min_course_change:
+            return True
+        if self.min_distance is not None and latitude is not None and previous_latitude is not None \
+                and equirectangular_distance(previous_latitude, previous_longitude, latitude, longitude) > self.min_distance:
+            return True
+        return False
+
+    def filter(self, messages: Iterable) -> Iterator:
+        """Yield the decoded AISMessage objects that are kept."""
+        for message in messages:
+            if self.keep(message.message_type_int, message.payload_info, message.receive_time):
+                yield message
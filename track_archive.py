@@ -0,0 +1,301 @@
+# track_archive.py -- compact on-disk archive of position reports, partitioned by MMSI and time block, with delta/varint-encoded columns
+import struct
+import time
+import zlib
+from itertools import accumulate
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from constants import (POSITION_REPORT_TYPES, RAW_COURSE_OVER_GROUND_NOT_AVAILABLE, RAW_LATITUDE_NOT_AVAILABLE,
+                       RAW_LONGITUDE_NOT_AVAILABLE, RAW_SPEED_OVER_GROUND_NOT_AVAILABLE)
+
+
+"""Seconds of each time block; a block of a vessel's track is compressed and indexed on its own"""
+DEFAULT_BLOCK_SECONDS: int = 3600
+
+"""Points buffered for one vessel and time block before they are written out as a block"""
+MAX_BLOCK_POINTS: int = 4096
+
+"""zlib level applied to the varint-encoded columns of each block"""
+DEFAULT_COMPRESS_LEVEL: int = 6
+
+"""File signature at the start and at the end of an archive"""
+ARCHIVE_MAGIC: bytes = b"AISTRK\x01\x00"
+
+"""Index entry of a block: MMSI, time block start, first and last time (ms), file offset, compressed length, point count"""
+INDEX_ENTRY = struct.Struct("<QqqqQII")
+
+"""Archive footer: index offset, index entry count, magic"""
+ARCHIVE_FOOTER = struct.Struct("<QQ8s")
+
+"""Fixed-point scale of the stored columns: 1/10000 minute for positions, tenths for speed and course (values a report does not carry are stored as the AIS "not available" values)"""
+POSITION_SCALE: int = 600000
+SPEED_COURSE_SCALE: int = 10
+
+
+class TrackPoint(NamedTuple):
+    """A position report read from an archive. Values the report did not carry are None."""
+    mmsi: int
+    time: float
+    latitude: Optional[float]
+    longitude: Optional[float]
+    speed: Optional[float]
+    course: Optional[float]
+
+
+class BlockIndexEntry(NamedTuple):
+    mmsi: int
+    block_start: int
+    first_time_ms: int
+    last_time_ms: int
+    offset: int
+    length: int
+    count: int
+
+
+# -- Column encoding --
+
+def encode_column(values: List[int], output: bytearray) -> None:
+    """Append a column to `output`: its first value, then the difference to the previous value, each as a zigzag varint."""
+    previous = 0
+    for value in values:
+        delta = value - previous
+        previous = value
+        delta = (delta << 1) ^ (delta >> 63)
+        while delta > 0x7F:
+            output.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        output.append(delta)
+
+
+def decode_varints(data: bytes, count: int) -> List[int]:
+    """The first `count` zigzag varints of `data`, zigzag-decoded."""
+    values: List[int] = []
+    append = values.append
+    value = 0
+    shift = 0
+    for byte in data:
+        if byte & 0x80:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            continue
+        value |= byte << shift
+        append((value >> 1) ^ -(value & 1))
+        if len(values) == count:
+            break
+        value = 0
+        shift = 0
+    return values
+
+
+def encode_block(times_ms: List[int], latitudes: List[int], longitudes: List[int], speeds: List[int], courses: List[int],
+                 compress_level: int = DEFAULT_COMPRESS_LEVEL) -> bytes:
+    """Encode the columns of a block (fixed-point integers, in time order) and compress them."""
+    output = bytearray()
+    for column in (times_ms, latitudes, longitudes, speeds, courses):
+        encode_column(column, output)
+    return zlib.compress(bytes(output), compress_level)
+
+
+def decode_block(data: bytes, count: int) -> Tuple[List[int], List[int], List[int], List[int], List[int]]:
+    """The columns (times in ms, raw latitudes, longitudes, speeds and courses) of a block written by encode_block."""
+    deltas = decode_varints(zlib.decompress(data), count * 5)
+    return tuple(list(accumulate(deltas[start:start + count])) for start in range(0, count * 5, count))
+
+
+def _raw_value(value, scale: int, not_available: int, raw: bool) -> int:
+    if value is None:
+        return not_available
+    return value if raw else round(value * scale)
+
+
+# -- Writer --
+
+class TrackArchiveWriter:
+    """
+    Writes position reports to a track archive.
+
+    Reports are buffered per MMSI and time block (`block_seconds`, by tag block receive time, or the wall clock for
+    untagged input). A buffer is written out as a block once its time block is over (one block of grace is kept for
+    late reports) or once it holds MAX_BLOCK_POINTS points. Each block stores times (milliseconds), latitude and
+    longitude (1/10000 minute), SOG and COG (tenths) as columns of delta-encoded zigzag varints, zlib-compressed;
+    the index of all blocks (MMSI, time range, offset) is written at the end of the file by close().
+
+    Args:
+    path (str): Archive file, overwritten if it exists.
+    block_seconds (int): Length of the time blocks.
+    raw (bool): The messages were decoded with raw=True (fixed-point positions, speeds and courses).
+    compress_level (int): zlib compression level.
+    clock (Callable[[], float]): Time source for messages without a receive time.
+    """
+
+    def __init__(self, path: str, block_seconds: int = DEFAULT_BLOCK_SECONDS, raw: bool = False,
+                 compress_level: int = DEFAULT_COMPRESS_LEVEL, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.block_seconds = block_seconds
+        self.raw = raw
+        self.compress_level = compress_level
+        self.clock = clock
+        self.points_written = 0
+        self.blocks_written = 0
+        self._file = open(path, "wb")
+        self._file.write(ARCHIVE_MAGIC)
+        self._index: List[BlockIndexEntry] = []
+        self._buffers: Dict[Tuple[int, int], Tuple[List[int], ...]] = {}
+        self._latest_block = None
+
+    def __enter__(self) -> 'TrackArchiveWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add(self, mmsi: int, receive_time: float, latitude, longitude, speed, course) -> None:
+        """Add one position (values as decoded; None for values the report does not carry)."""
+        block_start = int(receive_time // self.block_seconds) * self.block_seconds
+        key = (mmsi, block_start)
+        columns = self._buffers.get(key)
+        if columns is None:
+            columns = self._buffers[key] = ([], [], [], [], [])
+        columns[0].append(round(receive_time * 1000))
+        columns[1].append(_raw_value(latitude, POSITION_SCALE, RAW_LATITUDE_NOT_AVAILABLE, self.raw))
+        columns[2].append(_raw_value(longitude, POSITION_SCALE, RAW_LONGITUDE_NOT_AVAILABLE, self.raw))
+        columns[3].append(_raw_value(speed, SPEED_COURSE_SCALE, RAW_SPEED_OVER_GROUND_NOT_AVAILABLE, self.raw))
+        columns[4].append(_raw_value(course, SPEED_COURSE_SCALE, RAW_COURSE_OVER_GROUND_NOT_AVAILABLE, self.raw))
+        if len(columns[0]) >= MAX_BLOCK_POINTS:
+            self._write_block(key)
+        if self._latest_block is None or block_start > self._latest_block:
+            self._latest_block = block_start
+            self._write_blocks_before(block_start - self.block_seconds)
+
+    def write_messages(self, messages: Iterable) -> None:
+        """Add the position reports among decoded AISMessage objects; other messages are ignored."""
+        for message in messages:
+            payload_info = message.payload_info
+            if message.message_type_int not in POSITION_REPORT_TYPES or "Error" in payload_info or payload_info.get("MMSI") is None:
+                continue
+            receive_time = message.receive_time if message.receive_time is not None else self.clock()
+            self.add(payload_info["MMSI"], receive_time, payload_info.get("Latitude"), payload_info.get("Longitude"),
+                     payload_info.get("Speed Over Ground"), payload_info.get("Course Over Ground"))
+
+    def _write_block(self, key: Tuple[int, int]) -> None:
+        columns = self._buffers.pop(key)
+        times_ms = columns[0]
+        if any(later < earlier for earlier, later in zip(times_ms, times_ms[1:])):
+            order = sorted(range(len(times_ms)), key=times_ms.__getitem__)
+            columns = tuple([column[index] for index in order] for column in columns)
+            times_ms = columns[0]
+        data = encode_block(*columns, compress_level=self.compress_level)
+        self._index.append(BlockIndexEntry(key[0], key[1], times_ms[0], times_ms[-1], self._file.tell(), len(data), len(times_ms)))
+        self._file.write(data)
+        self.points_written += len(times_ms)
+        self.blocks_written += 1
+
+    def _write_blocks_before(self, block_start: int) -> None:
+        for key in [key for key in self._buffers if key[1] < block_start]:
+            self._write_block(key)
+
+    def close(self) -> None:
+        """Write the remaining blocks and the index."""
+        if self._file.closed:
+            return
+        for key in sorted(self._buffers):
+            self._write_block(key)
+        index_offset = self._file.tell()
+        self._index.sort()
+        for entry in self._index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+        self._file.write(ARCHIVE_FOOTER.pack(index_offset, len(self._index), ARCHIVE_MAGIC))
+        self._file.close()
+
+
+def write_track_archive(messages: Iterable, path: str, **kwargs) -> TrackArchiveWriter:
+    """Write the position reports among decoded AISMessage objects to a track archive. Returns the closed writer."""
+    with TrackArchiveWriter(path, **kwargs) as writer:
+        writer.write_messages(messages)
+    return writer
+
+
+# -- Reader --
+
+class TrackArchiveReader:
+    """
+    Reads a track archive. Only the index is loaded when the archive is opened; a query reads and decompresses
+    only the blocks of the requested vessel(s) whose time range overlaps the query.
+
+    Args:
+    path (str): Archive file.
+    raw (bool): Return positions, speeds and courses as the stored fixed-point integers.
+    """
+
+    def __init__(self, path: str, raw: bool = False):
+        self.path = path
+        self.raw = raw
+        self._file = open(path, "rb")
+        self._file.seek(-ARCHIVE_FOOTER.size, 2)
+        index_offset, entry_count, magic = ARCHIVE_FOOTER.unpack(self._file.read(ARCHIVE_FOOTER.size))
+        self._file.seek(0)
+        if magic != ARCHIVE_MAGIC or self._file.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            self._file.close()
+            raise ValueError(f"Not a track archive: {path}")
+        self._file.seek(index_offset)
+        index_data = self._file.read(entry_count * INDEX_ENTRY.size)
+        self.index: List[BlockIndexEntry] = [BlockIndexEntry._make(entry) for entry in INDEX_ENTRY.iter_unpack(index_data)]
+        self._blocks_by_mmsi: Dict[int, List[BlockIndexEntry]] = {}
+        for entry in self.index:
+            self._blocks_by_mmsi.setdefault(entry.mmsi, []).append(entry)
+        self.blocks_read = 0
+
+    def __enter__(self) -> 'TrackArchiveReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def mmsis(self) -> List[int]:
+        return sorted(self._blocks_by_mmsi)
+
+    def _blocks(self, mmsi: Optional[int], start_ms: Optional[int], end_ms: Optional[int]) -> List[BlockIndexEntry]:
+        entries = self._blocks_by_mmsi.get(mmsi, []) if mmsi is not None else self.index
+        return [entry for entry in entries
+                if (start_ms is None or entry.last_time_ms >= start_ms) and (end_ms is None or entry.first_time_ms < end_ms)]
+
+    def _points(self, entry: BlockIndexEntry) -> List[Tuple]:
+        self._file.seek(entry.offset)
+        times_ms, latitudes, longitudes, speeds, courses = decode_block(self._file.read(entry.length), entry.count)
+        self.blocks_read += 1
+        if self.raw:
+            values = (latitudes, longitudes, speeds, courses)
+        else:
+            values = ([None if value == RAW_LATITUDE_NOT_AVAILABLE else value / POSITION_SCALE for value in latitudes],
+                      [None if value == RAW_LONGITUDE_NOT_AVAILABLE else value / POSITION_SCALE for value in longitudes],
+                      [None if value == RAW_SPEED_OVER_GROUND_NOT_AVAILABLE else value / SPEED_COURSE_SCALE for value in speeds],
+                      [None if value == RAW_COURSE_OVER_GROUND_NOT_AVAILABLE else value / SPEED_COURSE_SCALE for value in courses])
+        return list(zip([value / 1000 for value in times_ms], *values))
+
+    def read(self, mmsi: Optional[int] = None, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[TrackPoint]:
+        """
+        Positions of one vessel (or of every vessel, by MMSI) received at or after `start` and before `end`, in time order.
+
+        Args:
+        mmsi (Optional[int]): The vessel, or None for all vessels.
+        start, end (Optional[float]): UNIX time range; None leaves that side open.
+        """
+        start_ms = round(start * 1000) if start is not None else None
+        end_ms = round(end * 1000) if end is not None else None
+        blocks_by_mmsi: Dict[int, List[BlockIndexEntry]] = {}
+        for entry in self._blocks(mmsi, start_ms, end_ms):
+            blocks_by_mmsi.setdefault(entry.mmsi, []).append(entry)
+        for block_mmsi, entries in sorted(blocks_by_mmsi.items()):
+            points: List[Tuple] = []
+            for entry in entries:
+                points.extend(self._points(entry))
+            # Blocks of a vessel can overlap in time when late reports were written after their block
+            if len(entries) > 1:
+                points.sort(key=itemgetter(0))
+            for point in points:
+                if (start is None or point[0] >= start) and (end is None or point[0] < end):
+                    yield TrackPoint(block_mmsi, *point)
+
+    def close(self) -> None:
+        self._file.close()
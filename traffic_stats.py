@@ -0,0 +1,315 @@
+# traffic_stats.py -- constant-memory traffic statistics: distinct vessels, top talkers and per-window message counts
+import hashlib
+import heapq
+import json
+import math
+import time
+from array import array
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, Generic, Hashable, Iterable, List, Optional, Tuple, TypeVar
+from log_reader import line_timestamp
+
+
+"""HyperLogLog precision (2^p registers): p=12 uses 4 KiB per sketch with a standard error of about 1.6%"""
+DEFAULT_HLL_PRECISION: int = 12
+
+"""Count-min sketch dimensions: estimates exceed true counts by at most 2/width of the total, with probability 1 - 2^-depth"""
+DEFAULT_CMS_WIDTH: int = 4096
+DEFAULT_CMS_DEPTH: int = 4
+
+"""Number of top talkers (MMSIs sending the most messages) tracked"""
+DEFAULT_TOP_TALKERS: int = 20
+
+"""Tumbling window lengths in seconds, and number of past windows retained"""
+MINUTE_WINDOW_SECONDS: int = 60
+HOUR_WINDOW_SECONDS: int = 3600
+DEFAULT_MINUTE_WINDOWS: int = 60
+DEFAULT_HOUR_WINDOWS: int = 24
+
+_MASK_64 = (1 << 64) - 1
+
+T = TypeVar("T")
+
+
+def hash64(value: Hashable) -> int:
+    """64-bit hash of an MMSI (splitmix64 finalizer) or, for other values, of their string form (BLAKE2b)."""
+    if type(value) is not int:
+        return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+    value = (value + 0x9E3779B97F4A7C15) & _MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return value ^ (value >> 31)
+
+
+class HyperLogLog:
+    """
+    Approximate distinct counter in fixed memory (2^precision one-byte registers).
+
+    Args:
+    precision (int): Number of index bits, 4 to 16. The standard error is about 1.04 / sqrt(2^precision).
+    """
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: Hashable) -> None:
+        self.add_hash(hash64(value))
+
+    def add_hash(self, hashed: int) -> None:
+        index = hashed >> (64 - self.precision)
+        rank = 65 - self.precision - (hashed & ((1 << (64 - self.precision)) - 1)).bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """Add all values counted by `other` (which must have the same precision)."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        registers = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / registers)
+        estimate = alpha * registers * registers / sum(2.0 ** -rank for rank in self.registers)
+        empty = self.registers.count(0)
+        if estimate <= 2.5 * registers and empty:
+            # Linear counting is more accurate for small cardinalities
+            estimate = registers * math.log(registers / empty)
+        return round(estimate)
+
+
+class CountMinSketch:
+    """
+    Approximate per-key counts in fixed memory (depth rows of width counters). Estimates never undercount.
+
+    Args:
+    width (int): Counters per row (rounded up to a power of two).
+    depth (int): Rows, each indexed by an independent hash.
+    """
+
+    def __init__(self, width: int = DEFAULT_CMS_WIDTH, depth: int = DEFAULT_CMS_DEPTH):
+        self.width = 1 << max(width - 1, 1).bit_length()
+        self.depth = depth
+        self.rows = [array("Q", bytes(8 * self.width)) for _ in range(depth)]
+        self.total = 0
+
+    def _indexes(self, key: Hashable) -> List[int]:
+        hashed = hash64(key)
+        mask = self.width - 1
+        # Row hashes derived from two halves of one 64-bit hash (Kirsch-Mitzenmacher)
+        low, high = hashed & 0xFFFFFFFF, hashed >> 32
+        return [(low + row * high) & mask for row in range(self.depth)]
+
+    def add(self, key: Hashable, count: int = 1) -> int:
+        """Add `count` occurrences of `key` and return its new estimated count."""
+        self.total += count
+        estimate = None
+        for row, index in zip(self.rows, self._indexes(key)):
+            row[index] += count
+            estimate = row[index] if estimate is None or row[index] < estimate else estimate
+        return estimate
+
+    def estimate(self, key: Hashable) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+
+class HeavyHitters:
+    """
+    The `k` keys with the highest counts, estimated with a count-min sketch. Candidates are kept in a min-heap
+    ordered by estimated count, so a new key only enters when its estimate exceeds the smallest tracked count.
+
+    Args:
+    k (int): Keys tracked.
+    width, depth (int): Count-min sketch dimensions.
+    """
+
+    def __init__(self, k: int = DEFAULT_TOP_TALKERS, width: int = DEFAULT_CMS_WIDTH, depth: int = DEFAULT_CMS_DEPTH):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates: Dict[Hashable, int] = {}
+        self._heap: List[Tuple[int, Hashable]] = []
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        estimate = self.sketch.add(key, count)
+        if key in self.candidates:
+            self.candidates[key] = estimate
+            if len(self._heap) > 4 * self.k:
+                # Drop the stale heap entries of keys whose count was updated
+                self._heap = [(candidate_count, candidate) for candidate, candidate_count in self.candidates.items()]
+                heapq.heapify(self._heap)
+            else:
+                heapq.heappush(self._heap, (estimate, key))
+            return
+        if len(self.candidates) < self.k:
+            self.candidates[key] = estimate
+            heapq.heappush(self._heap, (estimate, key))
+            return
+        while self._heap[0][1] not in self.candidates or self.candidates[self._heap[0][1]] != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if estimate > self._heap[0][0]:
+            del self.candidates[heapq.heappop(self._heap)[1]]
+            self.candidates[key] = estimate
+            heapq.heappush(self._heap, (estimate, key))
+
+    def top(self) -> List[Tuple[Hashable, int]]:
+        """(key, estimated count) pairs, highest count first."""
+        return sorted(self.candidates.items(), key=lambda item: item[1], reverse=True)
+
+
+class TumblingWindows(Generic[T]):
+    """
+    Aligned, non-overlapping time windows of `size` seconds, each holding a value created by `factory`. Only the
+    `keep` most recent windows are retained.
+    """
+
+    def __init__(self, size: float, keep: int, factory: Callable[[], T]):
+        self.size = size
+        self.factory = factory
+        self.windows: Deque[Tuple[float, T]] = deque(maxlen=keep)
+
+    def get(self, timestamp: float) -> Optional[T]:
+        """The value of the window containing `timestamp`, or None if that window is no longer retained."""
+        start = timestamp - timestamp % self.size
+        for window_start, value in reversed(self.windows):
+            if window_start == start:
+                return value
+            if window_start < start:
+                break
+        if self.windows and start < self.windows[-1][0]:
+            if len(self.windows) == self.windows.maxlen and start < self.windows[0][0]:
+                return None
+            # Out-of-order window still within the retained range: insert it in order
+            value = self.factory()
+            windows = sorted(list(self.windows) + [(start, value)], key=lambda window: window[0])
+            self.windows = deque(windows[-self.windows.maxlen:], maxlen=self.windows.maxlen)
+            return value
+        value = self.factory()
+        self.windows.append((start, value))
+        return value
+
+
+class MinuteCounts:
+    """Counters of one minute window. Their keys (message types, channels, error categories) are bounded sets."""
+
+    def __init__(self):
+        self.message_types: Counter = Counter()
+        self.channels: Counter = Counter()
+        self.errors: Counter = Counter()
+
+    def summary(self) -> Dict[str, Any]:
+        messages = sum(self.message_types.values())
+        errors = sum(self.errors.values())
+        return {
+            "messages": messages,
+            "message_types": {str(message_type): count for message_type, count in sorted(self.message_types.items())},
+            "channels": dict(sorted(self.channels.items())),
+            "errors": errors,
+            "error_rate": errors / (messages + errors) if messages + errors else 0.0,
+            "error_types": dict(sorted(self.errors.items())),
+        }
+
+
+class TrafficStats:
+    """
+    Live traffic statistics in memory that does not grow with traffic: messages per type, channel and error
+    category per minute, distinct MMSIs per hour and overall (HyperLogLog), and the top talkers by message count
+    (count-min sketch). Messages are timestamped by their tag block receive time, or by `clock` if they have none.
+
+    record_messages aggregates a whole batch with Counters before touching the sketches, so each distinct MMSI
+    in a batch costs one sketch update, however many messages it sent.
+
+    Args:
+    minute_windows (int): Minute windows retained.
+    hour_windows (int): Hour windows retained.
+    top_talkers (int): MMSIs tracked as top talkers.
+    precision (int): HyperLogLog precision.
+    clock (Callable[[], float]): Time source for messages without a receive time.
+    """
+
+    def __init__(self, minute_windows: int = DEFAULT_MINUTE_WINDOWS, hour_windows: int = DEFAULT_HOUR_WINDOWS, top_talkers: int = DEFAULT_TOP_TALKERS,
+                 precision: int = DEFAULT_HLL_PRECISION, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.precision = precision
+        self.minutes: TumblingWindows[MinuteCounts] = TumblingWindows(MINUTE_WINDOW_SECONDS, minute_windows, MinuteCounts)
+        self.hours: TumblingWindows[HyperLogLog] = TumblingWindows(HOUR_WINDOW_SECONDS, hour_windows, lambda: HyperLogLog(precision))
+        self.unique_mmsi = HyperLogLog(precision)
+        self.top_talkers = HeavyHitters(top_talkers)
+        self.messages = 0
+        self.errors = 0
+        self.late_messages = 0
+
+    def record_messages(self, messages: Iterable) -> None:
+        """Record a batch of decoded AISMessage objects."""
+        now = self.clock()
+        by_minute: Dict[float, List] = {}
+        for message in messages:
+            timestamp = message.receive_time if message.receive_time is not None else now
+            minute = timestamp - timestamp % MINUTE_WINDOW_SECONDS
+            group = by_minute.get(minute)
+            if group is None:
+                group = by_minute[minute] = []
+            group.append(message)
+        for minute, group in by_minute.items():
+            self.messages += len(group)
+            counts = self.minutes.get(minute)
+            if counts is not None:
+                counts.message_types.update(message.message_type_int for message in group)
+                counts.channels.update(message.channel for message in group)
+            else:
+                self.late_messages += len(group)
+            mmsi_counts = Counter(message.payload_info.get("MMSI") for message in group)
+            mmsi_counts.pop(None, None)
+            hour = self.hours.get(minute)
+            for mmsi, count in mmsi_counts.items():
+                hashed = hash64(mmsi)
+                self.unique_mmsi.add_hash(hashed)
+                if hour is not None:
+                    hour.add_hash(hashed)
+                self.top_talkers.add(mmsi, count)
+
+    def record_errors(self, errors: Iterable, timestamp: Optional[float] = None) -> None:
+        """
+        Record DecodeError records. Each is counted at the receive time of its raw sentence (tag block or line
+        prefix), like messages; errors without one are counted at `timestamp`, or now.
+        """
+        default_time = None
+        by_minute: Dict[float, Counter] = {}
+        for error in errors:
+            error_time = line_timestamp(error.raw_sentence)
+            if error_time is None:
+                if default_time is None:
+                    default_time = timestamp if timestamp is not None else self.clock()
+                error_time = default_time
+            minute = error_time - error_time % MINUTE_WINDOW_SECONDS
+            group = by_minute.get(minute)
+            if group is None:
+                group = by_minute[minute] = Counter()
+            group[error.code.name] += 1
+        for minute, error_counts in by_minute.items():
+            self.errors += sum(error_counts.values())
+            counts = self.minutes.get(minute)
+            if counts is not None:
+                counts.errors.update(error_counts)
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-serializable summary of all retained windows and overall counts."""
+        return {
+            "messages": self.messages,
+            "errors": self.errors,
+            "unique_mmsi": self.unique_mmsi.count(),
+            "top_talkers": [{"mmsi": mmsi, "messages": count} for mmsi, count in self.top_talkers.top()],
+            "minutes": [dict(start=start, **counts.summary()) for start, counts in self.minutes.windows],
+            "hours": [{"start": start, "unique_mmsi": sketch.count()} for start, sketch in self.hours.windows],
+            "late_messages": self.late_messages,
+        }
+
+    def to_json(self, path: Optional[str] = None, indent: Optional[int] = 2) -> str:
+        """The summary as JSON, also written to `path` if given."""
+        text = json.dumps(self.summary(), indent=indent)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text